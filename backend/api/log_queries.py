@@ -0,0 +1,58 @@
+import datetime
+import json
+from typing import Optional
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+
+from backend import crud
+from backend.db import SessionLocal
+
+MAX_LOG_PAGE_SIZE = 1000
+
+
+class LogQueryParams:
+    """Query parameters shared by the /functions/{id}/logs routes"""
+
+    def __init__(
+        self,
+        limit: int = Query(100, ge=1, le=MAX_LOG_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        status: Optional[str] = Query(None, description="Only logs with this status"),
+        since: Optional[datetime.datetime] = Query(None, description="Only logs created at or after this time"),
+        until: Optional[datetime.datetime] = Query(None, description="Only logs created before this time"),
+        include_output: bool = Query(False, description="Include the output and error_log text"),
+        format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every matching log")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.status = status
+        self.since = since
+        self.until = until
+        self.include_output = include_output
+        self.format = format
+
+    @property
+    def filters(self):
+        return {"status": self.status, "since": self.since, "until": self.until,
+                "include_output": self.include_output}
+
+
+def stream_logs(function_id: int, params: LogQueryParams):
+    """Export all matching logs as NDJSON, one row per line, without buffering them"""
+    def generate():
+        # The request's session is closed before the body is streamed, so use our own
+        db = SessionLocal()
+        try:
+            for log in crud.iter_logs_for_function(db, function_id, **params.filters):
+                yield json.dumps(log, default=_json_default) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import json
+import os
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip without it
+    brotli = None
+
+# Bodies smaller than this are sent as is, compressing them costs more than it saves
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Streamed as they are produced; buffering them to compress would hold back every chunk
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def _accepted_encoding(headers):
+    accepted = {}
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with brotli or gzip, as the client accepts.
+
+    Streamed media types (SSE, NDJSON exports and batch results) pass through
+    untouched, so their chunks are not held back. Other bodies are collected, since
+    the request-tracking middleware hands on even plain responses in pieces.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = _accepted_encoding(Headers(scope=scope)) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if "content-encoding" in headers or media_type in STREAMING_MEDIA_TYPES:
+                    await send(message)
+                else:
+                    # Hold the headers until the whole body shows whether it is worth compressing
+                    start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            if len(body) >= self.minimum_size:
+                body = _compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def etag_response(request: Request, content):
+    """
+    JSON response with an ETag over its body; 304 Not Modified if the client has it already.
+
+    Weak, since the same ETag is sent whichever Content-Encoding the body ends up in.
+    """
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.tracing import exporter
+
+router = APIRouter()
+
+
+@router.get("/debug/traces", tags=["debug"])
+def read_traces(limit: int = Query(50, ge=1, le=1000),
+                min_duration_ms: Optional[float] = Query(None, description="Only traces at least this slow"),
+                name: Optional[str] = Query(None, description="Only traces whose root span name contains this")):
+    """Recently sampled traces held in memory by this process, newest first, without their spans"""
+    return {"status": "success", "traces": exporter.recent(limit, min_duration_ms, name)}
+
+
+@router.get("/debug/traces/{trace_id}", tags=["debug"])
+def read_trace(trace_id: str):
+    """One trace with all of its spans"""
+    trace = exporter.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found (not sampled, or evicted)")
+    return trace
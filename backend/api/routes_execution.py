@@ -1,35 +1,291 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import os
+import datetime
+import time
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.db import get_db
-from backend import crud, models
-from backend.engine.executor import execute_function_engine
+from backend.db import get_db, get_async_db, AsyncSessionLocal
+from backend import crud, models, schemas
+from backend.engine.executor import execute_function_engine, result_status, RuntimeNotReadyError
+from backend.engine.dispatcher import execution_dispatcher, QueueFullError, DispatcherUnavailableError
+from backend.engine.scheduler import BATCH, INTERACTIVE
+from backend.engine.router import node_router
+from backend.engine.dependency_images import DependenciesNotReadyError
+from backend.engine.process_sandbox import SandboxUnavailableError
+from backend.engine.timing import InvocationTimings
+from backend.function_cache import function_cache
+from backend.result_cache import result_cache
+from backend.log_writer import log_writer
+from backend.stats import function_stats
+from backend.api.log_queries import LogQueryParams, stream_logs
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "8"))
+# How long a batch item keeps retrying a saturated queue before it is reported as failed
+BATCH_QUEUE_WAIT = float(os.getenv("BATCH_QUEUE_WAIT", "60"))
+
+PROFILE_DESCRIPTION = "Run under the runtime's sampling profiler and return the hotspots with the result"
+PROFILE_COLLAPSED_DESCRIPTION = "With profile, also return the collapsed stacks (kept at /profiles/{id}/collapsed)"
 
 router = APIRouter()
 
 @router.post("/functions/{id}/execute", tags=["execution"])
-async def execute_function(id: int, db: Session = Depends(get_db)):
-    
-    # Fetching the function by ID
-    function = crud.get_function(db, id=id)
+async def execute_function(id: int, event: Optional[Any] = Body(None), db: AsyncSession = Depends(get_async_db),
+                           profile: bool = Query(False, description=PROFILE_DESCRIPTION),
+                           profile_collapsed: bool = Query(False, description=PROFILE_COLLAPSED_DESCRIPTION)):
+
+    # Fetching the function by ID, from the in-process cache or the DB (asyncpg, on the event loop)
+    timings = InvocationTimings()
+    with timings.phase("lookup"):
+        function = await function_cache.get_async(db, id)
     if not function:
         raise HTTPException(status_code=404, detail="Function not found")
 
-    # Passing the function to the execution engine in docka-wocka
+    # Passing the function to the execution engine in docka-wocka via the bounded worker pool
     try:
-        result = execute_function_engine(function) 
+        timings.queued()
+        submit = lambda: _submit(function, event, None, timings, profile=profile)
+        # Cacheable functions may be answered from memory, or by an identical call already running.
+        # A profile describes one run, so profiled calls always execute.
+        result = await (submit() if profile else result_cache.run(function, event, submit))
+        result.setdefault("timings", timings.to_dict())
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many executions queued, try again later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DispatcherUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except (DependenciesNotReadyError, RuntimeNotReadyError, SandboxUnavailableError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Execution failed: {str(e)}")
 
-    # Logging the result in the ExecutionLogs table
-    crud.log_execution_result(db, function_id=id, result=result)
+    if profile and "profile" in result:
+        await _save_profile(id, result["profile"], profile_collapsed)
+
+    # Logging the result in the ExecutionLogs table, batched in the background unless the buffer is full
+    if _executed(result):
+        row = crud.execution_log_row(id, result)
+        function_stats.record(row)
+        if not log_writer.submit(row):
+            await crud.create_execution_logs_async(db, [row])
 
     return {"status": "success", "result": result}
 
+def _executed(result):
+    """
+    False for results answered by the result cache ("cached" or "coalesced"): nothing ran,
+    so they stay out of the execution logs and stats (RESULT_CACHE_LOOKUPS counts them).
+    """
+    return not (result.get("cached") or result.get("coalesced"))
+
+async def _submit(function, event, on_output, timings, priority=INTERACTIVE, profile=False):
+    """Run the invocation on a worker node when cluster routing is on, else on this process's dispatcher"""
+    if node_router.active():
+        return await node_router.submit(function, event, on_output, timings, priority, profile)
+    return await execution_dispatcher.submit(
+        execute_function_engine, function, event, on_output, timings, profile, function=function, priority=priority
+    )
+
+async def _save_profile(function_id, profile, include_collapsed):
+    """
+    Store an invocation's profile for /profiles/{id} and put its id in the result,
+    where the execution log row picks it up. The collapsed stacks stay out of the
+    response unless asked for.
+    """
+    if "hotspots" in profile:
+        async with AsyncSessionLocal() as db:
+            profile["id"] = await crud.create_execution_profile_async(db, function_id, profile)
+    if not include_collapsed:
+        profile.pop("collapsed", None)
+
+@router.post("/functions/{id}/execute:stream", tags=["execution"])
+async def execute_function_stream(id: int, event: Optional[Any] = Body(None),
+                                  db: AsyncSession = Depends(get_async_db),
+                                  profile: bool = Query(False, description=PROFILE_DESCRIPTION),
+                                  profile_collapsed: bool = Query(False, description=PROFILE_COLLAPSED_DESCRIPTION)):
+    """
+    Run the function and relay its output as Server-Sent Events while it runs.
+
+    Sends "output" events ({"stream", "data"}) as chunks arrive, then one "result"
+    event with the same body the non-streaming endpoint returns.
+    """
+    timings = InvocationTimings()
+    with timings.phase("lookup"):
+        function = await function_cache.get_async(db, id)
+    if not function:
+        raise HTTPException(status_code=404, detail="Function not found")
+
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+
+    def on_output(stream, text):
+        # Called from the worker thread
+        loop.call_soon_threadsafe(chunks.put_nowait, {"stream": stream, "data": text})
+
+    timings.queued()
+    task = asyncio.create_task(_submit(function, event, on_output, timings, profile=profile))
+    # Let submit() run up to its first await, so a full queue is still a plain 429
+    await asyncio.sleep(0)
+    if task.done() and task.exception() is not None:
+        error = task.exception()
+        if isinstance(error, QueueFullError):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many executions queued, try again later",
+                headers={"Retry-After": str(error.retry_after)}
+            )
+        if isinstance(error, DispatcherUnavailableError):
+            raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "5"})
+        raise HTTPException(status_code=500, detail=f"Execution failed: {str(error)}")
+    task.add_done_callback(lambda _: chunks.put_nowait(None))
+
+    return StreamingResponse(
+        _stream_execution(function, task, chunks, profile_collapsed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_execution(function, task, chunks, profile_collapsed=False):
+    try:
+        # Output callbacks are queued on the loop before the result, so nothing is lost at the end
+        while (chunk := await chunks.get()) is not None:
+            yield _sse("output", chunk)
+
+        try:
+            result = task.result()
+        except Exception as e:
+            result = {"status": "error", "result": {"error": f"Execution failed: {str(e)}"}}
+        if "profile" in result:
+            await _save_profile(function.id, result["profile"], profile_collapsed)
+        row = crud.execution_log_row(function.id, result)
+        function_stats.record(row)
+        if not log_writer.submit(row):
+            await _save_logs([row])
+        yield _sse("result", {"status": "success", "result": result})
+    finally:
+        # The client went away: drop the execution if it has not started yet
+        if not task.done():
+            task.cancel()
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/functions/{id}/execute:batch", tags=["execution"])
+async def execute_function_batch(id: int, batch: schemas.BatchExecuteRequest,
+                                 db: AsyncSession = Depends(get_async_db)):
+    """Run the function once per event and stream results back as NDJSON in completion order"""
+    if len(batch.events) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {BATCH_MAX_SIZE} events")
+
+    # Resolve the function once for the whole batch
+    function = await function_cache.get_async(db, id)
+    if not function:
+        raise HTTPException(status_code=404, detail="Function not found")
+    parallelism = max(1, min(batch.parallelism or BATCH_MAX_PARALLELISM, BATCH_MAX_PARALLELISM))
+
+    return StreamingResponse(
+        _run_batch(function, batch.events, parallelism),
+        media_type="application/x-ndjson"
+    )
+
+async def _run_batch(function, events, parallelism):
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def run_one(index, event):
+        async with semaphore:
+            deadline = time.monotonic() + BATCH_QUEUE_WAIT
+            while True:
+                try:
+                    timings = InvocationTimings()
+                    timings.queued()
+                    # Batch items yield to interactive calls instead of competing with them
+                    result = await result_cache.run(
+                        function, event, lambda: _submit(function, event, None, timings, priority=BATCH)
+                    )
+                    break
+                except QueueFullError as e:
+                    # The shared queue is saturated, back off instead of failing the item, for a while
+                    if time.monotonic() >= deadline:
+                        result = {"status": "error", "result": {
+                            "error": f"Too many executions queued, gave up after {BATCH_QUEUE_WAIT:g} seconds"
+                        }}
+                        break
+                    await asyncio.sleep(min(e.retry_after, 1, max(0.0, deadline - time.monotonic())))
+                except Exception as e:
+                    result = {"status": "error", "result": {"error": f"Execution failed: {str(e)}"}}
+                    break
+        return index, result
+
+    logs = []
+    tasks = [asyncio.create_task(run_one(i, event)) for i, event in enumerate(events)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result = await next_done
+            if _executed(result):
+                logs.append(crud.execution_log_row(function.id, result))
+                function_stats.record(logs[-1])
+            line = {"index": index, "status": result_status(result), "result": result}
+            yield json.dumps(line) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        # One bulk insert for the whole batch instead of a commit per item
+        if logs:
+            await _save_logs(logs)
+
+async def _save_logs(logs):
+    async with AsyncSessionLocal() as db:
+        await crud.create_execution_logs_async(db, logs)
+
 @router.get("/functions/{id}/logs", tags=["execution"])
-async def get_function_logs(id: int, db: Session = Depends(get_db)):
-    # Fetching logs for the function
-    logs = crud.get_logs_for_function(db, function_id=id)
-    if not logs:
+def get_function_logs(id: int, params: LogQueryParams = Depends(), db: Session = Depends(get_db)):
+    if params.format == "ndjson":
+        return stream_logs(id, params)
+
+    # Fetching one page of logs for the function
+    logs, next_cursor = crud.get_logs_for_function(
+        db, function_id=id, limit=params.limit, cursor=params.cursor, **params.filters
+    )
+    if not logs and params.cursor is None:
         raise HTTPException(status_code=404, detail="Logs not found")
 
-    return {"status": "success", "logs": logs}
+    return {"status": "success", "logs": logs, "next_cursor": next_cursor}
+
+@router.get("/functions/{id}/rollups", response_model=List[schemas.ExecutionRollup], tags=["execution"])
+def get_function_rollups(id: int, interval: int = Query(3600), since: Optional[datetime.datetime] = None,
+                         until: Optional[datetime.datetime] = None, limit: int = Query(1000, ge=1, le=10000),
+                         db: Session = Depends(get_db)):
+    if interval not in crud.ROLLUP_INTERVALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"interval must be one of {', '.join(str(i) for i in crud.ROLLUP_INTERVALS)}"
+        )
+
+    # Pre-aggregated, so this stays cheap no matter how many raw logs the range covers
+    rollups = crud.get_rollups(db, function_id=id, interval_seconds=interval, since=since, until=until, limit=limit)
+    bounds = [None if bound == float("inf") else bound for bound in crud.ROLLUP_DURATION_BUCKETS]
+    return [
+        schemas.ExecutionRollup(
+            function_id=rollup.function_id,
+            interval_seconds=rollup.interval_seconds,
+            bucket_start=rollup.bucket_start,
+            invocations=rollup.invocations,
+            errors=rollup.errors,
+            duration_sum=rollup.duration_sum,
+            duration_min=rollup.duration_min,
+            duration_max=rollup.duration_max,
+            avg_duration=rollup.duration_sum / rollup.invocations if rollup.invocations else None,
+            error_rate=rollup.errors / rollup.invocations if rollup.invocations else 0.0,
+            histogram=rollup.histogram,
+            histogram_buckets=bounds
+        )
+        for rollup in rollups
+    ]
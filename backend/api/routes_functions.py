@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from backend import crud, schemas
 from backend.db import get_db
+from backend.api.log_queries import LogQueryParams, stream_logs
+from backend.api.responses import etag_response
+from backend.engine.backends import EXECUTOR_BACKENDS
+from backend.engine.dependency_images import option_dependencies
+from backend.engine.executor import get_docker_executor, get_executor, started_executors, RUNTIME_MODES
+from backend.engine.dispatcher import execution_dispatcher
+from backend.function_cache import function_cache
+from backend.result_cache import result_cache
 
 router = APIRouter()
 
@@ -11,7 +19,31 @@ router = APIRouter()
 @router.post("/", response_model=schemas.Function, status_code=status.HTTP_201_CREATED)
 def create_function(function: schemas.FunctionCreate, db: Session = Depends(get_db)):
     """Create a new serverless function"""
-    return crud.create_function(db=db, function=function)
+    if function.runtime_mode not in RUNTIME_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown runtime mode: {function.runtime_mode}")
+    if function.runtime_mode == "handler" and function.language.lower() != "python":
+        raise HTTPException(status_code=400, detail="Handler mode is only supported for Python functions")
+    if function.output_limit is not None and function.output_limit <= 0:
+        raise HTTPException(status_code=400, detail="output_limit must be a positive number of bytes")
+    if function.memory_mb < 16:
+        raise HTTPException(status_code=400, detail="memory_mb must be at least 16")
+    if function.reserved_concurrency < 0:
+        raise HTTPException(status_code=400, detail="reserved_concurrency cannot be negative")
+    if function.max_concurrency is not None and function.max_concurrency < max(1, function.reserved_concurrency):
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1 and reserved_concurrency")
+    if function.backend is not None and function.backend.lower() not in EXECUTOR_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown executor backend: {function.backend}")
+    if (function.backend or "").lower() == "process" and function.dependencies:
+        raise HTTPException(status_code=400, detail="Functions with dependencies need the docker backend")
+    options = option_dependencies(function.dependencies)
+    if options:
+        raise HTTPException(status_code=400,
+                            detail=f"Installer options are not allowed in dependencies: {', '.join(options)}")
+    db_function = crud.create_function(db=db, function=function)
+    execution_dispatcher.configure(db_function)
+    # Cache the code and start any dependency build now, so invocations never pay for it
+    get_executor(db_function).prepare(db_function)
+    return db_function
 
 
 @router.get("/", response_model=List[schemas.Function])
@@ -21,6 +53,19 @@ def read_functions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db
     return functions
 
 
+@router.get("/summary", response_model=schemas.FunctionSummaryPage)
+def read_function_summaries(request: Request, limit: int = Query(100, ge=1, le=1000),
+                            cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+                            name: Optional[str] = Query(None, description="Only functions whose name contains this"),
+                            language: Optional[str] = Query(None, description="Only functions in this language"),
+                            db: Session = Depends(get_db)):
+    """List functions without their code; sends 304 when If-None-Match has the page's ETag"""
+    functions, next_cursor = crud.get_function_summaries(
+        db, limit=limit, cursor=cursor, name=name, language=language
+    )
+    return etag_response(request, {"functions": functions, "next_cursor": next_cursor})
+
+
 @router.get("/{function_id}", response_model=schemas.Function)
 def read_function(function_id: int, db: Session = Depends(get_db)):
     """Get a specific serverless function by ID"""
@@ -36,17 +81,37 @@ def delete_function(function_id: int, db: Session = Depends(get_db)):
     success = crud.delete_function(db, id=function_id)
     if not success:
         raise HTTPException(status_code=404, detail="Function not found")
+    function_cache.invalidate(function_id)
+    result_cache.invalidate(function_id)
+    for executor in started_executors():
+        executor.deprovision(function_id)
+    execution_dispatcher.forget(function_id)
     return None
 
 
+@router.get("/{function_id}/dependencies")
+def read_function_dependencies(function_id: int, db: Session = Depends(get_db)):
+    """Get the build status of a function's dependency image"""
+    db_function = crud.get_function(db, id=function_id)
+    return get_docker_executor().dependencies.status(db_function)
+
+
 @router.get("/{function_id}/logs", response_model=List[schemas.ExecutionLog])
-def read_function_logs(function_id: int, db: Session = Depends(get_db)):
-    """Get all execution logs for a specific function"""
+def read_function_logs(function_id: int, response: Response, params: LogQueryParams = Depends(),
+                       db: Session = Depends(get_db)):
+    """Get a page of execution logs for a specific function, newest first"""
     # First verify the function exists
     db_function = crud.get_function(db, id=function_id)
     if db_function is None:
         raise HTTPException(status_code=404, detail="Function not found")
 
-    # Get the logs
-    logs = crud.get_logs_for_function(db, function_id=function_id)
+    if params.format == "ndjson":
+        return stream_logs(function_id, params)
+
+    # Get the logs; the cursor for the next page goes in a header to keep the body a plain list
+    logs, next_cursor = crud.get_logs_for_function(
+        db, function_id=function_id, limit=params.limit, cursor=params.cursor, **params.filters
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return logs
\ No newline at end of file
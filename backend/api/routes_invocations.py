@@ -0,0 +1,55 @@
+import json
+from typing import Any, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import crud, schemas
+from backend.db import get_db, get_async_db
+from backend.api.routes_execution import execute_function, PROFILE_DESCRIPTION, PROFILE_COLLAPSED_DESCRIPTION
+from backend.function_cache import function_cache
+
+router = APIRouter()
+
+
+@router.post("/functions/{id}/invoke", tags=["invocations"])
+async def invoke_function(id: int, mode: str = "sync", event: Optional[Any] = Body(None),
+                          db: AsyncSession = Depends(get_async_db),
+                          profile: bool = Query(False, description=PROFILE_DESCRIPTION),
+                          profile_collapsed: bool = Query(False, description=PROFILE_COLLAPSED_DESCRIPTION)):
+    """Invoke a function synchronously, or queue it for a worker with mode=async"""
+    if mode == "sync":
+        return await execute_function(id, event, db, profile, profile_collapsed)
+    if mode != "async":
+        raise HTTPException(status_code=400, detail=f"Unknown invocation mode: {mode}")
+    if profile:
+        # The result of a queued invocation is not returned to the caller, so neither would its profile be
+        raise HTTPException(status_code=400, detail="profile is only supported with mode=sync")
+
+    # Make sure the function exists before queueing anything
+    await function_cache.get_async(db, id)
+    invocation = await crud.create_invocation_async(db, id, event)
+
+    return JSONResponse(
+        status_code=202,
+        content={"status": "queued", "invocation_id": invocation.id},
+        headers={"Location": f"/invocations/{invocation.id}"}
+    )
+
+
+@router.get("/invocations/{id}", response_model=schemas.Invocation, tags=["invocations"])
+def read_invocation(id: int, db: Session = Depends(get_db)):
+    """Get the status and, once finished, the result of an invocation"""
+    invocation = crud.get_invocation(db, id=id)
+    return schemas.Invocation(
+        id=invocation.id,
+        function_id=invocation.function_id,
+        status=invocation.status,
+        attempts=invocation.attempts or 0,
+        result=json.loads(invocation.result) if invocation.result else None,
+        created_at=invocation.created_at,
+        started_at=invocation.started_at,
+        completed_at=invocation.completed_at
+    )
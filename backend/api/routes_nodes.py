@@ -0,0 +1,35 @@
+import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from backend import crud, schemas
+from backend.db import get_db
+from backend.engine.router import WORKER_NODE_TTL
+
+router = APIRouter()
+
+
+@router.get("/nodes", response_model=List[schemas.WorkerNode], tags=["nodes"])
+def read_nodes(db: Session = Depends(get_db)):
+    """Registered execution nodes with their last reported load"""
+    live_since = datetime.datetime.utcnow() - datetime.timedelta(seconds=WORKER_NODE_TTL)
+    return [
+        schemas.WorkerNode(
+            id=node.id,
+            url=node.url,
+            workers=node.workers or 0,
+            memory_capacity_mb=node.memory_capacity_mb or 0,
+            busy=node.busy or 0,
+            queued=node.queued or 0,
+            memory_in_use_mb=node.memory_in_use_mb or 0,
+            warm_functions=len(node.warm_functions or {}),
+            artifacts=len(node.artifacts or []),
+            images=len(node.images or []),
+            live=node.last_heartbeat >= live_since,
+            started_at=node.started_at,
+            last_heartbeat=node.last_heartbeat
+        )
+        for node in crud.get_worker_nodes(db)
+    ]
@@ -0,0 +1,31 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from backend import crud, schemas
+from backend.db import get_db
+
+router = APIRouter()
+
+
+@router.get("/functions/{id}/profiles", response_model=List[schemas.ExecutionProfile], tags=["profiles"])
+def read_function_profiles(id: int, limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db)):
+    """The function's most recent profiled invocations, newest first"""
+    return crud.get_execution_profiles(db, function_id=id, limit=limit)
+
+
+@router.get("/profiles/{id}", response_model=schemas.ExecutionProfile, tags=["profiles"])
+def read_profile(id: int, db: Session = Depends(get_db)):
+    return crud.get_execution_profile(db, id=id)
+
+
+@router.get("/profiles/{id}/collapsed", response_class=PlainTextResponse, tags=["profiles"])
+def read_profile_collapsed(id: int, db: Session = Depends(get_db)):
+    """The profile's stacks in collapsed format, for flamegraph.pl, speedscope or inferno"""
+    profile = crud.get_execution_profile(db, id=id)
+    return PlainTextResponse(
+        profile.collapsed or "",
+        headers={"Content-Disposition": f'attachment; filename="profile-{id}.folded"'}
+    )
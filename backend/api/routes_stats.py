@@ -0,0 +1,23 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from backend import schemas
+from backend.db import get_db
+from backend.stats import function_stats, summarize, LatencySketch
+
+router = APIRouter()
+
+
+@router.get("/stats/functions", response_model=List[schemas.FunctionStatsSummary], tags=["stats"])
+def read_function_stats(db: Session = Depends(get_db)):
+    """Invocations, error rate and latency percentiles of every function that has run"""
+    return function_stats.summaries(db)
+
+
+@router.get("/stats/functions/{function_id}", response_model=schemas.FunctionStatsSummary, tags=["stats"])
+def read_function_stats_by_id(function_id: int, db: Session = Depends(get_db)):
+    """Invocations, error rate and latency percentiles of one function (zeros if it never ran)"""
+    summaries = function_stats.summaries(db, function_id)
+    return summaries[0] if summaries else summarize(function_id, 0, 0, LatencySketch())
@@ -1,12 +1,34 @@
-from sqlalchemy.orm import Session
-import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import or_, and_, func, insert, select, text, tuple_
+import base64
+import datetime
+import json
+import os
 from . import models, schemas
+from .tracing import current_trace_id
 from fastapi import HTTPException
 
+# Postgres channel API processes LISTEN on to invalidate cached function definitions
+FUNCTION_CHANGES_CHANNEL = "function_changes"
+
+# Bucket widths (seconds) of the per-function rollups kept next to the raw logs
+ROLLUP_INTERVALS = tuple(int(i) for i in os.getenv("ROLLUP_INTERVALS", "60,3600").split(",") if i.strip())
+# Upper bounds (seconds) of the rollup duration histogram buckets; the last one catches everything
+ROLLUP_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+def _notify_function_changed(db: Session, id: int):
+    # Delivered by Postgres only when the surrounding transaction commits
+    db.execute(text("SELECT pg_notify(:channel, :payload)"),
+               {"channel": FUNCTION_CHANGES_CHANNEL, "payload": str(id)})
+
 # Function CRUD operations
 def create_function(db: Session, function: schemas.FunctionCreate):
     db_function = models.Function(**function.dict())
     db.add(db_function)
+    db.flush()
+    _notify_function_changed(db, db_function.id)
     db.commit()
     db.refresh(db_function)
     return db_function
@@ -22,10 +44,71 @@ def get_all_functions(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Function).offset(skip).limit(limit).all()
 
 
+FUNCTION_SUMMARY_COLUMNS = (
+    models.Function.id,
+    models.Function.name,
+    models.Function.description,
+    models.Function.language,
+    models.Function.runtime_mode,
+    models.Function.timeout,
+    models.Function.memory_mb,
+    models.Function.backend,
+    models.Function.cacheable,
+    models.Function.created_at,
+)
+
+
+def get_function_summaries(db: Session, limit: int = 100, cursor: str = None,
+                           name: str = None, language: str = None):
+    """
+    One page of functions without their code, in id order, using keyset pagination.
+
+    `name` matches case-insensitively anywhere in the name. Returns (functions,
+    next_cursor); next_cursor is None on the last page.
+    """
+    query = select(*FUNCTION_SUMMARY_COLUMNS)
+    if cursor:
+        query = query.where(models.Function.id > decode_function_cursor(cursor))
+    if name:
+        query = query.where(models.Function.name.ilike(f"%{_escape_like(name)}%", escape="\\"))
+    if language:
+        query = query.where(func.lower(models.Function.language) == language.lower())
+
+    # Fetch one extra row to find out whether there is another page
+    rows = db.execute(query.order_by(models.Function.id).limit(limit + 1)).all()
+    functions = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = encode_function_cursor(functions[-1]["id"]) if len(rows) > limit else None
+    return functions, next_cursor
+
+
+def encode_function_cursor(id: int):
+    return base64.urlsafe_b64encode(str(id).encode()).decode()
+
+
+def decode_function_cursor(cursor: str):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _escape_like(value: str):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_provisioned_functions(db: Session):
+    return db.query(models.Function).filter(models.Function.provisioned_concurrency > 0).all()
+
+
+def get_reserved_functions(db: Session):
+    return db.query(models.Function).filter(models.Function.reserved_concurrency > 0).all()
+
+
 def delete_function(db: Session, id: int):
     db_function = get_function(db, id)
     try:
         db.delete(db_function)
+        _notify_function_changed(db, id)
         db.commit()
         return True
     except Exception as e:
@@ -37,30 +120,382 @@ def delete_function(db: Session, id: int):
 def create_execution_log(db: Session, log: schemas.ExecutionLogCreate):
     db_log = models.ExecutionLog(**log.dict())
     db.add(db_log)
+    db.flush()
+    update_rollups(db, [{**log.dict(), "created_at": db_log.created_at}])
     db.commit()
     db.refresh(db_log)
     return db_log
 
 
-def get_logs_for_function(db: Session, function_id: int):
-    return db.query(models.ExecutionLog).filter(
-        models.ExecutionLog.function_id == function_id
-    ).all()
+LOG_SUMMARY_COLUMNS = (
+    models.ExecutionLog.id,
+    models.ExecutionLog.function_id,
+    models.ExecutionLog.status,
+    models.ExecutionLog.execution_time,
+    models.ExecutionLog.timings,
+    models.ExecutionLog.resources,
+    models.ExecutionLog.trace_id,
+    models.ExecutionLog.profile_id,
+    models.ExecutionLog.created_at,
+)
+LOG_TEXT_COLUMNS = (models.ExecutionLog.error_log, models.ExecutionLog.output)
 
 
-def log_execution_result(db: Session, function_id: int, result: dict):
-    # Extract data from result
-    status = "success" if "output" in result else "failure"
-    error_log = result.get("error", None)
+def encode_log_cursor(created_at: datetime.datetime, id: int):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_log_cursor(cursor: str):
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _logs_query(function_id: int, status=None, since=None, until=None, include_output=False):
+    """Newest-first query over (function_id, created_at, id), matching the composite index"""
+    columns = LOG_SUMMARY_COLUMNS + (LOG_TEXT_COLUMNS if include_output else ())
+    query = select(*columns).where(models.ExecutionLog.function_id == function_id)
+    if status:
+        query = query.where(models.ExecutionLog.status == status)
+    if since:
+        query = query.where(models.ExecutionLog.created_at >= since)
+    if until:
+        query = query.where(models.ExecutionLog.created_at < until)
+    return query.order_by(models.ExecutionLog.created_at.desc(), models.ExecutionLog.id.desc())
+
+
+def get_logs_for_function(db: Session, function_id: int, limit: int = 100, cursor: str = None,
+                          status: str = None, since: datetime.datetime = None,
+                          until: datetime.datetime = None, include_output: bool = False):
+    """
+    One page of a function's logs, newest first, using keyset pagination.
+
+    Returns (logs, next_cursor); next_cursor is None on the last page. The output and
+    error_log text columns are only loaded when include_output is set.
+    """
+    query = _logs_query(function_id, status, since, until, include_output)
+    if cursor:
+        created_at, id = decode_log_cursor(cursor)
+        query = query.where(
+            tuple_(models.ExecutionLog.created_at, models.ExecutionLog.id) < tuple_(created_at, id)
+        )
+
+    # Fetch one extra row to find out whether there is another page
+    rows = db.execute(query.limit(limit + 1)).all()
+    logs = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = logs[-1]
+        next_cursor = encode_log_cursor(last["created_at"], last["id"])
+    return logs, next_cursor
+
+
+def iter_logs_for_function(db: Session, function_id: int, status: str = None,
+                           since: datetime.datetime = None, until: datetime.datetime = None,
+                           include_output: bool = False, batch_size: int = 1000):
+    """Stream every matching log through a server-side cursor without loading them all"""
+    query = _logs_query(function_id, status, since, until, include_output)
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for row in result:
+        yield dict(row._mapping)
+
+
+def create_execution_logs(db: Session, rows: list):
+    """Insert many execution log rows (dicts from execution_log_row) in one statement and commit"""
+    if not rows:
+        return 0
+    db.execute(insert(models.ExecutionLog), rows)
+    update_rollups(db, rows)
+    db.commit()
+    return len(rows)
+
+
+_ROLLUP_UPSERT = text("""
+    INSERT INTO execution_rollups AS r
+        (function_id, interval_seconds, bucket_start, invocations, errors,
+         duration_sum, duration_min, duration_max, histogram)
+    VALUES
+        (:function_id, :interval_seconds, :bucket_start, :invocations, :errors,
+         :duration_sum, :duration_min, :duration_max, :histogram)
+    ON CONFLICT (function_id, interval_seconds, bucket_start) DO UPDATE SET
+        invocations = r.invocations + excluded.invocations,
+        errors = r.errors + excluded.errors,
+        duration_sum = r.duration_sum + excluded.duration_sum,
+        duration_min = LEAST(r.duration_min, excluded.duration_min),
+        duration_max = GREATEST(r.duration_max, excluded.duration_max),
+        histogram = ARRAY(
+            SELECT t.a + t.b
+            FROM unnest(r.histogram, excluded.histogram) WITH ORDINALITY AS t(a, b, i)
+            ORDER BY t.i
+        )
+""")
+
+
+def _bucket_start(created_at: datetime.datetime, interval_seconds: int):
+    epoch = int((created_at - datetime.datetime(1970, 1, 1)).total_seconds())
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=epoch - epoch % interval_seconds)
+
+
+def update_rollups(db: Session, rows: list):
+    """
+    Fold execution log rows into the per-function rollups, in the caller's transaction.
+
+    Rows are pre-aggregated per bucket here, so a batch costs one upsert per
+    (function, interval, bucket) rather than one per log.
+    """
+    buckets = _rollup_buckets(rows)
+    if buckets:
+        db.execute(_ROLLUP_UPSERT, buckets)
+
+
+def _rollup_buckets(rows: list):
+    buckets = {}
+    for row in rows:
+        created_at = row.get("created_at") or datetime.datetime.utcnow()
+        duration = row.get("execution_time")
+        for interval_seconds in ROLLUP_INTERVALS:
+            key = (row["function_id"], interval_seconds, _bucket_start(created_at, interval_seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    "function_id": key[0], "interval_seconds": key[1], "bucket_start": key[2],
+                    "invocations": 0, "errors": 0, "duration_sum": 0.0,
+                    "duration_min": None, "duration_max": None,
+                    "histogram": [0] * len(ROLLUP_DURATION_BUCKETS),
+                }
+            bucket["invocations"] += 1
+            if row.get("status") != "success":
+                bucket["errors"] += 1
+            if duration is not None:
+                bucket["duration_sum"] += duration
+                bucket["duration_min"] = duration if bucket["duration_min"] is None else min(bucket["duration_min"], duration)
+                bucket["duration_max"] = duration if bucket["duration_max"] is None else max(bucket["duration_max"], duration)
+                bucket["histogram"][next(i for i, bound in enumerate(ROLLUP_DURATION_BUCKETS) if duration <= bound)] += 1
+
+    # A consistent order keeps concurrent writers from deadlocking on the same buckets
+    return [buckets[key] for key in sorted(buckets)]
+
+
+def get_rollups(db: Session, function_id: int, interval_seconds: int,
+                since: datetime.datetime = None, until: datetime.datetime = None, limit: int = 1000):
+    """A function's rollup buckets for one interval, oldest first"""
+    query = db.query(models.ExecutionRollup).filter(
+        models.ExecutionRollup.function_id == function_id,
+        models.ExecutionRollup.interval_seconds == interval_seconds
+    )
+    if since:
+        query = query.filter(models.ExecutionRollup.bucket_start >= since)
+    if until:
+        query = query.filter(models.ExecutionRollup.bucket_start < until)
+    return query.order_by(models.ExecutionRollup.bucket_start).limit(limit).all()
+
+
+def execution_log_row(function_id: int, result: dict):
+    """Plain dict for an execution log, cheap enough to build on the request path"""
+    # Executor results wrap output/error in a nested "result" dict
+    data = result.get("result", result)
+    status = "success" if "output" in data else "failure"
+    error_log = data.get("error", None)
 
-    # Create the log entry using the ExecutionLogCreate schema
-    log_data = {
+    return {
         "function_id": function_id,
         "status": status,
-        "execution_time": time.time(),  # You might want to pass actual execution time
+        # Wall-clock seconds measured by execute_function_engine
+        "execution_time": result.get("execution_time", 0.0),
+        "timings": result.get("timings"),
+        "resources": result.get("resources"),
         "error_log": error_log if error_log else None,
-        "output": result.get("output", None)
+        "output": data.get("output", None),
+        "trace_id": current_trace_id(),
+        "profile_id": (result.get("profile") or {}).get("id"),
+        # Stamped now, since buffered rows may be inserted a while later
+        "created_at": datetime.datetime.utcnow()
     }
 
-    log_entry = schemas.ExecutionLogCreate(**log_data)
-    return create_execution_log(db, log_entry)
\ No newline at end of file
+
+def log_execution_result(db: Session, function_id: int, result: dict):
+    row = execution_log_row(function_id, result)
+    row.pop("created_at")
+    log_entry = schemas.ExecutionLogCreate(**row)
+    return create_execution_log(db, log_entry)
+
+
+_FUNCTION_STATS_INSERT = text("""
+    INSERT INTO function_stats (function_id, invocations, errors)
+    SELECT id, 0, 0 FROM functions WHERE id = ANY(:ids)
+    ON CONFLICT (function_id) DO NOTHING
+""")
+
+
+def lock_function_stats(db: Session, function_ids: list):
+    """
+    The function_stats rows of these functions, created if missing and locked for update
+    until the caller commits. Functions that no longer exist are left out.
+    """
+    db.execute(_FUNCTION_STATS_INSERT, {"ids": list(function_ids)})
+    rows = db.query(models.FunctionStats).filter(
+        models.FunctionStats.function_id.in_(function_ids)
+    ).order_by(models.FunctionStats.function_id).with_for_update().all()
+    return {row.function_id: row for row in rows}
+
+
+def get_function_stats(db: Session, function_id: int = None):
+    query = db.query(models.FunctionStats)
+    if function_id is not None:
+        query = query.filter(models.FunctionStats.function_id == function_id)
+    return query.all()
+
+
+# Async versions of the operations on the hot request paths, for use on the event loop
+async def get_function_async(db: AsyncSession, id: int):
+    function = (await db.execute(select(models.Function).where(models.Function.id == id))).scalars().first()
+    if function is None:
+        raise HTTPException(status_code=404, detail=f"Function with id {id} not found")
+    return function
+
+
+async def get_function_backends_async(db: AsyncSession):
+    """Executor backends set on any function; None stands for functions on the platform default"""
+    return set((await db.execute(select(models.Function.backend).distinct())).scalars())
+
+
+async def create_execution_logs_async(db: AsyncSession, rows: list):
+    """Like create_execution_logs, without a worker thread"""
+    if not rows:
+        return 0
+    await db.execute(insert(models.ExecutionLog), rows)
+    buckets = _rollup_buckets(rows)
+    if buckets:
+        await db.execute(_ROLLUP_UPSERT, buckets)
+    await db.commit()
+    return len(rows)
+
+
+async def create_invocation_async(db: AsyncSession, function_id: int, payload=None):
+    db_invocation = models.Invocation(
+        function_id=function_id,
+        status="queued",
+        payload=json.dumps(payload) if payload is not None else None
+    )
+    db.add(db_invocation)
+    await db.commit()
+    await db.refresh(db_invocation)
+    return db_invocation
+
+
+async def create_execution_profile_async(db: AsyncSession, function_id: int, profile: dict):
+    """Store a profile as built by profiling.build_profile and return its id"""
+    db_profile = models.ExecutionProfile(
+        function_id=function_id,
+        report={key: value for key, value in profile.items() if key != "collapsed"},
+        collapsed=profile.get("collapsed"),
+        trace_id=current_trace_id()
+    )
+    db.add(db_profile)
+    await db.commit()
+    return db_profile.id
+
+
+# Execution profile operations
+def get_execution_profile(db: Session, id: int):
+    profile = db.query(models.ExecutionProfile).filter(models.ExecutionProfile.id == id).first()
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile with id {id} not found")
+    return profile
+
+
+def get_execution_profiles(db: Session, function_id: int, limit: int = 20):
+    """A function's most recent profiles, without their collapsed stacks"""
+    return db.query(models.ExecutionProfile).options(defer(models.ExecutionProfile.collapsed)).filter(
+        models.ExecutionProfile.function_id == function_id
+    ).order_by(models.ExecutionProfile.id.desc()).limit(limit).all()
+
+
+# Invocation queue operations
+def create_invocation(db: Session, function_id: int, payload=None):
+    db_invocation = models.Invocation(
+        function_id=function_id,
+        status="queued",
+        payload=json.dumps(payload) if payload is not None else None
+    )
+    db.add(db_invocation)
+    db.commit()
+    db.refresh(db_invocation)
+    return db_invocation
+
+
+def get_invocation(db: Session, id: int):
+    invocation = db.query(models.Invocation).filter(models.Invocation.id == id).first()
+    if invocation is None:
+        raise HTTPException(status_code=404, detail=f"Invocation with id {id} not found")
+    return invocation
+
+
+def claim_invocation(db: Session, worker_id: str, lease_grace: int = 30):
+    """
+    Claim the oldest queued invocation, or a running one whose worker lease expired.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never claim the same row.
+    """
+    now = datetime.datetime.utcnow()
+    invocation = db.query(models.Invocation).filter(
+        or_(
+            models.Invocation.status == "queued",
+            and_(models.Invocation.status == "running", models.Invocation.lease_expires_at < now)
+        )
+    ).order_by(models.Invocation.id).with_for_update(skip_locked=True).first()
+
+    if invocation is None:
+        db.commit()
+        return None
+
+    timeout = invocation.function.timeout or 30
+    invocation.status = "running"
+    invocation.worker_id = worker_id
+    invocation.attempts = (invocation.attempts or 0) + 1
+    invocation.started_at = now
+    invocation.lease_expires_at = now + datetime.timedelta(seconds=timeout + lease_grace)
+    db.commit()
+    db.refresh(invocation)
+    return invocation
+
+
+def complete_invocation(db: Session, invocation: models.Invocation, result: dict):
+    invocation.status = "succeeded" if result.get("status") == "success" else "failed"
+    invocation.result = json.dumps(result)
+    invocation.completed_at = datetime.datetime.utcnow()
+    invocation.lease_expires_at = None
+    db.commit()
+    db.refresh(invocation)
+    return invocation
+
+
+# Worker node registry
+def heartbeat_worker_node(db: Session, node: dict):
+    """Register a worker node, or refresh its load and warm state"""
+    node = dict(node, last_heartbeat=datetime.datetime.utcnow())
+    db_node = db.get(models.WorkerNode, node["id"])
+    if db_node is None:
+        db_node = models.WorkerNode(started_at=node["last_heartbeat"])
+        db.add(db_node)
+    for key, value in node.items():
+        setattr(db_node, key, value)
+    db.commit()
+    return db_node
+
+
+def get_worker_nodes(db: Session):
+    return db.query(models.WorkerNode).order_by(models.WorkerNode.id).all()
+
+
+def get_live_worker_nodes(db: Session, ttl: float):
+    """Nodes that heartbeated within the last `ttl` seconds"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(seconds=ttl)
+    return db.query(models.WorkerNode).filter(models.WorkerNode.last_heartbeat >= since).all()
+
+
+def delete_worker_node(db: Session, id: str):
+    db.query(models.WorkerNode).filter(models.WorkerNode.id == id).delete()
+    db.commit()
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+
+from backend.metrics import (
+    ARTIFACT_CACHE_HITS, ARTIFACT_CACHE_MISSES, ARTIFACT_BYTES_WRITTEN, ARTIFACT_CACHE_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+# Must be a path the Docker daemon can see, since artifacts are bind-mounted from it
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", os.path.join(tempfile.gettempdir(), "serverless-artifacts"))
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+ARTIFACT_FILENAMES = {
+    "python": "function.py",
+    "javascript": "function.js",
+}
+
+
+def code_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class Artifact:
+    """An immutable, materialized copy of a function's code"""
+
+    def __init__(self, digest, path, filename):
+        self.digest = digest
+        self.path = path
+        self.filename = filename
+
+    def to_tar(self):
+        """Pack the artifact into an in-memory tar for container.put_archive"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(os.path.join(self.path, self.filename), arcname=self.filename)
+        return buffer.getvalue()
+
+
+class ArtifactStore:
+    """
+    Content-addressed cache of function code on local disk.
+
+    Each distinct code body is written once to <root>/<sha256>/ and shared by every
+    invocation and process on the host. Directories are published with an atomic
+    rename, and their mtime doubles as the last-used time for LRU eviction.
+    """
+
+    def __init__(self, root=ARTIFACT_ROOT, max_bytes=ARTIFACT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, mode=0o755, exist_ok=True)
+
+    def materialize(self, code, language):
+        """Return the artifact for this code, writing it only if it is not cached yet"""
+        filename = ARTIFACT_FILENAMES[language.lower()]
+        # The same source under a different runtime is a different artifact
+        digest = code_hash(f"{filename}\0{code}")
+        path = os.path.join(self.root, digest)
+
+        if os.path.isdir(path):
+            try:
+                os.utime(path)
+                ARTIFACT_CACHE_HITS.inc()
+                return Artifact(digest, path, filename)
+            except FileNotFoundError:
+                pass  # Evicted between the check and the touch, write it again
+
+        ARTIFACT_CACHE_MISSES.inc()
+        staging = tempfile.mkdtemp(prefix=f".{digest[:12]}-", dir=self.root)
+        data = code.encode("utf-8")
+        with open(os.path.join(staging, filename), "wb") as f:
+            f.write(data)
+        os.chmod(staging, 0o755)
+        os.chmod(os.path.join(staging, filename), 0o644)
+
+        try:
+            os.rename(staging, path)
+            ARTIFACT_BYTES_WRITTEN.inc(len(data))
+            logger.info(f"Stored artifact {digest[:12]} ({len(data)} bytes)")
+        except OSError:
+            # Another process published the same artifact first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict(keep=digest)
+        return Artifact(digest, path, filename)
+
+    def materialize_function(self, function):
+        # Cached function definitions carry their artifact, which saves hashing the code again
+        artifact = getattr(function, "artifact", None)
+        if artifact is not None:
+            try:
+                os.utime(artifact.path)
+                ARTIFACT_CACHE_HITS.inc()
+                return artifact
+            except FileNotFoundError:
+                pass
+        return self.materialize(function.code, function.language)
+
+    def digests(self, limit=1000):
+        """Digests of the artifacts cached here, most recently used first"""
+        try:
+            entries = [e for e in os.scandir(self.root) if e.is_dir() and not e.name.startswith(".")]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        return [e.name for e in entries[:limit]]
+
+    def evict(self, keep=None):
+        """Remove least recently used artifacts until the cache fits its disk budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                size = _dir_size(entry.path)
+                total += size
+                entries.append((entry.stat().st_mtime, entry.name, size))
+
+            entries.sort()
+            for _, digest, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                shutil.rmtree(os.path.join(self.root, digest), ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted artifact {digest[:12]}")
+            ARTIFACT_CACHE_BYTES.set(total)
+
+
+def _dir_size(path):
+    size = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            size += entry.stat().st_size
+    return size
+
+
+# Export a singleton for app-wide use
+artifact_store = ArtifactStore()
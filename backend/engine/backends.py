@@ -0,0 +1,37 @@
+import os
+
+# Where functions run; chosen per function, "docker" unless set otherwise
+EXECUTOR_BACKENDS = ("docker", "process")
+DEFAULT_EXECUTOR_BACKEND = os.getenv("DEFAULT_EXECUTOR_BACKEND", "docker").lower()
+
+
+class ExecutorBackend:
+    """
+    Interface every execution backend implements.
+
+    execute_function() returns the executor result format:
+    {"status": "success"|"error", "result": {"output"|"error": ..., "truncated": ...}}
+    plus "resources" when the backend can account for them, and "profile" when
+    profile was asked for.
+    """
+
+    name = None
+
+    def execute_function(self, function, event=None, on_output=None, profile=False):
+        raise NotImplementedError
+
+    def prepare(self, function):
+        """Deploy-time work, so the first invocation does not pay for it"""
+
+    def provision(self, function):
+        """Reserve capacity for the function's provisioned concurrency"""
+
+    def deprovision(self, function_id):
+        """Release anything held for a deleted function"""
+
+    def shutdown(self):
+        """Release everything held by the backend"""
+
+
+def backend_name(function):
+    return (getattr(function, "backend", None) or DEFAULT_EXECUTOR_BACKEND).lower()
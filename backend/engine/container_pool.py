@@ -0,0 +1,345 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from backend.metrics import WARM_POOL_HITS, WARM_POOL_MISSES, WARM_POOL_CONTAINERS
+from backend.engine.scheduler import DEFAULT_MEMORY_MB
+from backend.engine.timing import mark_cold_start
+from backend.tracing import span
+
+logger = logging.getLogger(__name__)
+
+POOL_MIN_SIZE = int(os.getenv("WARM_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("WARM_POOL_MAX_SIZE", "8"))
+POOL_IDLE_TTL = float(os.getenv("WARM_POOL_IDLE_TTL", "300"))
+POOL_MAINTENANCE_INTERVAL = float(os.getenv("WARM_POOL_MAINTENANCE_INTERVAL", "10"))
+
+# Keeps the container alive without doing anything; invocations are exec'd into it
+IDLE_COMMAND = ["tail", "-f", "/dev/null"]
+
+# Where the bound function's code is mounted inside pool containers, as for one-shot containers
+FUNCTION_MOUNT = "/app"
+
+
+class WarmContainer:
+    """A started, idle container that invocations get exec'd into"""
+
+    def __init__(self, container, workspace, supervised=False):
+        self.container = container
+        self.workspace = workspace
+        self.code_dir = os.path.join(workspace, "app")
+        self.socket_path = os.path.join(workspace, "run", "zygote.sock") if supervised else None
+        self.function_id = None
+        self.code_hash = None
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.invocations = 0
+
+    def load(self, function, artifact):
+        """Bind the container to a function, copying its code into the container's own mounted directory"""
+        if self.code_hash != artifact.digest:
+            for name in os.listdir(self.code_dir):
+                if name != artifact.filename:
+                    os.remove(os.path.join(self.code_dir, name))
+            # Copied rather than linked so the file gets a fresh mtime, which the zygote reloads on
+            staging = os.path.join(self.code_dir, f".{artifact.filename}.tmp")
+            shutil.copyfile(os.path.join(artifact.path, artifact.filename), staging)
+            os.chmod(staging, 0o644)
+            os.replace(staging, os.path.join(self.code_dir, artifact.filename))
+            self.code_hash = artifact.digest
+        self.function_id = getattr(function, "id", None)
+
+
+class ContainerPool:
+    """
+    Pool of pre-created containers for a single runtime image, mode and memory size.
+
+    Containers are started network-disabled and read-only with an idle command
+    (or a long-lived runtime supervisor). Each one gets a private host directory
+    mounted read-only at /app, which holds only the code of the function it is
+    bound to, so no function can read another's code. With runtime_dir, a private
+    writable directory is also mounted at /run/zygote for the supervisor's socket.
+    A container that served a function stays bound to that function, so it is
+    only reused for the same code.
+    """
+
+    def __init__(self, client, name, image, artifacts, command=IDLE_COMMAND, environment=None,
+                 runtime_dir=False, warmup=None, memory_mb=DEFAULT_MEMORY_MB, min_size=POOL_MIN_SIZE,
+                 max_size=POOL_MAX_SIZE, idle_ttl=POOL_IDLE_TTL):
+        self.client = client
+        self.name = name
+        self.image = image
+        self.artifacts = artifacts
+        self.command = command
+        self.environment = environment
+        self.runtime_dir = runtime_dir
+        # Called with a provisioned container after its code is loaded
+        self.warmup = warmup
+        self.memory_mb = memory_mb
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.idle_ttl = idle_ttl
+
+        self._idle = []
+        self._busy = 0
+        self._provisioned = {}  # function_id -> (function, count)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def size(self):
+        return len(self._idle) + self._busy
+
+    def start(self, interval=POOL_MAINTENANCE_INTERVAL):
+        """Fill the pool and start the background maintenance loop"""
+        self._thread = threading.Thread(
+            target=self._maintenance_loop, args=(interval,),
+            name=f"pool-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop maintenance and remove every idle container"""
+        self._stop.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for warm in idle:
+            self._destroy(warm)
+        self._update_gauges()
+
+    def acquire(self, function_id=None):
+        """
+        Take a container for an invocation.
+
+        Returns a WarmContainer, or None when the pool is at max size with nothing
+        reusable, in which case the caller should fall back to a one-shot container.
+        """
+        evicted = None
+        with self._lock:
+            warm = self._pop_idle(function_id)
+            if warm is not None:
+                self._busy += 1
+                WARM_POOL_HITS.labels(pool=self.name).inc()
+                self._update_gauges()
+                return warm
+
+            if self.size >= self.max_size:
+                evicted = self._pop_evictable()
+                if evicted is None:
+                    WARM_POOL_MISSES.labels(pool=self.name, reason="exhausted").inc()
+                    return None
+            self._busy += 1
+
+        if evicted is not None:
+            self._destroy_async(evicted)
+        WARM_POOL_MISSES.labels(pool=self.name, reason="cold").inc()
+        try:
+            warm = self._create()
+            mark_cold_start()
+            return warm
+        except Exception:
+            with self._lock:
+                self._busy -= 1
+            raise
+        finally:
+            self._update_gauges()
+
+    def release(self, warm, healthy=True):
+        """Return a container to the pool, or retire it if it is no longer usable"""
+        warm.last_used = time.time()
+        warm.invocations += 1
+        with self._lock:
+            self._busy -= 1
+            keep = healthy and not self._stop.is_set()
+            if keep:
+                self._idle.append(warm)
+        if not keep:
+            self._destroy_async(warm)
+        self._update_gauges()
+
+    def provision(self, function, count):
+        """Keep `count` containers pre-loaded with this function's code"""
+        with self._lock:
+            if count > 0:
+                self._provisioned[function.id] = (function, count)
+            else:
+                self._provisioned.pop(function.id, None)
+        threading.Thread(target=self._fill, daemon=True).start()
+
+    def deprovision(self, function_id):
+        """Drop the function's reservation and retire any containers bound to it"""
+        with self._lock:
+            self._provisioned.pop(function_id, None)
+            bound = [w for w in self._idle if w.function_id == function_id]
+            self._idle = [w for w in self._idle if w.function_id != function_id]
+        for warm in bound:
+            self._destroy_async(warm)
+        self._update_gauges()
+
+    def maintain(self):
+        """Run one round of health checks, idle reaping and refilling"""
+        self._health_check()
+        self._reap_idle()
+        self._fill()
+        self._update_gauges()
+
+    def _maintenance_loop(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Warm pool maintenance failed for {self.name}: {str(e)}")
+            self._stop.wait(interval)
+
+    def _pop_idle(self, function_id):
+        # Prefer a container that already has this function's code loaded
+        if function_id is not None:
+            for i, warm in enumerate(self._idle):
+                if warm.function_id == function_id:
+                    return self._idle.pop(i)
+        for i, warm in enumerate(self._idle):
+            if warm.function_id is None:
+                return self._idle.pop(i)
+        return None
+
+    def _pop_evictable(self):
+        """Pick the least recently used idle container not held for provisioned concurrency"""
+        candidates = [w for w in self._idle if not self._is_reserved(w)]
+        if not candidates:
+            return None
+        victim = min(candidates, key=lambda w: w.last_used)
+        self._idle.remove(victim)
+        return victim
+
+    def _is_reserved(self, warm):
+        """True if removing this container would drop its function below its provisioned count"""
+        entry = self._provisioned.get(warm.function_id)
+        if entry is None:
+            return False
+        bound = sum(1 for w in self._idle if w.function_id == warm.function_id)
+        return bound <= entry[1]
+
+    def _health_check(self):
+        with self._lock:
+            idle = list(self._idle)
+        for warm in idle:
+            try:
+                warm.container.reload()
+                healthy = warm.container.status == "running"
+            except Exception:
+                healthy = False
+            if not healthy:
+                logger.warning(f"Removing unhealthy warm container {warm.container.short_id}")
+                with self._lock:
+                    if warm in self._idle:
+                        self._idle.remove(warm)
+                self._destroy(warm)
+
+    def _reap_idle(self):
+        now = time.time()
+        reaped = []
+        with self._lock:
+            for warm in sorted(self._idle, key=lambda w: w.last_used):
+                if self.size <= self.min_size:
+                    break
+                if now - warm.last_used > self.idle_ttl and not self._is_reserved(warm):
+                    self._idle.remove(warm)
+                    reaped.append(warm)
+        for warm in reaped:
+            logger.info(f"Reaping idle warm container {warm.container.short_id}")
+            self._destroy(warm)
+
+    def _fill(self):
+        """Top up provisioned containers per function, then generic containers to min_size"""
+        with self._lock:
+            provisioned = list(self._provisioned.values())
+        for function, count in provisioned:
+            while True:
+                with self._lock:
+                    bound = sum(1 for w in self._idle if w.function_id == function.id)
+                    if bound >= count or self.size >= self.max_size:
+                        break
+                    self._busy += 1
+                try:
+                    warm = self._create()
+                    artifact = self.artifacts.materialize_function(function)
+                    warm.load(function, artifact)
+                    if self.warmup is not None:
+                        self.warmup(warm, artifact)
+                except Exception as e:
+                    logger.error(f"Failed to provision container for function {function.id}: {str(e)}")
+                    with self._lock:
+                        self._busy -= 1
+                    break
+                self._add_idle(warm)
+
+        while True:
+            with self._lock:
+                if self.size >= self.min_size:
+                    break
+                self._busy += 1
+            try:
+                warm = self._create()
+            except Exception as e:
+                logger.error(f"Failed to pre-warm {self.name}: {str(e)}")
+                with self._lock:
+                    self._busy -= 1
+                break
+            self._add_idle(warm)
+
+    def _add_idle(self, warm):
+        with self._lock:
+            self._busy -= 1
+            self._idle.append(warm)
+
+    def _create(self):
+        workspace = tempfile.mkdtemp(prefix="warm-")
+        os.chmod(workspace, 0o755)
+        code_dir = os.path.join(workspace, "app")
+        os.mkdir(code_dir)
+        os.chmod(code_dir, 0o755)
+        volumes = {code_dir: {'bind': FUNCTION_MOUNT, 'mode': 'ro'}}
+        if self.runtime_dir:
+            run_dir = os.path.join(workspace, "run")
+            os.mkdir(run_dir)
+            os.chmod(run_dir, 0o777)
+            volumes[run_dir] = {'bind': '/run/zygote', 'mode': 'rw'}
+
+        try:
+            with span("docker.containers.run", image=self.image, pool=self.name):
+                container = self.client.containers.run(
+                    image=self.image,
+                    command=self.command,
+                    volumes=volumes,
+                    environment=self.environment,
+                    detach=True,
+                    init=True,
+                    network_disabled=True,
+                    mem_limit=f'{self.memory_mb}m',
+                    cpu_quota=100000,
+                    read_only=True,
+                    labels={"serverless.pool": self.name}
+                )
+        except Exception:
+            shutil.rmtree(workspace, ignore_errors=True)
+            raise
+        logger.info(f"Started warm container {container.short_id} for {self.name}")
+        return WarmContainer(container, workspace, supervised=bool(self.runtime_dir))
+
+    def _destroy(self, warm):
+        try:
+            warm.container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Warm container cleanup failed: {str(e)}")
+        shutil.rmtree(warm.workspace, ignore_errors=True)
+
+    def _destroy_async(self, warm):
+        threading.Thread(target=self._destroy, args=(warm,), daemon=True).start()
+
+    def _update_gauges(self):
+        WARM_POOL_CONTAINERS.labels(pool=self.name, state="idle").set(len(self._idle))
+        WARM_POOL_CONTAINERS.labels(pool=self.name, state="busy").set(self._busy)
@@ -0,0 +1,256 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.metrics import DEPENDENCY_IMAGE_BUILDS, DEPENDENCY_IMAGE_BUILD_TIME, DEPENDENCY_IMAGE_BYTES
+
+logger = logging.getLogger(__name__)
+
+DEPENDENCY_IMAGE_MAX_BYTES = int(os.getenv("DEPENDENCY_IMAGE_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+DEPENDENCY_BUILD_WORKERS = int(os.getenv("DEPENDENCY_BUILD_WORKERS", "2"))
+
+BASE_IMAGES = {
+    "python": "serverless-python:latest",
+    "javascript": "serverless-javascript:latest",
+}
+
+# Dependencies are installed outside /app, which gets mounted over at run time
+DOCKERFILES = {
+    "python": (
+        "FROM {base}\n"
+        "COPY requirements.txt /deps/requirements.txt\n"
+        "RUN pip install --no-cache-dir -r /deps/requirements.txt\n"
+    ),
+    "javascript": (
+        "FROM {base}\n"
+        "COPY package.json /deps/package.json\n"
+        "RUN cd /deps && npm install --production\n"
+        "ENV NODE_PATH=/deps/node_modules\n"
+    ),
+}
+
+
+class DependenciesNotReadyError(Exception):
+    """Raised when a function's dependency image has not been built yet"""
+
+
+def normalize_dependencies(dependencies):
+    """Sorted, de-duplicated dependency specs, so equivalent lists share an image"""
+    return sorted({d.strip() for d in (dependencies or []) if d and d.strip() and not d.strip().startswith("#")})
+
+
+def option_dependencies(dependencies):
+    """
+    Specs carrying installer options rather than packages (--index-url, -r /path,
+    ...), which could point the build at other indexes or files on the builder
+    """
+    return [d for d in normalize_dependencies(dependencies) if any(token.startswith("-") for token in d.split())]
+
+
+def _package_json(dependencies):
+    packages = {}
+    for spec in dependencies:
+        # "left-pad@1.3.0" or "@scope/pkg@^2" -> name, version
+        name, sep, version = spec.rpartition("@")
+        if not sep or not name:
+            name, version = spec, "*"
+        packages[name] = version
+    return json.dumps({"name": "function-deps", "private": True, "dependencies": packages}, indent=2)
+
+
+class DependencyImageBuilder:
+    """
+    Builds and caches derived runtime images, one per unique dependency set.
+
+    Builds run in the background at deploy time; the execution path only ever
+    looks images up. Unused images are evicted least recently used first once
+    their total size exceeds the disk budget.
+    """
+
+    def __init__(self, client, max_bytes=DEPENDENCY_IMAGE_MAX_BYTES, workers=DEPENDENCY_BUILD_WORKERS):
+        self.client = client
+        self.max_bytes = max_bytes
+        self._builds = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deps-build")
+        self._lock = threading.Lock()
+        self._in_flight = {}  # tag -> Future
+        self._ready = set()
+        self._failed = {}  # tag -> error message
+        self._last_used = {}  # tag -> timestamp
+
+    def image_for(self, function):
+        """Tag of the function's dependency image, or None if it has no dependencies"""
+        dependencies = normalize_dependencies(getattr(function, "dependencies", None))
+        if not dependencies:
+            return None
+        language = function.language.lower()
+        digest = hashlib.sha256(json.dumps([language, dependencies]).encode("utf-8")).hexdigest()
+        return f"serverless-{language}-deps:{digest[:16]}"
+
+    def ensure(self, function, on_ready=None):
+        """Start building the function's dependency image in the background if needed"""
+        tag = self.image_for(function)
+        if tag is None:
+            if on_ready is not None:
+                on_ready()
+            return None
+
+        with self._lock:
+            future = self._in_flight.get(tag)
+            if future is None:
+                if tag in self._ready or self._image_exists(tag):
+                    self._ready.add(tag)
+                    self._failed.pop(tag, None)
+                    if on_ready is not None:
+                        on_ready()
+                    return tag
+                dependencies = normalize_dependencies(function.dependencies)
+                future = self._builds.submit(self._build, tag, function.language.lower(), dependencies)
+                self._in_flight[tag] = future
+
+        if on_ready is not None:
+            future.add_done_callback(lambda f: f.result() and on_ready())
+        return tag
+
+    def resolve(self, function, default):
+        """
+        Image to run the function in. Never builds: if the image is missing, a
+        background build is started and DependenciesNotReadyError is raised.
+        """
+        tag = self.image_for(function)
+        if tag is None:
+            return default
+
+        if tag not in self._ready:
+            with self._lock:
+                building = tag in self._in_flight
+                error = self._failed.get(tag)
+            if error is not None and not building:
+                raise DependenciesNotReadyError(f"Dependency install failed: {error}")
+            if building or not self._image_exists(tag):
+                if not building:
+                    self.ensure(function)
+                raise DependenciesNotReadyError("Function dependencies are still being installed")
+            self._ready.add(tag)
+
+        self._last_used[tag] = time.time()
+        return tag
+
+    def status(self, function):
+        """Build state of the function's dependency image"""
+        tag = self.image_for(function)
+        if tag is None:
+            return {"status": "none", "image": None}
+        with self._lock:
+            if tag in self._in_flight:
+                return {"status": "building", "image": tag}
+            if tag in self._failed:
+                return {"status": "failed", "image": tag, "error": self._failed[tag]}
+        if tag in self._ready or self._image_exists(tag):
+            return {"status": "ready", "image": tag}
+        return {"status": "missing", "image": tag}
+
+    def ready_images(self):
+        """Tags of the dependency images built on this host"""
+        return sorted(self._ready)
+
+    def evict(self):
+        """Remove least recently used dependency images until they fit the disk budget"""
+        images = self.client.images.list(filters={"label": "serverless.deps"})
+        total = sum(image.attrs.get("Size", 0) for image in images)
+        DEPENDENCY_IMAGE_BYTES.set(total)
+        if total <= self.max_bytes:
+            return
+
+        def last_used(image):
+            return max((self._last_used.get(tag, 0) for tag in image.tags), default=0)
+
+        for image in sorted(images, key=last_used):
+            if total <= self.max_bytes:
+                break
+            try:
+                self.client.images.remove(image.id)
+            except Exception as e:
+                # Still used by a running container, try the next one
+                logger.info(f"Skipping eviction of {image.tags}: {str(e)}")
+                continue
+            total -= image.attrs.get("Size", 0)
+            for tag in image.tags:
+                self._ready.discard(tag)
+                self._last_used.pop(tag, None)
+            logger.info(f"Evicted dependency image {image.tags}")
+        DEPENDENCY_IMAGE_BYTES.set(total)
+
+    def shutdown(self):
+        self._builds.shutdown(wait=False, cancel_futures=True)
+
+    def _build(self, tag, language, dependencies):
+        start_time = time.time()
+        options = option_dependencies(dependencies)
+        if options:
+            # Functions created before these were rejected at deploy time
+            with self._lock:
+                self._failed[tag] = f"Installer options are not allowed in dependencies: {', '.join(options)}"
+                self._in_flight.pop(tag, None)
+            return False
+        manifest_name = "requirements.txt" if language == "python" else "package.json"
+        manifest = "\n".join(dependencies) + "\n" if language == "python" else _package_json(dependencies)
+        dockerfile = DOCKERFILES[language].format(base=BASE_IMAGES[language])
+
+        try:
+            logger.info(f"Building dependency image {tag} ({len(dependencies)} packages)")
+            self.client.images.build(
+                fileobj=_build_context({"Dockerfile": dockerfile, manifest_name: manifest}),
+                custom_context=True,
+                tag=tag,
+                labels={"serverless.deps": tag, "serverless.language": language},
+                rm=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to build dependency image {tag}: {str(e)}")
+            DEPENDENCY_IMAGE_BUILDS.labels(language=language, status="error").inc()
+            with self._lock:
+                self._failed[tag] = str(e)
+                self._in_flight.pop(tag, None)
+            return False
+
+        DEPENDENCY_IMAGE_BUILDS.labels(language=language, status="success").inc()
+        DEPENDENCY_IMAGE_BUILD_TIME.labels(language=language).observe(time.time() - start_time)
+        with self._lock:
+            self._ready.add(tag)
+            self._failed.pop(tag, None)
+            self._in_flight.pop(tag, None)
+        self._last_used[tag] = time.time()
+        logger.info(f"Built dependency image {tag} in {time.time() - start_time:.1f} seconds")
+
+        try:
+            self.evict()
+        except Exception as e:
+            logger.warning(f"Dependency image eviction failed: {str(e)}")
+        return True
+
+    def _image_exists(self, tag):
+        try:
+            self.client.images.get(tag)
+            return True
+        except Exception:
+            return False
+
+
+def _build_context(files):
+    """In-memory tar build context for client.images.build"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 0
+            tar.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,170 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+
+from backend.engine.scheduler import FairShareScheduler, INTERACTIVE
+from backend.metrics import (
+    EXECUTION_QUEUE_DEPTH, EXECUTION_QUEUE_WAIT, EXECUTION_REJECTIONS, EXECUTION_WORKERS_BUSY
+)
+
+logger = logging.getLogger(__name__)
+
+# Memory each function container is allowed (matches mem_limit in DockerExecutor)
+CONTAINER_MEMORY_BYTES = 128 * 1024 * 1024
+WORKERS_PER_CPU = int(os.getenv("EXECUTION_WORKERS_PER_CPU", "4"))
+MAX_QUEUE_DEPTH = int(os.getenv("EXECUTION_MAX_QUEUE_DEPTH", "100"))
+
+
+class QueueFullError(Exception):
+    """Raised when the execution queue is at its max depth"""
+
+    def __init__(self, retry_after):
+        super().__init__("Execution queue is full")
+        self.retry_after = retry_after
+
+
+class DispatcherUnavailableError(Exception):
+    """Raised when the dispatcher is shutting down and not accepting work"""
+
+
+def default_worker_count():
+    """Size the worker pool from host cores, capped by how many containers fit in memory"""
+    configured = os.getenv("EXECUTION_WORKERS")
+    if configured:
+        return max(1, int(configured))
+
+    by_cpu = (os.cpu_count() or 1) * WORKERS_PER_CPU
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        by_memory = max(1, memory // CONTAINER_MEMORY_BYTES)
+    except (ValueError, OSError, AttributeError):
+        by_memory = by_cpu
+    return max(1, min(by_cpu, by_memory))
+
+
+class ExecutionDispatcher:
+    """
+    Bounded worker pool that runs blocking executions off the event loop.
+
+    Work waits in a FairShareScheduler, which decides what runs next from host
+    memory, per-function concurrency limits and priority classes. When it is
+    full, submissions are rejected immediately instead of piling up behind slow
+    functions.
+    """
+
+    def __init__(self, workers=None, max_queue_depth=MAX_QUEUE_DEPTH, memory_capacity_mb=None):
+        self.workers = workers or default_worker_count()
+        self.max_queue_depth = max_queue_depth
+        self._scheduler = FairShareScheduler(max_queue_depth, memory_capacity_mb)
+        self._accepting = True
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        # Moving average of job duration, used to estimate Retry-After
+        self._avg_duration = 1.0
+
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"executor-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Execution dispatcher started with {self.workers} workers, queue depth {max_queue_depth}")
+
+    def retry_after(self):
+        """Seconds a rejected client should wait before trying again"""
+        backlog = self._scheduler.qsize() + self._busy
+        return max(1, math.ceil(backlog * self._avg_duration / self.workers))
+
+    async def submit(self, fn, *args, function=None, priority=INTERACTIVE):
+        """
+        Queue fn(*args) for a worker thread and await its result.
+
+        function (the one being executed) supplies the memory size and concurrency
+        limits the scheduler applies; priority is "interactive" or "batch".
+        """
+        if not self._accepting:
+            EXECUTION_REJECTIONS.labels(reason="unavailable").inc()
+            raise DispatcherUnavailableError("Execution dispatcher is shutting down")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # The caller's context (e.g. its trace) goes with the job to the worker thread
+        item = (fn, args, loop, future, time.monotonic(), contextvars.copy_context())
+        if not self._scheduler.put(item, function, priority, cancelled=future.cancelled):
+            EXECUTION_REJECTIONS.labels(reason="queue_full").inc()
+            raise QueueFullError(self.retry_after())
+        EXECUTION_QUEUE_DEPTH.set(self._scheduler.qsize())
+        return await future
+
+    def load(self):
+        """Current load and capacity, as advertised by worker nodes"""
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "queued": self._scheduler.qsize(),
+            "memory_in_use_mb": self._scheduler.memory_in_use(),
+            "memory_capacity_mb": self._scheduler.memory_capacity_mb,
+        }
+
+    def configure(self, function):
+        """Apply a function's reserved/max concurrency before its first execution"""
+        self._scheduler.configure(function)
+
+    def forget(self, function_id):
+        self._scheduler.forget(function_id)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and let the workers drain the queue"""
+        self._accepting = False
+        self._scheduler.close()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            job = self._scheduler.take()
+            if job is None:
+                break
+            fn, args, loop, future, enqueued_at, context = job.item
+            EXECUTION_QUEUE_DEPTH.set(self._scheduler.qsize())
+            EXECUTION_QUEUE_WAIT.observe(time.monotonic() - enqueued_at)
+
+            # The client went away while we were queued
+            if future.cancelled():
+                self._scheduler.done(job)
+                continue
+
+            self._set_busy(1)
+            start_time = time.monotonic()
+            try:
+                result = context.run(fn, *args)
+                loop.call_soon_threadsafe(_resolve, future, result, None)
+            except Exception as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            finally:
+                duration = time.monotonic() - start_time
+                self._avg_duration = 0.9 * self._avg_duration + 0.1 * duration
+                self._set_busy(-1)
+                self._scheduler.done(job)
+
+    def _set_busy(self, delta):
+        with self._busy_lock:
+            self._busy += delta
+            EXECUTION_WORKERS_BUSY.set(self._busy)
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+# Export a singleton for app-wide use
+execution_dispatcher = ExecutionDispatcher()
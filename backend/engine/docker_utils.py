@@ -1,14 +1,25 @@
+import hashlib
 import logging
+import os
 import sys
 import docker
 
 logger = logging.getLogger(__name__)
 
+# Label carrying the digest of the build context an image was built from
+CONTEXT_DIGEST_LABEL = "serverless.context-digest"
+
+def docker_client():
+    """The Docker client the engine uses: the daemon's, or the in-process fake with DOCKER_CLIENT=fake"""
+    if os.getenv("DOCKER_CLIENT", "").lower() == "fake":
+        from backend.engine.fake_docker import FakeDockerClient
+        return FakeDockerClient()
+    return docker.from_env()
+
 def check_docker_availability():
     """Verify Docker is installed and accessible"""
     try:
-        import docker
-        client = docker.from_env()
+        client = docker_client()
         # Test Docker connection
         client.version()
         logger.info("Docker is available and running")
@@ -32,6 +43,27 @@ def check_docker_permissions():
         logger.error(f"Insufficient Docker permissions: {str(e)}")
         return False
 
+def context_digest(path):
+    """Digest of every file in a build context, to tell whether an image needs rebuilding"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8") + b"\0")
+            with open(file_path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def image_matches(client, tag, digest):
+    """True if the image exists and was built from a context with this digest"""
+    try:
+        image = client.images.get(tag)
+    except docker.errors.ImageNotFound:
+        return False
+    return (image.labels or {}).get(CONTEXT_DIGEST_LABEL) == digest
+
 def test_docker_setup():
     """Run all Docker setup tests."""
     logger.info("Testing Docker setup...")
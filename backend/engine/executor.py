@@ -1,21 +1,146 @@
-import tempfile
 import os
+import json
+import socket
 import time
-import docker
+import uuid
 import logging
+import threading
 from pathlib import Path
-from backend.metrics import FUNCTION_EXECUTIONS, FUNCTION_EXECUTION_TIME
+from backend.metrics import (
+    FUNCTION_EXECUTIONS, FUNCTION_EXECUTION_TIME, FUNCTION_RUNTIME_TIME, FUNCTION_PHASE_TIME,
+    FUNCTION_CPU_SECONDS, FUNCTION_THROTTLED_SECONDS, FUNCTION_PEAK_MEMORY, FUNCTION_IO_BYTES, FUNCTION_OOM_KILLS
+)
+from backend.engine.container_pool import ContainerPool, FUNCTION_MOUNT
+from backend.engine.artifacts import artifact_store
+from backend.engine.dependency_images import DependencyImageBuilder, DependenciesNotReadyError, BASE_IMAGES
+from backend.engine.output import OutputCapture, handler_result, output_limit, OUTPUT_MAX_BYTES
+from backend.engine.profiling import ProfileCapture, attach_profile, profile_environment
+from backend.engine.timing import InvocationTimings, activate, mark_cold_start, phase
+from backend.engine import resources
+from backend.engine.scheduler import DEFAULT_MEMORY_MB
+from backend.engine.docker_utils import CONTEXT_DIGEST_LABEL, context_digest, docker_client, image_matches
+from backend.engine.backends import ExecutorBackend, backend_name
+from backend.engine.process_sandbox import process_executor
+from backend.tracing import span
 
 logger = logging.getLogger(__name__)
 
+WARM_POOL_ENABLED = os.getenv("WARM_POOL_ENABLED", "true").lower() == "true"
+
+# Exit codes `timeout -s KILL` reports when it had to kill the function
+TIMEOUT_EXIT_CODES = (124, 137)
+
+# Handler-mode Python functions run under a pre-forking supervisor inside the container
+ZYGOTE_COMMAND = ["python", "/runtime/zygote.py"]
+ZYGOTE_PRELOAD = os.getenv("ZYGOTE_PRELOAD", "")
+ZYGOTE_START_TIMEOUT = float(os.getenv("ZYGOTE_START_TIMEOUT", "30"))
+
+# Script-mode wrappers that run the function under a sampling profiler, only when one is asked for
+PROFILER_COMMANDS = {
+    "python": ["python", "/runtime/profiler.py", "function.py"],
+    "javascript": ["node", "/runtime/profiler.js", "function.js"],
+}
+
+RUNTIME_MODES = ("script", "handler")
+
+# How long an invocation waits for runtime images still being built before it is turned away
+RUNTIME_IMAGE_WAIT = float(os.getenv("RUNTIME_IMAGE_WAIT", "5"))
+
+
+class RuntimeNotReadyError(Exception):
+    """Raised when the base runtime images are not built yet"""
+
+# How one-shot containers get their code: "mount" the cached artifact, or copy it in as an "archive"
+ARTIFACT_INJECTION = os.getenv("ARTIFACT_INJECTION", "mount").lower()
+
+
+class DockerExecutor(ExecutorBackend):
+    name = "docker"
 
-class DockerExecutor:
     def __init__(self):
-        self.client = docker.from_env()
-        self._ensure_base_images()
+        self.client = docker_client()
+        self.artifacts = artifact_store
+        self.dependencies = DependencyImageBuilder(self.client)
+
+        # Warm pool settings per pool key; functions with dependencies get a pool per derived image
+        self._pool_specs = {
+            "python": {"image": BASE_IMAGES["python"]},
+            "javascript": {"image": BASE_IMAGES["javascript"]},
+            "python-handler": {
+                "image": BASE_IMAGES["python"],
+                "command": ZYGOTE_COMMAND,
+                "environment": {"ZYGOTE_PRELOAD": ZYGOTE_PRELOAD},
+                "runtime_dir": True,
+                "warmup": self._warm_up_zygote,
+            },
+        }
+        self.pools = {}
+        self._pools_lock = threading.Lock()
+
+        # Runtime images are checked (and built if stale) in the background, so constructing
+        # the executor never blocks; work that needs them waits for _images_ready
+        self._images_ready = threading.Event()
+        self._images_error = None
+        self._pending = []  # callbacks to run once the images are ready
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._prepare_runtime, name="runtime-images", daemon=True).start()
+
+    def ready(self):
+        """True once the runtime images exist and the warm pools are starting"""
+        return self._images_ready.is_set()
+
+    def status(self):
+        if self._images_ready.is_set():
+            return {"status": "ready"}
+        if self._images_error is not None:
+            return {"status": "failed", "error": self._images_error}
+        return {"status": "building"}
+
+    def _prepare_runtime(self):
+        try:
+            self._ensure_base_images()
+        except Exception as e:
+            self._images_error = str(e)
+            logger.error(f"Runtime images unavailable: {str(e)}")
+            return
+
+        if WARM_POOL_ENABLED and not self._closed:
+            for key, spec in self._pool_specs.items():
+                self.pools[key] = ContainerPool(self.client, key, artifacts=self.artifacts, **spec)
+                self.pools[key].start()
+        with self._pending_lock:
+            self._images_ready.set()
+            pending, self._pending = self._pending, []
+        for callback in pending:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Deferred runtime work failed: {str(e)}")
+
+    def _when_ready(self, callback):
+        """Run callback now if the runtime images are ready, else as soon as they are"""
+        with self._pending_lock:
+            if not self._images_ready.is_set():
+                self._pending.append(callback)
+                return
+        callback()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the runtime images are ready; False if they failed or the timeout passed"""
+        while not self._images_ready.wait(0.5 if timeout is None else timeout):
+            if self._images_error is not None or timeout is not None:
+                return False
+        return True
+
+    def _wait_ready(self):
+        if not self._images_ready.wait(RUNTIME_IMAGE_WAIT):
+            if self._images_error is not None:
+                raise RuntimeNotReadyError(f"Runtime images failed to build: {self._images_error}")
+            raise RuntimeNotReadyError("Runtime images are still being built")
 
     def _ensure_base_images(self, retries=3):
-        """Build base images with retry logic"""
+        """Build the base images whose Dockerfile context changed since they were last built"""
         docker_dir = Path(__file__).parent.parent.parent / "docker"
         images = {
             "serverless-python": docker_dir / "python",
@@ -30,6 +155,11 @@ class DockerExecutor:
                     with open(req_file, 'w') as f:
                         f.write("# Auto-generated requirements file\n")
 
+            digest = context_digest(image_path)
+            if image_matches(self.client, f"{image_name}:latest", digest):
+                logger.info(f"{image_name} image is up to date")
+                continue
+
             for attempt in range(retries):
                 try:
                     logger.info(f"Building {image_name} image, attempt {attempt + 1}/{retries}...")
@@ -38,7 +168,8 @@ class DockerExecutor:
                         tag=f"{image_name}:latest",
                         quiet=False,
                         network_mode="host",
-                        nocache=False
+                        nocache=False,
+                        labels={CONTEXT_DIGEST_LABEL: digest}
                     )
                     logger.info(f"Successfully built {image_name} image")
                     break
@@ -50,106 +181,505 @@ class DockerExecutor:
                     else:
                         raise RuntimeError(f"Failed to build {image_name} after {retries} attempts")
 
-    def execute_function(self, function):
-        """Execute a function inside a Docker container"""
+    def execute_function(self, function, event=None, on_output=None, profile=False):
+        """
+        Execute a function inside a Docker container, passing `event` as JSON in $EVENT.
+
+        Output is captured up to the function's output limit. If on_output is given it is
+        called with (stream, text) for each chunk of output as the function produces it.
+        With profile, the function runs under its runtime's sampling profiler and the
+        result carries a "profile" (see backend/engine/profiling.py).
+
+        Raises DependenciesNotReadyError if the function's dependency image is still building,
+        and RuntimeNotReadyError if the base runtime images are not built yet.
+        """
+        self._wait_ready()
         if function.language.lower() == "python":
-            return self._run_python_function(function)
+            return self._run_python_function(function, event, on_output, profile)
         elif function.language.lower() == "javascript":
-            return self._run_javascript_function(function)
+            return self._run_javascript_function(function, event, on_output, profile)
         else:
             return {"error": f"Unsupported language: {function.language}"}
 
-    def _run_python_function(self, function):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            function_path = os.path.join(temp_dir, "function.py")
-            with open(function_path, "w") as f:
-                f.write(function.code)
-            logger.info(f"Created function.py at {function_path}")
-
-            reqs_path = os.path.join(temp_dir, "requirements.txt")
-            with open(reqs_path, "w") as f:
-                f.write("# Function dependencies\n")
-
-            logger.info(f"Temporary directory contents: {os.listdir(temp_dir)}")
-            return self._run_container(
-                image="serverless-python:latest",
-                mount_path=temp_dir,
-                timeout=function.timeout
+    def prepare(self, function):
+        """Deploy-time work: cache the code, build dependencies in the background, then provision"""
+        self.artifacts.materialize_function(function)
+        # Dependency images derive from the runtime images, so they wait for those
+        self._when_ready(lambda: self.dependencies.ensure(function, on_ready=lambda: self.provision(function)))
+
+    def provision(self, function):
+        """Reserve warm containers for the function's provisioned concurrency"""
+        try:
+            pool = self._get_pool(function)
+        except DependenciesNotReadyError:
+            return
+        if pool is not None:
+            pool.provision(function, getattr(function, "provisioned_concurrency", 0) or 0)
+
+    def deprovision(self, function_id):
+        """Release any warm containers held for a function"""
+        for pool in list(self.pools.values()):
+            pool.deprovision(function_id)
+
+    def shutdown(self):
+        """Remove all warm containers"""
+        self._closed = True
+        self.dependencies.shutdown()
+        for pool in list(self.pools.values()):
+            pool.shutdown()
+
+    def _image_for(self, function):
+        """Base runtime image, or the function's dependency image once it has been built"""
+        with phase("image"):
+            return self.dependencies.resolve(function, BASE_IMAGES[function.language.lower()])
+
+    def _get_pool(self, function):
+        """Warm pool for the function's runtime and dependency image, created on first use"""
+        key = _pool_key(function)
+        if not WARM_POOL_ENABLED or key not in self._pool_specs:
+            return None
+        image = self._image_for(function)
+        memory = memory_mb(function)
+        if image == self._pool_specs[key]["image"] and memory == DEFAULT_MEMORY_MB:
+            return self.pools.get(key)
+
+        # Containers are sized when created, so each memory size gets its own pool too
+        name = key
+        if image != self._pool_specs[key]["image"]:
+            name += f"-{image.rsplit(':', 1)[-1]}"
+        if memory != DEFAULT_MEMORY_MB:
+            name += f"-{memory}m"
+        with self._pools_lock:
+            pool = self.pools.get(name)
+            if pool is None:
+                spec = dict(self._pool_specs[key], image=image, memory_mb=memory)
+                # Nothing is pre-warmed for dependency images or other memory sizes unless provisioned
+                pool = ContainerPool(self.client, name, artifacts=self.artifacts, min_size=0, **spec)
+                pool.start()
+                self.pools[name] = pool
+        return pool
+
+    def _run_python_function(self, function, event=None, on_output=None, profile=False):
+        if runtime_mode(function) == "handler":
+            return self._run_python_handler(function, event, on_output, profile)
+        return self._run_script(function, ["python", "function.py"], event, on_output, profile)
+
+    def _run_javascript_function(self, function, event=None, on_output=None, profile=False):
+        return self._run_script(function, ["node", "function.js"], event, on_output, profile)
+
+    def _run_script(self, function, command, event=None, on_output=None, profile=False):
+        """Run a script-mode function in a warm container, or a one-shot one without warm capacity"""
+        image = self._image_for(function)
+        with phase("artifact"):
+            artifact = self.artifacts.materialize_function(function)
+        environment = _event_environment(event)
+        if profile:
+            return self._run_script_profiled(function, image, artifact, environment, on_output)
+
+        capture = OutputCapture(output_limit(function), on_output)
+        result = self._run_in_pool(function, artifact, command, capture, environment)
+        if result is not None:
+            return result
+
+        return self._run_container(
+            image=image,
+            artifact=artifact,
+            timeout=function.timeout,
+            capture=capture,
+            environment=environment,
+            memory_mb=memory_mb(function)
+        )
+
+    def _run_script_profiled(self, function, image, artifact, environment, on_output=None):
+        """Run the script under its runtime's profiler, which reports after the function's own output"""
+        command = PROFILER_COMMANDS[function.language.lower()]
+        environment = profile_environment(environment)
+        capture = ProfileCapture(output_limit(function), on_output)
+        result = self._run_in_pool(function, artifact, command, capture, environment)
+        if result is None:
+            result = self._run_container(
+                image=image,
+                artifact=artifact,
+                timeout=function.timeout,
+                capture=capture,
+                environment=environment,
+                command=command,
+                memory_mb=memory_mb(function)
+            )
+        return attach_profile(result, capture.report())
+
+    def _run_python_handler(self, function, event, on_output=None, profile=False):
+        """
+        Invoke handler(event, context) through the zygote of a warm container.
+
+        The zygote returns the handler's output with its result, so on_output gets
+        it as a single chunk once the handler has finished.
+        """
+        image = self._image_for(function)
+        with phase("artifact"):
+            artifact = self.artifacts.materialize_function(function)
+        request = {
+            "event": event,
+            "output_limit": output_limit(function),
+            "context": {
+                "function_id": getattr(function, "id", None),
+                "function_name": getattr(function, "name", None),
+                "request_id": str(uuid.uuid4()),
+                "timeout": function.timeout
+            }
+        }
+        if profile:
+            request["profile"] = True
+
+        pool = self._get_pool(function)
+        warm = None
+        if pool is not None:
+            try:
+                with phase("acquire"):
+                    warm = pool.acquire(getattr(function, "id", None))
+            except Exception as e:
+                logger.error(f"Could not start warm container: {str(e)}")
+
+        if warm is None:
+            # No warm capacity: run the supervisor once in a throwaway container. The zygote
+            # already caps the handler's output, the headroom is for the response around it.
+            result = self._run_container(
+                image=image,
+                artifact=artifact,
+                timeout=function.timeout,
+                capture=OutputCapture(output_limit(function) + OUTPUT_MAX_BYTES),
+                environment={"EVENT": json.dumps(request), "ZYGOTE_PRELOAD": ZYGOTE_PRELOAD},
+                command=ZYGOTE_COMMAND + ["--once"],
+                memory_mb=memory_mb(function)
             )
+            if result["status"] != "success":
+                return result
+            lines = result["result"]["output"].splitlines()
+            try:
+                response = json.loads(lines[-1])
+            except (IndexError, ValueError):
+                return {"status": "error", "result": {"error": result["result"]["output"]}}
+            result = _with_resources(handler_result(response, on_output), result.get("resources"))
+            return attach_profile(result, response.get("profile")) if profile else result
+
+        healthy = True
+        try:
+            warm.load(function, artifact)
+            request["function_path"] = f"{FUNCTION_MOUNT}/{artifact.filename}"
+            with resources.measure(warm.container.id, fresh=False) as monitor:
+                with phase("run"):
+                    with span("zygote.invoke", container=warm.container.short_id):
+                        response = self._call_zygote(warm, request, function.timeout)
+                usage = monitor.stop() if monitor else None
+            result = _with_resources(handler_result(response, on_output), usage)
+            return attach_profile(result, response.get("profile")) if profile else result
+        except Exception as e:
+            healthy = False
+            logger.error(f"Zygote invocation error: {str(e)}")
+            return {"status": "error", "result": {"error": f"Container execution failed: {str(e)}"}}
+        finally:
+            with phase("release"):
+                pool.release(warm, healthy=healthy)
+
+    def _call_zygote(self, warm, request, timeout):
+        """Send one JSON request to the container's zygote socket and wait for the reply"""
+        deadline = time.time() + ZYGOTE_START_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout + 5)
+            try:
+                sock.connect(warm.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The supervisor is still importing preloaded libraries
+                sock.close()
+                if time.time() > deadline:
+                    raise RuntimeError("Function runtime did not start in time")
+                time.sleep(0.05)
+
+        with sock:
+            stream = sock.makefile("rwb")
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            line = stream.readline()
+        if not line:
+            raise RuntimeError("Function runtime closed the connection")
+        return json.loads(line)
 
-    def _run_javascript_function(self, function):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            function_path = os.path.join(temp_dir, "function.js")
-            with open(function_path, "w") as f:
-                f.write(function.code)
+    def _warm_up_zygote(self, warm, artifact):
+        """Import a provisioned function's module ahead of its first invocation"""
+        request = {"action": "load", "function_path": f"{FUNCTION_MOUNT}/{artifact.filename}"}
+        try:
+            self._call_zygote(warm, request, ZYGOTE_START_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not pre-load function in warm container: {str(e)}")
 
-            return self._run_container(
-                image="serverless-javascript:latest",
-                mount_path=temp_dir,
-                timeout=function.timeout
+    def _run_in_pool(self, function, artifact, command, capture, environment=None):
+        """Run the function inside a warm container, or return None if no pool can take it"""
+        pool = self._get_pool(function)
+        if pool is None:
+            return None
+
+        try:
+            with phase("acquire"):
+                warm = pool.acquire(getattr(function, "id", None))
+        except Exception as e:
+            logger.error(f"Could not start warm container: {str(e)}")
+            return None
+        if warm is None:
+            return None
+
+        healthy = True
+        try:
+            warm.load(function, artifact)
+            result, healthy = self._exec_in_container(
+                warm.container, command, function.timeout, FUNCTION_MOUNT, capture, environment
             )
+            return result
+        except Exception as e:
+            healthy = False
+            logger.error(f"Docker execution error: {str(e)}")
+            return {"status": "error", "result": {"error": f"Container execution failed: {str(e)}"}}
+        finally:
+            with phase("release"):
+                pool.release(warm, healthy=healthy)
 
-    def _run_container(self, image, mount_path, timeout):
-        """Run a container with the given parameters"""
+    def _exec_in_container(self, container, command, timeout, workdir, capture, environment=None):
+        """Exec the function command in a running container; returns (result, container_healthy)"""
+        start_time = time.time()
+        with resources.measure(container.id, fresh=False) as monitor:
+            with phase("run"):
+                with span("docker.exec_create", container=container.short_id):
+                    exec_id = self.client.api.exec_create(
+                        container.id,
+                        ["timeout", "-s", "KILL", str(timeout)] + command,
+                        workdir=workdir,
+                        environment=environment
+                    )["Id"]
+                with span("docker.exec_start"):
+                    capture.feed_demuxed(self.client.api.exec_start(exec_id, stream=True, demux=True))
+                with span("docker.exec_inspect"):
+                    exit_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            usage = monitor.stop() if monitor else None
+        logger.info(f"Function execution took {time.time() - start_time:.2f} seconds (warm)")
+
+        if usage and usage["oom_killed"]:
+            # The whole container was over its memory limit, so don't hand it out again
+            return _with_resources(_oom_result(capture), usage), False
+        if exit_code in TIMEOUT_EXIT_CODES:
+            # Whatever the function left behind is not worth reusing
+            result = {"status": "error", "result": {"error": f"Function timed out after {timeout} seconds"}}
+            return _with_resources(result, usage), False
+        return _with_resources(capture.result(exit_code == 0), usage), True
+
+    def _start_container(self, image, artifact, environment=None, command=None, memory_mb=DEFAULT_MEMORY_MB):
+        """Create and start a one-shot container with the artifact's code at /app"""
+        options = dict(
+            image=image,
+            command=command,
+            network_disabled=True,
+            mem_limit=f'{memory_mb}m',
+            cpu_quota=100000,
+            environment=environment
+        )
+
+        if ARTIFACT_INJECTION != "archive":
+            with span("docker.containers.run", image=image):
+                return self.client.containers.run(
+                    volumes={artifact.path: {'bind': '/app', 'mode': 'ro'}},
+                    detach=True,
+                    read_only=True,
+                    **options
+                )
+
+        # Copy the code in from memory instead of bind-mounting a host path, for daemons
+        # that cannot see this host's filesystem. put_archive needs a writable root fs.
+        with span("docker.containers.create", image=image):
+            container = self.client.containers.create(**options)
+        try:
+            with span("docker.put_archive", container=container.short_id):
+                container.put_archive("/app", artifact.to_tar())
+            with span("docker.start", container=container.short_id):
+                container.start()
+        except Exception:
+            with span("docker.remove", container=container.short_id):
+                container.remove(force=True)
+            raise
+        return container
+
+    def _run_container(self, image, artifact, timeout, capture, environment=None, command=None,
+                       memory_mb=DEFAULT_MEMORY_MB):
+        """Run a container with the given parameters, streaming its output into capture"""
         start_time = time.time()
         container = None
+        monitor = None
+        timer = None
+        timed_out = threading.Event()
 
         try:
-            container = self.client.containers.run(
-                image=image,
-                volumes={mount_path: {'bind': '/app', 'mode': 'ro'}},
-                detach=True,
-                network_disabled=True,
-                mem_limit='128m',
-                cpu_quota=100000,
-                read_only=True
-            )
+            with phase("container_start"):
+                container = self._start_container(image, artifact, environment, command, memory_mb)
+            mark_cold_start()
+            monitor = resources.monitor(container.id, fresh=True)
 
-            # Wait for the container to finish execution
-            result = container.wait(timeout=timeout)
-            logs = container.logs().decode('utf-8')
+            def kill():
+                timed_out.set()
+                try:
+                    container.kill()
+                except Exception:
+                    pass  # Already exited
 
-            if result['StatusCode'] == 0:
-                # Successful execution
-                return {"status": "success", "result": {"output": logs.strip()}}
-            else:
-                # Error occurred during execution
-                return {"status": "error", "result": {"error": logs.strip()}}
+            # Killing the container ends the output stream, so a timer enforces the timeout
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+
+            # logs=True replays anything printed before the attach, so no output is lost
+            with phase("run"):
+                with span("docker.attach", container=container.short_id):
+                    capture.feed_demuxed(container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True))
+                with span("docker.wait", container=container.short_id):
+                    result = container.wait(timeout=timeout)
+
+            oom_killed = None
+            if result['StatusCode'] == 137:
+                # SIGKILL: find out whether it was the OOM killer, only paying for the lookup then
+                with span("docker.reload", container=container.short_id):
+                    container.reload()
+                oom_killed = container.attrs.get("State", {}).get("OOMKilled", False)
+            usage = monitor.stop(oom_killed=oom_killed) if monitor else None
+
+            if oom_killed:
+                return _with_resources(_oom_result(capture), usage)
+            if timed_out.is_set():
+                result = {"status": "error", "result": {"error": f"Function timed out after {timeout} seconds"}}
+                return _with_resources(result, usage)
+            return _with_resources(capture.result(result['StatusCode'] == 0), usage)
 
         except Exception as e:
             logger.error(f"Docker execution error: {str(e)}")
             return {"status": "error", "result": {"error": f"Container execution failed: {str(e)}"}}
 
         finally:
+            if timer is not None:
+                timer.cancel()
+            if monitor is not None:
+                monitor.close()
             if container:
                 try:
-                    container.remove(force=True)
+                    with phase("cleanup"), span("docker.remove", container=container.short_id):
+                        container.remove(force=True)
                 except Exception as cleanup_error:
                     logger.warning(f"Container cleanup failed: {str(cleanup_error)}")
 
             execution_time = time.time() - start_time
             logger.info(f"Function execution took {execution_time:.2f} seconds")
 
-# Export a singleton for app-wide use
-docker_executor = DockerExecutor()
+def runtime_mode(function):
+    return getattr(function, "runtime_mode", None) or "script"
+
+
+def memory_mb(function):
+    return getattr(function, "memory_mb", None) or DEFAULT_MEMORY_MB
+
 
+def _pool_key(function):
+    language = function.language.lower()
+    if language == "python" and runtime_mode(function) == "handler":
+        return "python-handler"
+    return language
 
-def execute_function_engine(function):
+
+def _oom_result(capture):
+    output = capture.text()
+    error = "Function ran out of memory and was killed"
+    return {"status": "error", "result": {"error": f"{output}\n{error}".strip(), "truncated": capture.truncated}}
+
+
+def _with_resources(result, usage):
+    """Attach a ResourceMonitor's usage report to an executor result"""
+    if usage:
+        result["resources"] = usage
+    return result
+
+
+def _event_environment(event):
+    if event is None:
+        return None
+    return {"EVENT": json.dumps(event)}
+
+
+def result_status(result):
+    """Normalise an executor result to "success" or "error" """
+    if "error" in result or "error" in result.get("result", {}):
+        return "error"
+    return "success" if result.get("status", "success") == "success" else "error"
+
+
+# Backends are constructed on first use, so importing this module (the CLI, workers) stays cheap
+_executors = {"process": process_executor}
+_executors_lock = threading.Lock()
+
+
+def get_docker_executor():
+    """The app-wide DockerExecutor, created the first time it is needed"""
+    executor = _executors.get("docker")
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get("docker")
+            if executor is None:
+                executor = _executors["docker"] = DockerExecutor()
+    return executor
+
+
+_factories = {
+    "docker": get_docker_executor,
+    "process": lambda: process_executor,
+}
+
+
+def get_executor(function):
+    """The backend a function runs on, from its `backend` setting"""
+    name = backend_name(function)
+    if name not in _factories:
+        raise ValueError(f"Unknown executor backend: {name}")
+    return _factories[name]()
+
+
+def started_executors():
+    """Backends that have been constructed, for deprovisioning and shutdown"""
+    return list(_executors.values())
+
+
+def execute_function_engine(function, event=None, on_output=None, timings=None, profile=False):
     """
-    Executes the given function code in a Docker container.
+    Executes the given function code on its backend (a Docker container by default).
 
     Args:
         function (object): The function object containing code, language, etc.
+        event (any): Optional JSON-serialisable input, exposed to the function as $EVENT.
+        on_output (callable): Optional (stream, text) callback for live output.
+        timings (InvocationTimings): Optional timings already holding the request-path phases.
+        profile (bool): Run under the runtime's sampling profiler and return a "profile" with the result.
 
     Returns:
-        dict: Execution result containing output or error.
+        dict: Execution result containing output or error, its execution_time in seconds,
+        the per-phase timings breakdown, whether it was a cold_start and, if asked for, its profile.
     """
+    if timings is None:
+        timings = InvocationTimings()
+    timings.dequeued()
+
     start_time = time.time()
-    result = docker_executor.execute_function(function)
+    with activate(timings), span("execute", function_id=getattr(function, "id", None),
+                                  language=function.language, backend=backend_name(function)) as execute_span:
+        result = get_executor(function).execute_function(function, event, on_output, profile)
+        if execute_span is not None:
+            execute_span.set(status=result_status(result), cold_start=timings.cold_start)
     execution_time = time.time() - start_time
 
-    function_name = getattr(function, 'name', 'unnamed')
-    status = "error" if "error" in result else "success"
+    # Function ids, unlike free-form names, keep the label set bounded by what is deployed
+    function_id = str(getattr(function, 'id', None) or "none")
+    status = result_status(result)
 
     FUNCTION_EXECUTIONS.labels(
         language=function.language,
@@ -158,8 +688,30 @@ def execute_function_engine(function):
 
     FUNCTION_EXECUTION_TIME.labels(
         language=function.language,
-        function_name=function_name,
+        function_id=function_id,
         status=status
     ).observe(execution_time)
 
+    FUNCTION_RUNTIME_TIME.labels(
+        language=function.language,
+        runtime_mode=runtime_mode(function),
+        backend=backend_name(function)
+    ).observe(execution_time)
+
+    for name, seconds in timings.phases.items():
+        FUNCTION_PHASE_TIME.labels(language=function.language, phase=name).observe(seconds)
+
+    usage = result.get("resources")
+    if usage:
+        FUNCTION_CPU_SECONDS.labels(function_id=function_id).observe(usage["cpu_seconds"])
+        FUNCTION_THROTTLED_SECONDS.labels(function_id=function_id).observe(usage["throttled_seconds"])
+        FUNCTION_PEAK_MEMORY.labels(function_id=function_id).observe(usage["memory_peak_bytes"])
+        FUNCTION_IO_BYTES.labels(function_id=function_id, direction="read").observe(usage["io_read_bytes"])
+        FUNCTION_IO_BYTES.labels(function_id=function_id, direction="write").observe(usage["io_write_bytes"])
+        if usage["oom_killed"]:
+            FUNCTION_OOM_KILLS.labels(function_id=function_id).inc()
+
+    result["execution_time"] = execution_time
+    result["timings"] = timings.to_dict()
+    result["cold_start"] = timings.cold_start
     return result
@@ -0,0 +1,246 @@
+"""
+In-process stand-in for the Docker SDK client, for benchmarking without a daemon.
+
+Covers the parts of docker.DockerClient the engine uses. Nothing is executed:
+containers succeed with empty output after configurable delays, so what gets
+measured is the API, database, scheduling and pooling overhead around them.
+Selected with DOCKER_CLIENT=fake.
+
+Delays (seconds) come from FAKE_DOCKER_LATENCIES, a JSON object overriding
+DEFAULT_LATENCIES, and vary by +/- FAKE_DOCKER_JITTER (a fraction).
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+from docker.errors import ImageNotFound, NotFound
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCIES = {
+    "build": 0.0,  # building an image
+    "create": 0.05,  # creating a container
+    "start": 0.25,  # starting it, up to the command running
+    "run": 0.05,  # a one-shot container's command
+    "exec": 0.02,  # a command exec'd in a warm container, or a zygote call
+    "remove": 0.01,
+}
+
+
+def _latencies():
+    latencies = dict(DEFAULT_LATENCIES)
+    latencies.update(json.loads(os.getenv("FAKE_DOCKER_LATENCIES") or "{}"))
+    return latencies
+
+
+class FakeDockerClient:
+    def __init__(self, latencies=None, jitter=None):
+        self.latencies = latencies or _latencies()
+        self.jitter = float(os.getenv("FAKE_DOCKER_JITTER", "0.1")) if jitter is None else jitter
+        self.images = _Images(self)
+        self.containers = _Containers(self)
+        self.api = _API(self)
+
+    def version(self):
+        return {"Version": "fake"}
+
+    def ping(self):
+        return True
+
+    def delay(self, operation):
+        seconds = self.latencies.get(operation, 0.0)
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+class FakeImage:
+    def __init__(self, tag, labels=None):
+        self.id = f"sha256:{uuid.uuid4().hex}"
+        self.tags = [tag]
+        self.labels = labels or {}
+        self.attrs = {"Size": 0, "Config": {"Labels": self.labels}}
+
+
+class _Images:
+    def __init__(self, client):
+        self.client = client
+        self._images = {}  # tag -> FakeImage
+        self._lock = threading.Lock()
+
+    def build(self, tag=None, labels=None, **kwargs):
+        self.client.delay("build")
+        tag = tag if ":" in tag else f"{tag}:latest"
+        image = FakeImage(tag, labels)
+        with self._lock:
+            self._images[tag] = image
+        return image, iter(())
+
+    def get(self, tag):
+        tag = tag if ":" in tag else f"{tag}:latest"
+        with self._lock:
+            image = self._images.get(tag)
+        if image is None:
+            raise ImageNotFound(f"No such image: {tag}")
+        return image
+
+    def list(self, filters=None):
+        label = (filters or {}).get("label")
+        with self._lock:
+            images = list(self._images.values())
+        return [image for image in images if label is None or label in image.labels]
+
+    def remove(self, image_id, **kwargs):
+        with self._lock:
+            for tag, image in list(self._images.items()):
+                if image.id == image_id:
+                    del self._images[tag]
+
+
+class FakeContainer:
+    def __init__(self, client, command=None, volumes=None):
+        self.client = client
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.short_id = self.id[:12]
+        self.command = command
+        self.status = "created"
+        self.attrs = {"State": {"OOMKilled": False}}
+        self._killed = threading.Event()
+        self._zygote = None
+        # The zygote's socket is bind-mounted from the host; answer on it like the real one
+        for host_path, bind in (volumes or {}).items():
+            if bind.get("bind") == "/run/zygote":
+                self._zygote = _FakeZygote(client, os.path.join(host_path, "zygote.sock"))
+
+    def start(self):
+        self.client.delay("start")
+        self.status = "running"
+        if self._zygote is not None:
+            self._zygote.start()
+
+    def put_archive(self, path, data):
+        return True
+
+    def attach(self, **kwargs):
+        # A one-shot container: its command runs for the "run" delay (or until killed) and prints nothing
+        self._killed.wait(self.client.latencies.get("run", 0.0))
+        self.status = "exited"
+        yield from ()
+
+    def wait(self, timeout=None):
+        return {"StatusCode": 137 if self._killed.is_set() else 0}
+
+    def reload(self):
+        pass
+
+    def kill(self):
+        self._killed.set()
+        self.status = "exited"
+
+    def remove(self, force=False):
+        self.client.delay("remove")
+        self.status = "removed"
+        if self._zygote is not None:
+            self._zygote.stop()
+        self.client.containers.forget(self.id)
+
+
+class _Containers:
+    def __init__(self, client):
+        self.client = client
+        self._containers = {}
+        self._lock = threading.Lock()
+
+    def create(self, image=None, command=None, volumes=None, **kwargs):
+        self.client.images.get(image)
+        self.client.delay("create")
+        container = FakeContainer(self.client, command, volumes)
+        with self._lock:
+            self._containers[container.id] = container
+        return container
+
+    def run(self, image=None, command=None, volumes=None, detach=False, **kwargs):
+        container = self.create(image, command, volumes)
+        container.start()
+        return container
+
+    def get(self, container_id):
+        with self._lock:
+            container = self._containers.get(container_id)
+        if container is None:
+            raise NotFound(f"No such container: {container_id}")
+        return container
+
+    def forget(self, container_id):
+        with self._lock:
+            self._containers.pop(container_id, None)
+
+
+class _API:
+    """The low-level exec calls the executor uses"""
+
+    def __init__(self, client):
+        self.client = client
+        self._execs = {}
+
+    def exec_create(self, container_id, cmd, **kwargs):
+        self.client.containers.get(container_id)
+        exec_id = uuid.uuid4().hex
+        self._execs[exec_id] = 0
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=False, demux=False, **kwargs):
+        self.client.delay("exec")
+        return iter(())
+
+    def exec_inspect(self, exec_id):
+        exec_id = exec_id["Id"] if isinstance(exec_id, dict) else exec_id
+        return {"ExitCode": self._execs.pop(exec_id, 0), "Running": False}
+
+
+class _FakeZygote:
+    """Answers zygote requests on a Unix socket after the "exec" delay"""
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self._server = None
+
+    def start(self):
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(16)
+        threading.Thread(target=self._serve, name="fake-zygote", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        with connection:
+            stream = connection.makefile("rwb")
+            for line in stream:
+                request = json.loads(line)
+                if request.get("action") == "load":
+                    response = {"status": "success"}
+                else:
+                    self.client.delay("exec")
+                    response = {"status": "success", "output": "", "result": None, "truncated": False}
+                stream.write(json.dumps(response).encode("utf-8") + b"\n")
+                stream.flush()
@@ -0,0 +1,98 @@
+import codecs
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Most output kept per invocation unless the function sets its own output_limit
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(1024 * 1024)))
+
+TRUNCATION_MARKER = "\n[output truncated]"
+
+
+def output_limit(function):
+    """Output cap in bytes for one invocation of the function"""
+    return getattr(function, "output_limit", None) or OUTPUT_MAX_BYTES
+
+
+class OutputCapture:
+    """
+    Collects a function's stdout/stderr as it is produced, up to a byte limit.
+
+    Everything past the limit is read and thrown away so the function never blocks
+    on a full pipe, and `truncated` records that it happened. Each kept chunk is
+    also handed to on_output(stream, text), which is how live output is streamed.
+    """
+
+    def __init__(self, limit, on_output=None):
+        self.limit = limit
+        self.on_output = on_output
+        self.truncated = False
+        self.bytes_seen = 0
+        self._size = 0
+        self._parts = []
+        # One decoder per stream, so multi-byte characters split across chunks survive
+        self._decoders = {}
+
+    def feed(self, data, stream="stdout"):
+        if not data:
+            return
+        self.bytes_seen += len(data)
+        if self.truncated:
+            return
+        if self._size + len(data) > self.limit:
+            data = data[:self.limit - self._size]
+            self.truncated = True
+        self._size += len(data)
+
+        decoder = self._decoders.get(stream)
+        if decoder is None:
+            decoder = self._decoders[stream] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data, final=self.truncated)
+        if text:
+            self._parts.append(text)
+            self._emit(stream, text)
+        if self.truncated:
+            self._emit("system", TRUNCATION_MARKER.strip())
+
+    def feed_demuxed(self, chunks):
+        """Consume a docker (stdout, stderr) demultiplexed stream until it ends"""
+        for stdout, stderr in chunks:
+            self.feed(stdout, "stdout")
+            self.feed(stderr, "stderr")
+
+    def text(self):
+        text = "".join(self._parts) + "".join(d.decode(b"", final=True) for d in self._decoders.values())
+        return text.strip() + (TRUNCATION_MARKER if self.truncated else "")
+
+    def result(self, success):
+        """The executor's result format for what was captured"""
+        key = "output" if success else "error"
+        return {"status": "success" if success else "error",
+                "result": {key: self.text(), "truncated": self.truncated}}
+
+    def _emit(self, stream, text):
+        if self.on_output is None:
+            return
+        try:
+            self.on_output(stream, text)
+        except Exception as e:
+            # A slow or gone client must not break the execution itself
+            logger.warning(f"Output listener failed: {str(e)}")
+            self.on_output = None
+
+
+def handler_result(response, on_output=None):
+    """Convert a zygote response into the executor's result format"""
+    output = response.get("output", "").strip()
+    truncated = bool(response.get("truncated"))
+    if output and on_output is not None:
+        try:
+            on_output("stdout", output)
+        except Exception as e:
+            logger.warning(f"Output listener failed: {str(e)}")
+    if response.get("status") == "success":
+        return {"status": "success",
+                "result": {"output": output, "return_value": response.get("result"), "truncated": truncated}}
+    error = response.get("error", "Unknown error").strip()
+    return {"status": "error", "result": {"error": f"{output}\n{error}".strip(), "truncated": truncated}}
@@ -0,0 +1,361 @@
+import json
+import logging
+import os
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from backend.engine.artifacts import artifact_store
+from backend.engine.backends import ExecutorBackend
+from backend.engine.output import OutputCapture, handler_result, output_limit, OUTPUT_MAX_BYTES
+from backend.engine.profiling import ProfileCapture, attach_profile, profile_environment
+from backend.engine.resources import CgroupV2
+from backend.engine.timing import mark_cold_start, phase
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_PYTHON = os.getenv("SANDBOX_PYTHON", sys.executable or "python3")
+SANDBOX_NODE = os.getenv("SANDBOX_NODE", "node")
+# Unprivileged user functions run as when the backend itself runs as root
+SANDBOX_UID = int(os.getenv("SANDBOX_UID", "65534"))
+SANDBOX_GID = int(os.getenv("SANDBOX_GID", "65534"))
+# "required" refuses to run functions without namespaces. "auto" (use them when the host
+# allows them) and "off" run untrusted code without mount or network isolation: opt-in only
+SANDBOX_NAMESPACES = os.getenv("SANDBOX_NAMESPACES", "required").lower()
+SANDBOX_SECCOMP = os.getenv("SANDBOX_SECCOMP", "true").lower() == "true"
+SANDBOX_TMPFS_MB = int(os.getenv("SANDBOX_TMPFS_MB", "64"))
+SANDBOX_MAX_PROCESSES = int(os.getenv("SANDBOX_MAX_PROCESSES", "512"))
+SANDBOX_MAX_OPEN_FILES = int(os.getenv("SANDBOX_MAX_OPEN_FILES", "256"))
+# A delegated cgroup v2 directory to create per-invocation cgroups in; rlimits only if unset
+SANDBOX_CGROUP_ROOT = os.getenv("SANDBOX_CGROUP_ROOT", "")
+
+SANDBOX_INIT = str(Path(__file__).parent / "sandbox_init.py")
+ZYGOTE_PATH = str(Path(__file__).parent.parent.parent / "docker" / "python" / "runtime" / "zygote.py")
+PYTHON_PROFILER_PATH = str(Path(__file__).parent.parent.parent / "docker" / "python" / "runtime" / "profiler.py")
+JAVASCRIPT_PROFILER_PATH = str(Path(__file__).parent.parent.parent / "docker" / "javascript" / "runtime" / "profiler.js")
+
+# Waits for a line on stdin before exec'ing the rest of the command
+CGROUP_GATE_COMMAND = ["/bin/sh", "-c", 'read -r _ && exec "$@"', "sandbox-gate"]
+
+UNSHARE_COMMAND = [
+    "unshare", "--user", "--map-root-user", "--mount", "--pid", "--fork", "--kill-child",
+    "--mount-proc", "--net", "--ipc", "--uts",
+]
+
+# Interpreter overhead on top of the function's memory size, for RLIMIT_AS
+PYTHON_ADDRESS_SPACE_HEADROOM_MB = 256
+
+
+class SandboxUnavailableError(Exception):
+    """Raised when the host cannot provide the isolation the sandbox is configured to require"""
+
+
+class ProcessSandboxExecutor(ExecutorBackend):
+    """
+    Runs functions as local subprocesses instead of containers.
+
+    Each invocation gets fresh user, mount, pid, network, ipc and uts namespaces
+    (through unshare(1)), a private tmpfs at /tmp holding the code, rlimits, an
+    optional per-invocation cgroup and a seccomp filter. Invocation overhead is
+    roughly the cost of spawning the interpreter. Dependencies are not
+    supported: functions see the host interpreter's packages.
+    """
+
+    name = "process"
+
+    def __init__(self):
+        self.artifacts = artifact_store
+        self._namespaces = None
+        if SANDBOX_NAMESPACES != "required":
+            logger.warning(f"SANDBOX_NAMESPACES={SANDBOX_NAMESPACES}: the process sandbox may run functions "
+                           f"WITHOUT mount, pid or network isolation, able to read the host's files and "
+                           f"reach its network. Set SANDBOX_NAMESPACES=required unless all code is trusted.")
+
+    def namespaces_available(self):
+        """Probe once whether unprivileged namespaces work on this host"""
+        if self._namespaces is None:
+            if SANDBOX_NAMESPACES == "off" or shutil.which("unshare") is None:
+                self._namespaces = False
+            else:
+                try:
+                    probe = subprocess.run(
+                        UNSHARE_COMMAND + ["true"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                        timeout=10, **_sandbox_user()
+                    )
+                    self._namespaces = probe.returncode == 0
+                    if not self._namespaces:
+                        logger.warning(f"Namespaces unavailable for the process sandbox: "
+                                       f"{probe.stderr.decode(errors='replace').strip()}")
+                except Exception as e:
+                    logger.warning(f"Namespaces unavailable for the process sandbox: {str(e)}")
+                    self._namespaces = False
+        return self._namespaces
+
+    def status(self):
+        """"ready", or "failed" when the host cannot provide the isolation SANDBOX_NAMESPACES requires"""
+        if SANDBOX_NAMESPACES == "required" and not self.namespaces_available():
+            return {"status": "failed", "error": "Linux namespaces are not available for the process sandbox"}
+        return {"status": "ready"}
+
+    def prepare(self, function):
+        self.artifacts.materialize_function(function)
+
+    def execute_function(self, function, event=None, on_output=None, profile=False):
+        language = function.language.lower()
+        if language not in ("python", "javascript"):
+            return {"status": "error", "result": {"error": f"Unsupported language: {function.language}"}}
+        if getattr(function, "dependencies", None):
+            return {"status": "error", "result": {"error": "Dependencies require the docker backend"}}
+
+        with phase("artifact"):
+            artifact = self.artifacts.materialize_function(function)
+        memory_mb = getattr(function, "memory_mb", None) or 128
+        handler = language == "python" and (getattr(function, "runtime_mode", None) or "script") == "handler"
+
+        environment = {"PATH": "/usr/local/bin:/usr/bin:/bin", "HOME": "/tmp", "LANG": "C.UTF-8"}
+        if profile:
+            environment = profile_environment(environment)
+        if handler:
+            request = {
+                "event": event,
+                "output_limit": output_limit(function),
+                "context": {
+                    "function_id": getattr(function, "id", None),
+                    "function_name": getattr(function, "name", None),
+                    "request_id": str(uuid.uuid4()),
+                    "timeout": function.timeout
+                }
+            }
+            if profile:
+                request["profile"] = True
+            environment["EVENT"] = json.dumps(request)
+            argv = [SANDBOX_PYTHON, ZYGOTE_PATH, "--once"]
+            capture = OutputCapture(output_limit(function) + OUTPUT_MAX_BYTES)
+        else:
+            if event is not None:
+                environment["EVENT"] = json.dumps(event)
+            if language == "python":
+                argv = [SANDBOX_PYTHON, "-I"] + ([PYTHON_PROFILER_PATH] if profile else []) + [artifact.filename]
+            else:
+                # V8 reserves far more address space than it uses, so cap its heap instead of RLIMIT_AS
+                argv = [SANDBOX_NODE, f"--max-old-space-size={memory_mb}"] + \
+                    ([JAVASCRIPT_PROFILER_PATH] if profile else []) + [artifact.filename]
+            capture = (ProfileCapture if profile else OutputCapture)(output_limit(function), on_output)
+
+        result = self._run(function, artifact, argv, environment, memory_mb, capture, language == "python")
+        if not handler:
+            return attach_profile(result, capture.report()) if profile else result
+        if result["status"] != "success":
+            return result
+
+        lines = result["result"]["output"].splitlines()
+        try:
+            raw = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            return {"status": "error", "result": {"error": result["result"]["output"]}}
+        response = handler_result(raw, on_output)
+        if "resources" in result:
+            response["resources"] = result["resources"]
+        return attach_profile(response, raw.get("profile")) if profile else response
+
+    def _run(self, function, artifact, argv, environment, memory_mb, capture, limit_address_space):
+        namespaces = self.namespaces_available()
+        if not namespaces and SANDBOX_NAMESPACES == "required":
+            raise SandboxUnavailableError("Linux namespaces are not available for the process sandbox")
+
+        scratch = None
+        if namespaces:
+            # Everything under /tmp is replaced by the invocation's private tmpfs
+            workdir = f"/tmp/function-{uuid.uuid4().hex[:8]}"
+        else:
+            scratch = tempfile.mkdtemp(prefix="sandbox-")
+            workdir = os.path.join(scratch, "function")
+            if os.geteuid() == 0:
+                os.chown(scratch, SANDBOX_UID, SANDBOX_GID)
+        if argv[1:2] == [ZYGOTE_PATH]:
+            environment["ZYGOTE_FUNCTION"] = os.path.join(workdir, artifact.filename)
+
+        config = {
+            "source": os.path.join(artifact.path, artifact.filename),
+            "filename": artifact.filename,
+            "workdir": workdir,
+            "tmpfs_root": "/tmp",
+            "tmpfs_mb": SANDBOX_TMPFS_MB if namespaces else None,
+            # Backstop only; the wall-clock timeout below is what normally stops a function
+            "cpu_seconds": function.timeout + 1,
+            "file_size_bytes": SANDBOX_TMPFS_MB * 1024 * 1024,
+            "open_files": SANDBOX_MAX_OPEN_FILES,
+            "processes": SANDBOX_MAX_PROCESSES,
+            "address_space_bytes": (memory_mb + PYTHON_ADDRESS_SPACE_HEADROOM_MB) * 1024 * 1024
+            if limit_address_space and not SANDBOX_CGROUP_ROOT else None,
+            "seccomp": SANDBOX_SECCOMP,
+            "argv": argv,
+            "env": environment,
+        }
+        command = [SANDBOX_PYTHON, "-I", SANDBOX_INIT, json.dumps(config)]
+        if namespaces:
+            command = UNSHARE_COMMAND + command
+        cgroup = _create_cgroup(memory_mb)
+        if cgroup is not None:
+            # Held until the parent has moved it into the cgroup, so everything it starts is counted there
+            command = CGROUP_GATE_COMMAND + command
+
+        process = None
+        timed_out = False
+        start_time = time.time()
+        try:
+            with phase("container_start"):
+                process = subprocess.Popen(
+                    command,
+                    stdin=subprocess.DEVNULL if cgroup is None else subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env={"PATH": environment["PATH"]},
+                    cwd="/",
+                    close_fds=True,
+                    start_new_session=True,
+                    **_sandbox_user()
+                )
+                if cgroup is not None:
+                    _join_cgroup(process, cgroup)
+            mark_cold_start()
+            with phase("run"):
+                timed_out = _relay_output(process, capture, start_time + function.timeout)
+                _, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+        except Exception as e:
+            logger.error(f"Process sandbox error: {str(e)}")
+            return {"status": "error", "result": {"error": f"Sandbox execution failed: {str(e)}"}}
+        finally:
+            if process is not None and process.returncode is None:
+                _kill(process)
+                process.wait()
+            with phase("cleanup"):
+                if scratch is not None:
+                    shutil.rmtree(scratch, ignore_errors=True)
+                cgroup_usage = _remove_cgroup(cgroup)
+            logger.info(f"Function execution took {time.time() - start_time:.2f} seconds (process sandbox)")
+
+        resources = {
+            "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 6),
+            "throttled_seconds": 0.0,
+            "memory_peak_bytes": usage.ru_maxrss * 1024,
+            "io_read_bytes": usage.ru_inblock * 512,
+            "io_write_bytes": usage.ru_oublock * 512,
+            "oom_killed": False,
+            "wall_seconds": round(time.time() - start_time, 6),
+        }
+        if cgroup_usage:
+            resources.update(cgroup_usage)
+
+        if timed_out:
+            result = {"status": "error", "result": {"error": f"Function timed out after {function.timeout} seconds"}}
+        elif resources["oom_killed"]:
+            result = {"status": "error", "result": {"error": "Function ran out of memory and was killed",
+                                                    "truncated": capture.truncated}}
+        else:
+            result = capture.result(process.returncode == 0)
+        result["resources"] = resources
+        return result
+
+
+def _relay_output(process, capture, deadline):
+    """Feed stdout/stderr into capture until both close; returns True if the deadline passed"""
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+    selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+    open_streams = 2
+    try:
+        while open_streams:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                _kill(process)
+                return True
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fileobj.fileno(), 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    open_streams -= 1
+                    continue
+                capture.feed(data, key.data)
+    finally:
+        selector.close()
+        process.stdout.close()
+        process.stderr.close()
+    return False
+
+
+def _kill(process):
+    try:
+        # The whole session: unshare, the sandbox's init and anything the function forked
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _sandbox_user():
+    """Popen arguments that start the sandbox as the unprivileged user when the backend runs as root"""
+    if os.geteuid() != 0:
+        return {}
+    return {"user": SANDBOX_UID, "group": SANDBOX_GID, "extra_groups": []}
+
+
+def _join_cgroup(process, cgroup):
+    """Move the gated sandbox process into its cgroup, then let it go on"""
+    with open(os.path.join(cgroup.path, "cgroup.procs"), "w") as f:
+        f.write(str(process.pid))
+    process.stdin.write(b"\n")
+    process.stdin.close()
+
+
+def _create_cgroup(memory_mb):
+    if not SANDBOX_CGROUP_ROOT:
+        return None
+    path = os.path.join(SANDBOX_CGROUP_ROOT, f"invocation-{uuid.uuid4().hex[:12]}")
+    try:
+        os.mkdir(path)
+        with open(os.path.join(path, "memory.max"), "w") as f:
+            f.write(str(memory_mb * 1024 * 1024))
+        with open(os.path.join(path, "memory.swap.max"), "w") as f:
+            f.write("0")
+        with open(os.path.join(path, "pids.max"), "w") as f:
+            f.write(str(SANDBOX_MAX_PROCESSES))
+        return CgroupV2(path)
+    except OSError as e:
+        logger.warning(f"Could not create sandbox cgroup, falling back to rlimits: {str(e)}")
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+        return None
+
+
+def _remove_cgroup(cgroup):
+    """Read the cgroup's final counters and remove it"""
+    if cgroup is None:
+        return None
+    counters = cgroup.read()
+    try:
+        os.rmdir(cgroup.path)
+    except OSError as e:
+        logger.warning(f"Could not remove sandbox cgroup {cgroup.path}: {str(e)}")
+    if counters is None:
+        return None
+    return {
+        "cpu_seconds": round(counters["cpu_seconds"], 6),
+        "throttled_seconds": round(counters["throttled_seconds"], 6),
+        "memory_peak_bytes": counters["memory_peak_bytes"] or counters["memory_bytes"],
+        "io_read_bytes": counters["io_read_bytes"],
+        "io_write_bytes": counters["io_write_bytes"],
+        "oom_killed": counters["oom_kills"] > 0,
+    }
+
+
+# Export a singleton for app-wide use
+process_executor = ProcessSandboxExecutor()
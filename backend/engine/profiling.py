@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import re
+
+from backend.engine.output import OutputCapture
+
+logger = logging.getLogger(__name__)
+
+# Hotspots returned with a profiled invocation's result
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "20"))
+# Sampling interval asked of the runtime profilers
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+# Largest profiler report accepted from a function's stderr
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Written by docker/python/runtime/profiler.py and docker/javascript/runtime/profiler.js
+# ahead of their report, as the last line on stderr
+PROFILE_MARKER = b"\x1eserverless-profile:"
+
+_FRAME = re.compile(r"^(.*) \(([^()]*)\)$")
+
+
+def profile_environment(environment=None):
+    """Environment for a profiled run"""
+    return dict(environment or {}, PROFILE_INTERVAL_MS=str(PROFILE_INTERVAL_MS))
+
+
+class ProfileCapture(OutputCapture):
+    """
+    OutputCapture for a script run under a runtime profiler.
+
+    The profiler's report arrives on stderr after PROFILE_MARKER. It is split off
+    instead of being counted against the output limit or streamed to the client.
+    A few bytes of stderr are held back while they could be the start of a marker
+    split across chunks.
+    """
+
+    def __init__(self, limit, on_output=None):
+        super().__init__(limit, on_output)
+        self._held = b""
+        self._report = None  # bytes after the marker, once it has been seen
+        self._report_overflow = False
+
+    def feed(self, data, stream="stdout"):
+        if stream != "stderr" or not data:
+            super().feed(data, stream)
+            return
+        if self._report is not None:
+            self._add_report(data)
+            return
+
+        data = self._held + data
+        self._held = b""
+        index = data.find(PROFILE_MARKER)
+        if index >= 0:
+            super().feed(data[:index], stream)
+            self._report = bytearray()
+            self._add_report(data[index + len(PROFILE_MARKER):])
+            return
+        start = data.rfind(PROFILE_MARKER[:1], max(0, len(data) - len(PROFILE_MARKER) + 1))
+        if start >= 0 and PROFILE_MARKER.startswith(data[start:]):
+            data, self._held = data[:start], data[start:]
+        super().feed(data, stream)
+
+    def text(self):
+        if self._held:
+            held, self._held = self._held, b""
+            super().feed(held, "stderr")
+        return super().text()
+
+    def report(self):
+        """The runtime profiler's raw report, or None if it never wrote one"""
+        if self._report is None or self._report_overflow:
+            return None
+        try:
+            return json.loads(self._report.decode("utf-8", errors="replace"))
+        except ValueError:
+            logger.warning("Discarding unreadable profiler report")
+            return None
+
+    def _add_report(self, data):
+        if len(self._report) + len(data) > PROFILE_MAX_BYTES:
+            self._report_overflow = True
+            return
+        self._report += data
+
+
+def collapsed_stacks(stacks):
+    """Stacks in the collapsed format flamegraph.pl and speedscope read: "outer;inner count" per line"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def build_profile(raw, top_n=PROFILE_TOP_N):
+    """
+    Turn a runtime profiler's report into what is returned with the result.
+
+    Hotspots are ranked by self samples (the frame was the one running); total
+    samples count every stack the frame was on. Milliseconds are the frame's share
+    of the CPU time the profiler measured, which does not depend on the kernel
+    delivering every sampling tick on time.
+    """
+    if not raw:
+        return {"error": "No profile was recorded: the function was killed, or its report was over PROFILE_MAX_BYTES"}
+    if raw.get("error"):
+        return {"profiler": raw.get("profiler"), "error": raw["error"]}
+
+    stacks = raw.get("stacks") or {}
+    samples = sum(stacks.values())
+    cpu_ms = raw.get("cpu_ms")
+    ms_per_sample = cpu_ms / samples if cpu_ms and samples else raw.get("interval_ms") or 0
+
+    self_samples = {}
+    total_samples = {}
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_samples[frames[-1]] = self_samples.get(frames[-1], 0) + count
+        # Recursive frames count once per stack
+        for frame in set(frames):
+            total_samples[frame] = total_samples.get(frame, 0) + count
+
+    hotspots = []
+    for frame, count in sorted(self_samples.items(), key=lambda item: (-item[1], item[0]))[:top_n]:
+        match = _FRAME.match(frame)
+        hotspots.append({
+            "function": match.group(1) if match else frame,
+            "location": match.group(2) if match else None,
+            "self_samples": count,
+            "self_percent": round(100.0 * count / samples, 2),
+            "self_ms": round(count * ms_per_sample, 3),
+            "total_samples": total_samples[frame],
+            "total_percent": round(100.0 * total_samples[frame] / samples, 2),
+            "total_ms": round(total_samples[frame] * ms_per_sample, 3),
+        })
+
+    return {
+        "profiler": raw.get("profiler"),
+        "clock": raw.get("clock"),
+        "interval_ms": raw.get("interval_ms"),
+        "duration_ms": raw.get("duration_ms"),
+        "cpu_ms": cpu_ms,
+        "samples": samples,
+        "hotspots": hotspots,
+        "collapsed": collapsed_stacks(stacks),
+    }
+
+
+def attach_profile(result, raw):
+    """Add the profile built from a runtime profiler's report to an executor result"""
+    result["profile"] = build_profile(raw)
+    return result
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Where the host's cgroup hierarchy is visible; mount it read-only when running in a container
+CGROUP_ROOT = os.getenv("CGROUP_ROOT", "/sys/fs/cgroup")
+RESOURCE_ACCOUNTING = os.getenv("RESOURCE_ACCOUNTING", "true").lower() == "true"
+RESOURCE_SAMPLE_INTERVAL = float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "0.1"))
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_int(path):
+    data = _read(path)
+    try:
+        return int(data) if data is not None else None
+    except ValueError:
+        return None
+
+
+def _read_keyed(path):
+    """Parse "key value" lines, as in cpu.stat and memory.events"""
+    data = _read(path)
+    if data is None:
+        return None
+    values = {}
+    for line in data.splitlines():
+        key, _, value = line.partition(" ")
+        try:
+            values[key] = int(value)
+        except ValueError:
+            pass
+    return values
+
+
+class CgroupV2:
+    """Counters of one container from the unified (v2) hierarchy"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        cpu = _read_keyed(os.path.join(self.path, "cpu.stat"))
+        if cpu is None:
+            return None  # The container has exited and its cgroup is gone
+        events = _read_keyed(os.path.join(self.path, "memory.events")) or {}
+        read_bytes = write_bytes = 0
+        for line in (_read(os.path.join(self.path, "io.stat")) or "").splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key == "rbytes":
+                    read_bytes += int(value)
+                elif key == "wbytes":
+                    write_bytes += int(value)
+        return {
+            "cpu_seconds": cpu.get("usage_usec", 0) / 1e6,
+            "throttled_seconds": cpu.get("throttled_usec", 0) / 1e6,
+            "memory_bytes": _read_int(os.path.join(self.path, "memory.current")) or 0,
+            "memory_peak_bytes": _read_int(os.path.join(self.path, "memory.peak")),
+            "oom_kills": events.get("oom_kill", 0),
+            "io_read_bytes": read_bytes,
+            "io_write_bytes": write_bytes,
+        }
+
+
+class CgroupV1:
+    """Counters of one container from the per-controller (v1) hierarchies"""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def read(self):
+        usage = _read_int(os.path.join(self.paths["cpuacct"], "cpuacct.usage"))
+        if usage is None:
+            return None
+        cpu = _read_keyed(os.path.join(self.paths["cpu"], "cpu.stat")) or {}
+        oom = _read_keyed(os.path.join(self.paths["memory"], "memory.oom_control")) or {}
+        read_bytes = write_bytes = 0
+        for line in (_read(os.path.join(self.paths["blkio"], "blkio.throttle.io_service_bytes")) or "").splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[1] == "Read":
+                read_bytes += int(parts[2])
+            elif len(parts) == 3 and parts[1] == "Write":
+                write_bytes += int(parts[2])
+        return {
+            "cpu_seconds": usage / 1e9,
+            "throttled_seconds": cpu.get("throttled_time", 0) / 1e9,
+            "memory_bytes": _read_int(os.path.join(self.paths["memory"], "memory.usage_in_bytes")) or 0,
+            "memory_peak_bytes": _read_int(os.path.join(self.paths["memory"], "memory.max_usage_in_bytes")),
+            "oom_kills": oom.get("oom_kill", 0),
+            "io_read_bytes": read_bytes,
+            "io_write_bytes": write_bytes,
+        }
+
+
+def find_cgroup(container_id, root=CGROUP_ROOT):
+    """The container's cgroup under the systemd or cgroupfs driver layout, or None"""
+    for path in (os.path.join(root, "system.slice", f"docker-{container_id}.scope"),
+                 os.path.join(root, "docker", container_id)):
+        if os.path.exists(os.path.join(path, "cpu.stat")):
+            return CgroupV2(path)
+
+    for parent in (os.path.join("system.slice", f"docker-{container_id}.scope"), os.path.join("docker", container_id)):
+        paths = {name: os.path.join(root, name, parent) for name in ("cpu", "cpuacct", "memory", "blkio")}
+        if os.path.exists(os.path.join(paths["cpuacct"], "cpuacct.usage")):
+            return CgroupV1(paths)
+    return None
+
+
+class ResourceMonitor:
+    """
+    Measures what one invocation used from its container's cgroup counters.
+
+    Counters are read at start and stop, which costs two small file reads per
+    invocation; the shared sampler fills in peak memory for longer runs in between.
+    In a warm container the counters cover the container's whole life, so usage is
+    reported as the difference between the two reads. A one-shot container's
+    cgroup disappears when it exits, so its last sample stands in for the final read.
+    """
+
+    def __init__(self, cgroup, fresh):
+        self.cgroup = cgroup
+        self.fresh = fresh
+        self._lock = threading.Lock()
+        self._first = None
+        self._last = None
+        self._memory_max = 0
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self.sample()
+        resource_sampler.register(self)
+        return self
+
+    def sample(self):
+        counters = self.cgroup.read()
+        if counters is None:
+            return
+        with self._lock:
+            if self._first is None:
+                self._first = counters
+            self._last = counters
+            self._memory_max = max(self._memory_max, counters["memory_bytes"])
+
+    def close(self):
+        """Stop background sampling; safe to call more than once"""
+        resource_sampler.unregister(self)
+
+    def stop(self, oom_killed=None):
+        """Usage since start(); oom_killed overrides the cgroup's OOM counter if known"""
+        self.close()
+        self.sample()
+        with self._lock:
+            first, last = self._first, self._last
+            memory_max = self._memory_max
+        if last is None:
+            return None
+
+        # A fresh container starts from zero, so everything it counted belongs to this run
+        base = {key: 0 for key in last} if self.fresh else first
+        peak = memory_max
+        if self.fresh and last["memory_peak_bytes"] is not None:
+            peak = max(peak, last["memory_peak_bytes"])
+        return {
+            "cpu_seconds": round(last["cpu_seconds"] - base["cpu_seconds"], 6),
+            "throttled_seconds": round(last["throttled_seconds"] - base["throttled_seconds"], 6),
+            "memory_peak_bytes": peak,
+            "io_read_bytes": last["io_read_bytes"] - base["io_read_bytes"],
+            "io_write_bytes": last["io_write_bytes"] - base["io_write_bytes"],
+            "oom_killed": bool(oom_killed) if oom_killed is not None else last["oom_kills"] > base["oom_kills"],
+            "wall_seconds": round(time.perf_counter() - self._started_at, 6),
+        }
+
+
+class ResourceSampler:
+    """One background thread sampling every running invocation's cgroup, started on first use"""
+
+    def __init__(self, interval=RESOURCE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._monitors = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, monitor):
+        with self._lock:
+            self._monitors.add(monitor)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, monitor):
+        with self._lock:
+            self._monitors.discard(monitor)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                monitors = list(self._monitors)
+            for monitor in monitors:
+                try:
+                    monitor.sample()
+                except Exception as e:
+                    logger.debug(f"Resource sample failed: {str(e)}")
+
+
+def monitor(container_id, fresh):
+    """Start measuring a container, or return None if its cgroup is not visible from here"""
+    if not RESOURCE_ACCOUNTING:
+        return None
+    cgroup = find_cgroup(container_id)
+    if cgroup is None:
+        return None
+    return ResourceMonitor(cgroup, fresh).start()
+
+
+@contextmanager
+def measure(container_id, fresh):
+    """monitor() as a context manager, which stops sampling even if the run fails"""
+    resource_monitor = monitor(container_id, fresh)
+    try:
+        yield resource_monitor
+    finally:
+        if resource_monitor is not None:
+            resource_monitor.close()
+
+
+# Export a singleton for app-wide use
+resource_sampler = ResourceSampler()
@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import http.client
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import crud
+from backend.db import SessionLocal
+from backend.engine.dependency_images import DependenciesNotReadyError
+from backend.engine.dispatcher import QueueFullError, DispatcherUnavailableError
+from backend.engine.scheduler import DEFAULT_MEMORY_MB, INTERACTIVE
+from backend.metrics import ROUTER_PLACEMENTS, ROUTER_RETRIES, WORKER_NODES_LIVE
+from backend.tracing import span, traceparent
+
+logger = logging.getLogger(__name__)
+
+# Route invocations to registered worker nodes instead of running them in the API process
+CLUSTER_ROUTING = os.getenv("CLUSTER_ROUTING", "false").lower() == "true"
+# A node is considered gone once it misses heartbeats for this long
+WORKER_NODE_TTL = float(os.getenv("WORKER_NODE_TTL", "15"))
+ROUTER_REFRESH_INTERVAL = float(os.getenv("ROUTER_REFRESH_INTERVAL", "1"))
+ROUTER_MAX_ATTEMPTS = int(os.getenv("ROUTER_MAX_ATTEMPTS", "3"))
+# How long a node that failed a request is skipped before it gets traffic again
+ROUTER_NODE_BACKOFF = float(os.getenv("ROUTER_NODE_BACKOFF", "10"))
+# Time allowed to open a connection to a node; a node that does not accept in time gets no request
+ROUTER_CONNECT_TIMEOUT = float(os.getenv("ROUTER_CONNECT_TIMEOUT", "5"))
+# Time allowed on top of the function's timeout for queueing on the node and the round trip
+ROUTER_REQUEST_GRACE = float(os.getenv("ROUTER_REQUEST_GRACE", "60"))
+# Load (as a fraction of a node's capacity) a node with warm state may carry over a cold one
+ROUTER_WARM_BONUS = float(os.getenv("ROUTER_WARM_BONUS", "0.5"))
+ROUTER_ARTIFACT_BONUS = float(os.getenv("ROUTER_ARTIFACT_BONUS", "0.1"))
+# Routed invocations this process can wait on at once; each holds a thread for its round trip,
+# so this should cover the cluster's total workers plus what their queues may hold
+ROUTER_MAX_IN_FLIGHT = int(os.getenv("ROUTER_MAX_IN_FLIGHT", "256"))
+
+
+class NodeUnavailableError(Exception):
+    """Raised for a node that could not be reached or turned the invocation away, so it did not run it"""
+
+
+class NodeResponseError(Exception):
+    """Raised for a node that had the invocation but returned no result; it may have run it"""
+
+
+class NodeRouter:
+    """
+    Places invocations on registered worker nodes.
+
+    Nodes heartbeat their capacity, load and warm state into the worker_nodes
+    table; a background thread keeps a snapshot of the live ones. Each
+    invocation goes to the node with the lowest load, counting as "less loaded"
+    a node that already ran the function (warm containers, cached code) or at
+    least has its artifact. A node that cannot be reached is skipped for a while
+    and the invocation is retried on another node. One that times out or dies
+    after it got the request is skipped too, but the invocation is not retried,
+    since it may have run already: the caller gets an error result instead.
+    """
+
+    def __init__(self, enabled=CLUSTER_ROUTING, max_in_flight=ROUTER_MAX_IN_FLIGHT):
+        self.enabled = enabled
+        # Kept apart from Starlette's threadpool, which would cap routed concurrency and starve sync routes
+        self._requests = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="node-router-send")
+        self._nodes = []
+        self._in_flight = {}  # node id -> requests this process has outstanding there
+        self._down_until = {}  # node id -> monotonic time it may be tried again
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def active(self):
+        """True if invocations should be routed, i.e. routing is on and some node is live"""
+        return self.enabled and bool(self._nodes)
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="node-router", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._requests.shutdown(wait=False)
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            nodes = [_NodeSnapshot(node) for node in crud.get_live_worker_nodes(db, WORKER_NODE_TTL)]
+        except Exception as e:
+            logger.warning(f"Failed to refresh worker nodes: {str(e)}")
+            return
+        finally:
+            db.close()
+        with self._lock:
+            self._nodes = nodes
+        WORKER_NODES_LIVE.set(len(nodes))
+
+    async def submit(self, function, event=None, on_output=None, timings=None, priority=INTERACTIVE, profile=False):
+        """Await execute() on the router's own request threads"""
+        loop = asyncio.get_running_loop()
+        # The caller's context (e.g. its trace) goes with the request
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._requests, context.run, self.execute, function, event, on_output, timings, priority, profile
+        )
+
+    def execute(self, function, event=None, on_output=None, timings=None, priority=INTERACTIVE, profile=False):
+        """
+        Run the invocation on a worker node and return its result; blocking.
+
+        Raises QueueFullError when every node is saturated, and the node's
+        DependenciesNotReadyError when the function's image is still building.
+        """
+        if timings is not None:
+            timings.dequeued()
+        tried = set()
+        saturated = []
+        last_error = None
+        for _ in range(ROUTER_MAX_ATTEMPTS):
+            node, warmth = self._choose(function, tried)
+            if node is None:
+                break
+            tried.add(node.id)
+            ROUTER_PLACEMENTS.labels(node=node.id, warmth=warmth).inc()
+            try:
+                with span("route", node=node.id, warmth=warmth):
+                    result = self._send(node, function, event, priority, profile)
+            except QueueFullError as e:
+                ROUTER_RETRIES.labels(reason="saturated").inc()
+                saturated.append(e.retry_after)
+                continue
+            except NodeUnavailableError as e:
+                logger.warning(f"Worker node {node.id} failed, retrying elsewhere: {str(e)}")
+                ROUTER_RETRIES.labels(reason="node_failed").inc()
+                with self._lock:
+                    self._down_until[node.id] = time.monotonic() + ROUTER_NODE_BACKOFF
+                last_error = e
+                continue
+            except NodeResponseError as e:
+                logger.warning(f"Worker node {node.id} returned no result, not retrying: {str(e)}")
+                with self._lock:
+                    self._down_until[node.id] = time.monotonic() + ROUTER_NODE_BACKOFF
+                return {"status": "error", "result": {
+                    "error": f"Worker node {node.id} returned no result, the invocation may or may not have run: "
+                             f"{str(e)}"
+                }}
+
+            if timings is not None:
+                # The API-side phases (lookup) followed by the node's
+                result["timings"] = dict(timings.to_dict(), **(result.get("timings") or {}))
+            output = result.get("result", {}).get("output")
+            if on_output is not None and output:
+                on_output("stdout", output)
+            return result
+
+        if saturated:
+            raise QueueFullError(min(saturated))
+        if last_error is not None:
+            raise DispatcherUnavailableError(f"No worker node could run the invocation: {str(last_error)}")
+        raise DispatcherUnavailableError("No worker nodes are available")
+
+    def _choose(self, function, exclude):
+        now = time.monotonic()
+        memory_mb = getattr(function, "memory_mb", None) or DEFAULT_MEMORY_MB
+        function_id = str(getattr(function, "id", None))
+        code_hash = getattr(function, "code_hash", None)
+        artifact = getattr(getattr(function, "artifact", None), "digest", None)
+
+        best = None
+        with self._lock:
+            for node in self._nodes:
+                if node.id in exclude or self._down_until.get(node.id, 0) > now:
+                    continue
+                # Between heartbeats our own outstanding requests are the freshest lower bound
+                in_flight = self._in_flight.get(node.id, 0)
+                load = max(node.busy + node.queued, in_flight) / max(1, node.workers)
+                if node.memory_capacity_mb:
+                    memory = max(node.memory_in_use_mb, in_flight * memory_mb) / node.memory_capacity_mb
+                    load = max(load, memory)
+                if code_hash is not None and node.warm_functions.get(function_id) == code_hash:
+                    warmth, load = "warm", load - ROUTER_WARM_BONUS
+                elif artifact is not None and artifact in node.artifacts:
+                    warmth, load = "artifact", load - ROUTER_ARTIFACT_BONUS
+                else:
+                    warmth = "cold"
+                # Random tie-break, so equally loaded nodes share the traffic
+                key = (load, random.random())
+                if best is None or key < best[0]:
+                    best = (key, node, warmth)
+        if best is None:
+            return None, None
+        return best[1], best[2]
+
+    def _send(self, node, function, event, priority, profile=False):
+        body = json.dumps({
+            "function_id": function.id,
+            "code_hash": getattr(function, "code_hash", None),
+            "event": event,
+            "priority": priority,
+            "profile": profile,
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if traceparent():
+            # The node records its part of the trace under the same id
+            headers["traceparent"] = traceparent()
+        url = urllib.parse.urlsplit(node.url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.netloc, timeout=ROUTER_CONNECT_TIMEOUT)
+        with self._lock:
+            self._in_flight[node.id] = self._in_flight.get(node.id, 0) + 1
+        try:
+            try:
+                connection.connect()
+            except OSError as e:
+                # Refused, unreachable or not accepting: the request never left, so another node may take it
+                raise NodeUnavailableError(str(e))
+            connection.sock.settimeout((function.timeout or 30) + ROUTER_REQUEST_GRACE)
+            try:
+                connection.request("POST", f"{url.path}/execute", body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                # Timed out, reset or cut short once the node had the request: it may have run it
+                raise NodeResponseError(str(e) or type(e).__name__)
+        finally:
+            connection.close()
+            with self._lock:
+                self._in_flight[node.id] -= 1
+
+        if response.status < 300:
+            try:
+                return json.loads(data)["result"]
+            except (ValueError, KeyError) as e:
+                raise NodeResponseError(f"Malformed response: {str(e)}")
+        detail = _error_detail(data, response.reason)
+        if response.status == 429:
+            raise QueueFullError(int(response.getheader("Retry-After") or 1))
+        if response.status == 503 and isinstance(detail, dict) and detail.get("reason") == "dependencies":
+            raise DependenciesNotReadyError(detail.get("message"))
+        if response.status == 503:
+            # The node turned the invocation away before running it
+            raise NodeUnavailableError(f"HTTP 503: {detail}")
+        if response.status >= 500:
+            raise NodeResponseError(f"HTTP {response.status}: {detail}")
+        raise RuntimeError(f"Worker node rejected the invocation: HTTP {response.status}: {detail}")
+
+    def _run(self):
+        while not self._stop.wait(ROUTER_REFRESH_INTERVAL):
+            self.refresh()
+
+
+class _NodeSnapshot:
+    """Detached copy of a worker_nodes row"""
+
+    def __init__(self, node):
+        self.id = node.id
+        self.url = node.url.rstrip("/")
+        self.workers = node.workers or 1
+        self.memory_capacity_mb = node.memory_capacity_mb or 0
+        self.busy = node.busy or 0
+        self.queued = node.queued or 0
+        self.memory_in_use_mb = node.memory_in_use_mb or 0
+        self.warm_functions = node.warm_functions or {}
+        self.artifacts = set(node.artifacts or ())
+
+
+def _error_detail(data, reason):
+    try:
+        return json.loads(data).get("detail")
+    except Exception:
+        return reason
+
+
+# Export a singleton for app-wide use
+node_router = NodeRouter()
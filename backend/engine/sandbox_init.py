@@ -0,0 +1,246 @@
+"""
+First process inside a process sandbox; sets up the function's environment and execs it.
+
+Runs as the sandbox user, inside fresh user/mount/pid/net namespaces when the host
+allows them. It must not import anything from the backend package. It reads a
+JSON config from argv[1] and then:
+
+  1. reads the function's code from the artifact store
+  2. mounts a private tmpfs over /tmp and writes the code there
+  3. applies rlimits
+  4. installs a seccomp filter that refuses namespace, mount, module, tracing
+     and other host-level syscalls. clone() is allowed for threads and child
+     processes but refused with any CLONE_NEW* flag; clone3() keeps its flags
+     in memory a filter cannot read, so it fails with ENOSYS and the C library
+     falls back to clone()
+  5. execs the interpreter
+"""
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import platform
+import resource
+import struct
+import sys
+
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+SECCOMP_RET_ALLOW = 0x7fff0000
+SECCOMP_RET_ERRNO = 0x00050000
+SECCOMP_RET_KILL_PROCESS = 0x80000000
+
+BPF_LD_W_ABS = 0x20
+BPF_JMP_JEQ_K = 0x15
+BPF_JMP_JGE_K = 0x35
+BPF_JMP_JSET_K = 0x45
+BPF_RET_K = 0x06
+
+# Offsets into struct seccomp_data
+SECCOMP_DATA_NR = 0
+SECCOMP_DATA_ARCH = 4
+# Low 32 bits of the first argument, where every CLONE_NEW* flag lives (both arches are little-endian)
+SECCOMP_DATA_ARG0 = 16
+
+# CLONE_NEWTIME, CLONE_NEWNS, CLONE_NEWCGROUP, CLONE_NEWUTS, CLONE_NEWIPC, CLONE_NEWUSER, CLONE_NEWPID, CLONE_NEWNET
+CLONE_NEW_FLAGS = 0x00000080 | 0x00020000 | 0x02000000 | 0x04000000 | 0x08000000 | 0x10000000 | 0x20000000 | 0x40000000
+
+# Syscalls a function has no business making, refused with EPERM
+DENIED_SYSCALLS = {
+    "x86_64": {
+        "audit_arch": 0xC000003E,
+        "clone": 56,
+        "clone3": 435,
+        "syscalls": [
+            101,  # ptrace
+            155,  # pivot_root
+            161,  # chroot
+            163,  # acct
+            164,  # settimeofday
+            165,  # mount
+            166,  # umount2
+            167,  # swapon
+            168,  # swapoff
+            169,  # reboot
+            175,  # init_module
+            176,  # delete_module
+            179,  # quotactl
+            212,  # lookup_dcookie
+            227,  # clock_settime
+            246,  # kexec_load
+            248,  # add_key
+            249,  # request_key
+            250,  # keyctl
+            272,  # unshare
+            298,  # perf_event_open
+            304,  # open_by_handle_at
+            308,  # setns
+            310,  # process_vm_readv
+            311,  # process_vm_writev
+            313,  # finit_module
+            320,  # kexec_file_load
+            321,  # bpf
+            323,  # userfaultfd
+            428, 429, 430, 431, 432, 433,  # open_tree, move_mount, fsopen, fsconfig, fsmount, fspick
+            442,  # mount_setattr
+        ],
+    },
+    "aarch64": {
+        "audit_arch": 0xC00000B7,
+        "clone": 220,
+        "clone3": 435,
+        "syscalls": [
+            18,  # lookup_dcookie
+            39,  # umount2
+            40,  # mount
+            41,  # pivot_root
+            51,  # chroot
+            60,  # quotactl
+            89,  # acct
+            97,  # unshare
+            104,  # kexec_load
+            105,  # init_module
+            106,  # delete_module
+            112,  # clock_settime
+            117,  # ptrace
+            142,  # reboot
+            170,  # settimeofday
+            217,  # add_key
+            218,  # request_key
+            219,  # keyctl
+            224,  # swapon
+            225,  # swapoff
+            241,  # perf_event_open
+            265,  # open_by_handle_at
+            268,  # setns
+            270,  # process_vm_readv
+            271,  # process_vm_writev
+            273,  # finit_module
+            280,  # bpf
+            282,  # userfaultfd
+            294,  # kexec_file_load
+            428, 429, 430, 431, 432, 433,  # open_tree, move_mount, fsopen, fsconfig, fsmount, fspick
+            442,  # mount_setattr
+        ],
+    },
+}
+
+libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+class SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_void_p)]
+
+
+def _check(result, what):
+    if result != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, f"{what}: {os.strerror(error)}")
+
+
+def mount_tmpfs(target, size_mb):
+    options = f"size={size_mb}m,mode=0755".encode()
+    _check(libc.mount(b"tmpfs", target.encode(), b"tmpfs", MS_NOSUID | MS_NODEV, options), "mount tmpfs")
+
+
+def set_limits(config):
+    limits = [
+        (resource.RLIMIT_CPU, config.get("cpu_seconds")),
+        (resource.RLIMIT_FSIZE, config.get("file_size_bytes")),
+        (resource.RLIMIT_NOFILE, config.get("open_files")),
+        (resource.RLIMIT_NPROC, config.get("processes")),
+        (resource.RLIMIT_AS, config.get("address_space_bytes")),
+        (resource.RLIMIT_CORE, 0),
+    ]
+    for limit, value in limits:
+        if value is not None:
+            resource.setrlimit(limit, (value, value))
+
+
+def assemble(program):
+    """Resolve jump targets given as labels (a string marks the next instruction) into BPF's relative offsets"""
+    labels, instructions = {}, []
+    for item in program:
+        if isinstance(item, str):
+            labels[item] = len(instructions)
+        else:
+            instructions.append(item)
+    return [
+        (code, *(labels[jump] - i - 1 if isinstance(jump, str) else jump for jump in (jt, jf)), k)
+        for i, (code, jt, jf, k) in enumerate(instructions)
+    ]
+
+
+def install_seccomp():
+    arch = DENIED_SYSCALLS.get(platform.machine())
+    if arch is None:
+        raise OSError(errno.ENOSYS, f"No seccomp policy for {platform.machine()}")
+
+    deny = SECCOMP_RET_ERRNO | errno.EPERM
+    program = [
+        (BPF_LD_W_ABS, 0, 0, SECCOMP_DATA_ARCH),
+        # Any other ABI (e.g. 32-bit calls on a 64-bit kernel) is not allowed at all
+        (BPF_JMP_JEQ_K, 1, 0, arch["audit_arch"]),
+        (BPF_RET_K, 0, 0, SECCOMP_RET_KILL_PROCESS),
+        (BPF_LD_W_ABS, 0, 0, SECCOMP_DATA_NR),
+    ]
+    if platform.machine() == "x86_64":
+        # x32 syscalls have bit 30 set
+        program.append((BPF_JMP_JGE_K, "deny", 0, 0x40000000))
+    program.append((BPF_JMP_JEQ_K, "enosys", 0, arch["clone3"]))
+    program.append((BPF_JMP_JEQ_K, "clone", 0, arch["clone"]))
+    for nr in arch["syscalls"]:
+        program.append((BPF_JMP_JEQ_K, "deny", 0, nr))
+    program += [
+        (BPF_RET_K, 0, 0, SECCOMP_RET_ALLOW),
+        "clone",
+        (BPF_LD_W_ABS, 0, 0, SECCOMP_DATA_ARG0),
+        (BPF_JMP_JSET_K, "deny", 0, CLONE_NEW_FLAGS),
+        (BPF_RET_K, 0, 0, SECCOMP_RET_ALLOW),
+        "deny",
+        (BPF_RET_K, 0, 0, deny),
+        "enosys",
+        (BPF_RET_K, 0, 0, SECCOMP_RET_ERRNO | errno.ENOSYS),
+    ]
+    program = assemble(program)
+
+    data = b"".join(struct.pack("HBBI", *instruction) for instruction in program)
+    buffer = ctypes.create_string_buffer(data, len(data))
+    fprog = SockFprog(len(program), ctypes.addressof(buffer))
+    _check(libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl(NO_NEW_PRIVS)")
+    _check(libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0), "prctl(SECCOMP)")
+
+
+def main():
+    config = json.loads(sys.argv[1])
+
+    with open(config["source"], "rb") as f:
+        code = f.read()
+
+    workdir = config["workdir"]
+    if config.get("tmpfs_mb"):
+        mount_tmpfs(config["tmpfs_root"], config["tmpfs_mb"])
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, config["filename"]), "wb") as f:
+        f.write(code)
+    os.chdir(workdir)
+
+    set_limits(config)
+    if config.get("seccomp"):
+        install_seccomp()
+
+    argv = config["argv"]
+    os.execvpe(argv[0], argv, config["env"])
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"sandbox: {e}", file=sys.stderr)
+        sys.exit(126)
@@ -0,0 +1,234 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from backend.metrics import SCHEDULER_QUEUE_WAIT, SCHEDULER_QUEUE_DEPTH, SCHEDULER_MEMORY_IN_USE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_MB = 128
+MEMORY_FRACTION = float(os.getenv("EXECUTION_MEMORY_FRACTION", "0.75"))
+
+# Priority classes and their share of capacity when both have work waiting
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_WEIGHTS = {
+    INTERACTIVE: float(os.getenv("SCHEDULER_INTERACTIVE_WEIGHT", "4")),
+    BATCH: float(os.getenv("SCHEDULER_BATCH_WEIGHT", "1")),
+}
+
+
+def default_memory_capacity_mb():
+    """Memory the scheduler may hand out to function containers"""
+    configured = os.getenv("EXECUTION_MEMORY_CAPACITY_MB")
+    if configured:
+        return max(DEFAULT_MEMORY_MB, int(configured))
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        return max(DEFAULT_MEMORY_MB, int(memory * MEMORY_FRACTION) // (1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        return 1024 * 1024  # Unknown, let the worker count be the only limit
+
+
+class Job:
+    def __init__(self, item, function, priority, cancelled=None):
+        self.item = item
+        self.priority = priority
+        self.cancelled = cancelled or (lambda: False)
+        self.function_key = getattr(function, "id", None)
+        self.memory_mb = getattr(function, "memory_mb", None) or DEFAULT_MEMORY_MB
+        self.enqueued_at = time.monotonic()
+
+
+class _FlowState:
+    """Queued jobs and counters of one function within the scheduler"""
+
+    def __init__(self):
+        self.queues = {priority: deque() for priority in PRIORITY_WEIGHTS}
+        self.running = 0
+        self.reserved = 0
+        self.max_concurrency = None
+        self.memory_mb = DEFAULT_MEMORY_MB
+        self.virtual_time = {priority: 0.0 for priority in PRIORITY_WEIGHTS}
+
+    def idle(self):
+        return self.running == 0 and not any(self.queues.values())
+
+
+class FairShareScheduler:
+    """
+    Decides which queued execution runs next.
+
+    Capacity is host memory: each running execution holds its function's
+    memory_mb. On top of that each function may have:
+      - reserved_concurrency: executions that always find room, because other
+        functions cannot use memory set aside for its unused reservations
+      - max_concurrency: a hard cap on its running executions
+
+    Eligible work is picked by weighted fair queuing in two levels: first
+    between priority classes (PRIORITY_WEIGHTS), then between functions within
+    the class, so a bursty function only gets its share instead of every slot.
+    """
+
+    def __init__(self, max_queue_depth, memory_capacity_mb=None):
+        self.max_queue_depth = max_queue_depth
+        self.memory_capacity_mb = memory_capacity_mb or default_memory_capacity_mb()
+        self._flows = {}  # function key -> _FlowState
+        self._class_time = {priority: 0.0 for priority in PRIORITY_WEIGHTS}
+        self._queued = 0
+        self._memory_in_use = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def qsize(self):
+        return self._queued
+
+    def memory_in_use(self):
+        return self._memory_in_use
+
+    def configure(self, function):
+        """Record a function's concurrency settings, so its reservation holds before it is first invoked"""
+        with self._condition:
+            self._configure(self._flow(getattr(function, "id", None)), function)
+            self._condition.notify_all()
+
+    def forget(self, function_id):
+        """Drop a deleted function's reservation"""
+        with self._condition:
+            flow = self._flows.get(function_id)
+            if flow is not None:
+                flow.reserved = 0
+                if flow.idle():
+                    del self._flows[function_id]
+            self._condition.notify_all()
+
+    def put(self, item, function=None, priority=INTERACTIVE, cancelled=None):
+        """Queue an item; returns False if the scheduler is full"""
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Unknown priority class: {priority}")
+        job = Job(item, function, priority, cancelled)
+        with self._condition:
+            if self._queued >= self.max_queue_depth:
+                return False
+            flow = self._flow(job.function_key)
+            self._configure(flow, function)
+
+            # Flows and classes that went quiet must not bank credit for the time they were away
+            if not any(f.queues[priority] for f in self._flows.values()):
+                active = [self._class_time[p] for p in PRIORITY_WEIGHTS
+                          if any(f.queues[p] for f in self._flows.values())]
+                # With nothing queued anywhere, a class starts level with the one furthest ahead
+                latest = max(self._class_time.values())
+                self._class_time[priority] = max(self._class_time[priority], min(active, default=latest))
+            queue = flow.queues[priority]
+            if not queue:
+                flow.virtual_time[priority] = max(flow.virtual_time[priority], self._min_virtual_time(priority))
+            queue.append(job)
+            self._queued += 1
+            SCHEDULER_QUEUE_DEPTH.labels(priority=priority).inc()
+            self._condition.notify()
+        return True
+
+    def take(self):
+        """Block until a job may run and return it, or None once closed and drained"""
+        with self._condition:
+            while True:
+                job = self._pick()
+                if job is not None:
+                    return job
+                if self._closed and self._queued == 0:
+                    return None
+                self._condition.wait()
+
+    def done(self, job):
+        """Release what a job returned by take() was holding"""
+        with self._condition:
+            flow = self._flows[job.function_key]
+            flow.running -= 1
+            self._memory_in_use -= job.memory_mb
+            SCHEDULER_MEMORY_IN_USE.set(self._memory_in_use)
+            if flow.idle() and flow.reserved == 0:
+                del self._flows[job.function_key]
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _configure(self, flow, function):
+        flow.reserved = max(0, getattr(function, "reserved_concurrency", None) or 0)
+        flow.max_concurrency = getattr(function, "max_concurrency", None) or None
+        flow.memory_mb = getattr(function, "memory_mb", None) or DEFAULT_MEMORY_MB
+
+    def _flow(self, key):
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _FlowState()
+        return flow
+
+    def _min_virtual_time(self, priority):
+        active = [f.virtual_time[priority] for f in self._flows.values() if f.queues[priority]]
+        return min(active, default=0.0)
+
+    def _unused_reservations_mb(self, excluding):
+        return sum(
+            max(0, flow.reserved - flow.running) * flow.memory_mb
+            for key, flow in self._flows.items() if key != excluding
+        )
+
+    def _eligible(self, key, flow, job):
+        if flow.max_concurrency is not None and flow.running >= flow.max_concurrency:
+            return False
+        if self._memory_in_use == 0:
+            # Never leave the host idle, even for a job larger than the whole capacity
+            return True
+        # Memory set aside for other functions' unused reservations is off limits; a function
+        # still inside its own reservation is using memory that was set aside for it
+        free = self.memory_capacity_mb - self._memory_in_use - self._unused_reservations_mb(excluding=key)
+        return job.memory_mb <= free
+
+    def _pick(self):
+        # Ordered by virtual finish time: where each would be after one more turn
+        classes = sorted(
+            (p for p in PRIORITY_WEIGHTS if any(f.queues[p] for f in self._flows.values())),
+            key=lambda p: self._class_time[p] + 1.0 / PRIORITY_WEIGHTS[p]
+        )
+        for priority in classes:
+            candidates = sorted(
+                ((flow.virtual_time[priority] + flow.memory_mb, key, flow)
+                 for key, flow in self._flows.items() if flow.queues[priority]),
+                key=lambda c: c[0]
+            )
+            for _, key, flow in candidates:
+                queue = flow.queues[priority]
+                # Drop executions whose client went away while they were queued
+                while queue and queue[0].cancelled():
+                    queue.popleft()
+                    self._dequeued(priority)
+                if not queue:
+                    if flow.idle() and flow.reserved == 0:
+                        del self._flows[key]
+                    continue
+                if not self._eligible(key, flow, queue[0]):
+                    continue
+
+                job = queue.popleft()
+                self._dequeued(priority)
+                flow.running += 1
+                # Fair in memory-time: a 512 MB function's turn counts four times a 128 MB one's
+                flow.virtual_time[priority] += job.memory_mb
+                self._class_time[priority] += 1.0 / PRIORITY_WEIGHTS[priority]
+                self._memory_in_use += job.memory_mb
+                SCHEDULER_MEMORY_IN_USE.set(self._memory_in_use)
+                SCHEDULER_QUEUE_WAIT.labels(
+                    function_id=str(key), priority=priority
+                ).observe(time.monotonic() - job.enqueued_at)
+                return job
+        return None
+
+    def _dequeued(self, priority):
+        self._queued -= 1
+        SCHEDULER_QUEUE_DEPTH.labels(priority=priority).dec()
@@ -0,0 +1,78 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from backend import tracing
+
+_current = threading.local()
+
+
+class InvocationTimings:
+    """
+    Seconds spent in each phase of one invocation, in the order the phases started.
+
+    The request path records the phases before the dispatcher ("lookup", "queue");
+    the executor records the rest through phase() while the timings are active on
+    its worker thread.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        # Set when a container (or process) had to be started for this invocation
+        self.cold_start = False
+        self._queued_at = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        # Each phase is also a span of the request's trace, when it is sampled
+        start_time = time.perf_counter()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            self.add(name, time.perf_counter() - start_time)
+
+    def queued(self):
+        """Mark the invocation as handed to the dispatcher"""
+        self._queued_at = time.perf_counter()
+
+    def dequeued(self):
+        """Mark the invocation as picked up by a worker, recording the "queue" phase"""
+        if self._queued_at is not None:
+            self.add("queue", time.perf_counter() - self._queued_at)
+            self._queued_at = None
+
+    def to_dict(self):
+        return {name: round(seconds, 6) for name, seconds in self.phases.items()}
+
+
+@contextmanager
+def activate(timings):
+    """Make timings the target of phase() on this thread"""
+    previous = getattr(_current, "timings", None)
+    _current.timings = timings
+    try:
+        yield timings
+    finally:
+        _current.timings = previous
+
+
+@contextmanager
+def phase(name):
+    """Time a block into the active invocation's timings, if any"""
+    timings = getattr(_current, "timings", None)
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+def mark_cold_start():
+    """Record on the active invocation's timings, if any, that it had to start a container"""
+    timings = getattr(_current, "timings", None)
+    if timings is not None:
+        timings.cold_start = True
@@ -0,0 +1,267 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+PERCENTILES = (50, 95, 99)
+
+
+class Sample:
+    def __init__(self, started, latency, ok, cold, phases):
+        self.started = started
+        self.latency = latency
+        self.ok = ok
+        self.cold = cold
+        self.phases = phases
+
+
+def http_target(url, function_id, event, timeout):
+    """Invoke /functions/{id}/execute over HTTP; the server may be running with DOCKER_CLIENT=fake"""
+    endpoint = f"{url.rstrip('/')}/functions/{function_id}/execute"
+    body = json.dumps(event).encode("utf-8")
+
+    def invoke():
+        request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": "application/json"},
+                                         method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                result = json.loads(response.read()).get("result", {})
+        except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError):
+            return False, False, {}
+        ok = result.get("status", "success") == "success" and "error" not in result.get("result", {})
+        return ok, bool(result.get("cold_start")), result.get("timings") or {}
+
+    return invoke
+
+
+def direct_target(code, language, mode, backend, event, timeout):
+    """Call execute_function_engine in this process, skipping HTTP and the database"""
+    from backend.execution.function_executor_cli import make_function, load_executor
+    from backend.engine.executor import execute_function_engine, result_status
+
+    function = make_function(code, language, timeout, mode)
+    function.backend = backend
+    load_executor(backend)  # Waits for runtime images, so they are not part of the first sample
+
+    def invoke():
+        result = execute_function_engine(function, event)
+        return result_status(result) == "success", bool(result.get("cold_start")), result.get("timings") or {}
+
+    return invoke
+
+
+def run(invoke, concurrency, duration=None, requests=None):
+    """Call invoke() from `concurrency` threads until the duration passes or `requests` have been made"""
+    samples = []
+    lock = threading.Lock()
+    issued = [0]
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker():
+        while True:
+            with lock:
+                if requests is not None and issued[0] >= requests:
+                    return
+                issued[0] += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            started = time.perf_counter()
+            try:
+                ok, cold, phases = invoke()
+            except Exception:
+                ok, cold, phases = False, False, {}
+            sample = Sample(started - start, time.perf_counter() - started, ok, cold, phases)
+            with lock:
+                samples.append(sample)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    # Nearest rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": sum(values) / len(values) * 1000, "max": values[-1] * 1000}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p) * 1000
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+def summarize(samples, elapsed):
+    phases = {}
+    for sample in samples:
+        for name, seconds in sample.phases.items():
+            phases.setdefault(name, []).append(seconds)
+    errors = sum(1 for sample in samples if not sample.ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": latency_summary([s.latency for s in samples]),
+        "cold_latency_ms": latency_summary([s.latency for s in samples if s.cold]),
+        "warm_latency_ms": latency_summary([s.latency for s in samples if not s.cold]),
+        "phases_mean_ms": {name: round(sum(values) / len(values) * 1000, 3) for name, values in phases.items()},
+    }
+
+
+def compare(summary, baseline, max_regression):
+    """Metrics that got worse than the baseline by more than max_regression (a fraction)"""
+    regressions = []
+    checks = [("throughput_rps", summary["throughput_rps"], baseline.get("throughput_rps"), False)]
+    for key in ("p50", "p95", "p99"):
+        checks.append((f"latency_ms.{key}", summary["latency_ms"].get(key),
+                       baseline.get("latency_ms", {}).get(key), True))
+    for name, current, previous, lower_is_better in checks:
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        if (change if lower_is_better else -change) > max_regression:
+            regressions.append(f"{name}: {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+
+def print_summary(summary):
+    print(f"\nrequests: {summary['requests']}  errors: {summary['errors']}  "
+          f"elapsed: {summary['elapsed_seconds']} s  throughput: {summary['throughput_rps']} req/s")
+    print(f"{'':8}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for label, key in (("all", "latency_ms"), ("cold", "cold_latency_ms"), ("warm", "warm_latency_ms")):
+        row = summary[key]
+        if not row["count"]:
+            continue
+        print(f"{label:8}{row['count']:>8}" + "".join(
+            f"{row[column]:>10.1f}" for column in ("mean", "p50", "p95", "p99", "max")))
+    if summary["phases_mean_ms"]:
+        print("\nphase means (ms): " + ", ".join(
+            f"{name} {ms:.1f}" for name, ms in summary["phases_mean_ms"].items()))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="function_executor_cli.py benchmark",
+        description="Drive function executions at a fixed concurrency and report throughput and latency"
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", type=str, help="API base URL; invokes /functions/{id}/execute")
+    target.add_argument("--direct", action="store_true", help="Call the executor in this process instead")
+    parser.add_argument("--function-id", type=int, help="Function to invoke (with --url)")
+    parser.add_argument("--code", type=str, help="Code to execute (with --direct)")
+    parser.add_argument("--file", type=str, help="File containing code to execute (with --direct)")
+    parser.add_argument("--language", type=str, default="python", choices=["python", "javascript"])
+    parser.add_argument("--mode", type=str, default="script", choices=["script", "handler"])
+    parser.add_argument("--backend", type=str, default="docker", choices=["docker", "process"])
+    parser.add_argument("--fake-docker", action="store_true",
+                        help="With --direct, use the in-process fake Docker client (see FAKE_DOCKER_LATENCIES)")
+    parser.add_argument("--event", type=str, help="JSON event passed to every invocation")
+    parser.add_argument("--timeout", type=int, default=30, help="Function timeout in seconds")
+    parser.add_argument("--concurrency", type=int, default=4, help="Invocations in flight at once")
+    parser.add_argument("--duration", type=float, help="Seconds to run for")
+    parser.add_argument("--requests", type=int, help="Number of invocations to make")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="Invocations made (and left out of the results) before measuring")
+    parser.add_argument("--output", type=str, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", type=str, help="Baseline results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Fail (exit 1) when throughput or a latency percentile is this much worse")
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.requests is None:
+        args.requests = 100
+    event = json.loads(args.event) if args.event else None
+
+    if args.url:
+        if args.function_id is None:
+            parser.error("--url needs --function-id")
+        invoke = http_target(args.url, args.function_id, event, args.timeout + 30)
+    else:
+        code = args.code
+        if args.file:
+            with open(args.file, "r") as f:
+                code = f.read()
+        if not code:
+            parser.error("--direct needs --code or --file")
+        if args.fake_docker:
+            # Must be set before the executor creates its client
+            os.environ["DOCKER_CLIENT"] = "fake"
+        invoke = direct_target(code, args.language, args.mode, args.backend, event, args.timeout)
+
+    if args.warmup:
+        run(invoke, min(args.concurrency, args.warmup), requests=args.warmup)
+    print(f"Running at concurrency {args.concurrency} for "
+          f"{f'{args.duration} s' if args.duration else f'{args.requests} requests'}...")
+    samples, elapsed = run(invoke, args.concurrency, args.duration, args.requests)
+    summary = summarize(samples, elapsed)
+    print_summary(summary)
+
+    results = dict(summary, config={
+        "target": args.url or "direct",
+        "function_id": args.function_id,
+        "language": args.language,
+        "mode": args.mode,
+        "backend": args.backend,
+        "docker_client": os.getenv("DOCKER_CLIENT") or "docker",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "requests": args.requests,
+        "warmup": args.warmup,
+    }, environment={
+        "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    })
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, args.max_regression)
+        if regressions:
+            print("\n--- REGRESSIONS ---")
+            for line in regressions:
+                print(line)
+            return 1
+        print(f"\nNo regressions beyond {args.max_regression:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
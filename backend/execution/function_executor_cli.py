@@ -1,41 +1,117 @@
 import argparse
+import json
 import sys
+import time
 import logging
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from backend.engine.executor import docker_executor
+from backend.engine.timing import InvocationTimings, activate
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def test_function_execution(code, language="python", timeout=10):
-    """Simple wrapper to test function execution via CLI"""
-
+def make_function(code, language="python", timeout=10, mode="script"):
     # Creating a simple function object
     class Function:
         pass
 
     fn = Function()
+    fn.id = None
+    fn.name = "cli"
     fn.code = code
     fn.language = language
     fn.timeout = timeout
+    fn.runtime_mode = mode
+    return fn
+
+
+def load_executor(backend):
+    """Import backends on demand, so the process sandbox can be tried on a host without Docker"""
+    if backend == "process":
+        from backend.engine.process_sandbox import process_executor
+        return process_executor
+    from backend.engine.executor import get_docker_executor
+    executor = get_docker_executor()
+    # A first run on this host builds the runtime images; wait for them instead of failing
+    if not executor.wait_until_ready():
+        raise RuntimeError(executor.status().get("error"))
+    return executor
 
-    # Use the existing executor
-    result = docker_executor.execute_function(fn)
+
+def test_function_execution(code, language="python", timeout=10, mode="script", event=None, backend="docker",
+                            profile=False):
+    """Simple wrapper to test function execution via CLI"""
+    fn = make_function(code, language, timeout, mode)
+    fn.backend = backend
+
+    # Use the existing executor, recording where the time goes
+    timings = InvocationTimings()
+    with activate(timings):
+        result = load_executor(backend).execute_function(fn, event, profile=profile)
+    result["timings"] = timings.to_dict()
     return result
 
 
+def print_result(result):
+    data = result.get("result", result)
+    if "output" in data:
+        print("\n--- OUTPUT ---")
+        print(data["output"])
+        if data.get("return_value") is not None:
+            print("\n--- RETURN VALUE ---")
+            print(json.dumps(data["return_value"], indent=2))
+    elif "error" in data:
+        print("\n--- ERROR ---")
+        print(data["error"])
+
+    print("\n--- PHASES (last run) ---")
+    for name, seconds in result["timings"].items():
+        print(f"{name}: {seconds * 1000:.1f} ms")
+
+    profile = result.get("profile")
+    if profile:
+        print("\n--- PROFILE (last run) ---")
+        if "error" in profile:
+            print(profile["error"])
+        else:
+            print(f"{profile['profiler']}: {profile['samples']} samples, {profile['cpu_ms']} ms CPU "
+                  f"in {profile['duration_ms']} ms")
+            print(f"{'self %':>8}{'self ms':>10}{'total %':>9}  function")
+            for spot in profile["hotspots"]:
+                print(f"{spot['self_percent']:>8.1f}{spot['self_ms']:>10.1f}{spot['total_percent']:>9.1f}  "
+                      f"{spot['function']} ({spot['location']})")
+    print()
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Test Docker function execution")
+    if sys.argv[1:2] == ["benchmark"]:
+        from backend.execution.benchmark import main as benchmark
+        return benchmark(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(
+        description="Test function execution on an executor backend "
+                    "(or `benchmark --help` for the load-testing subcommand)"
+    )
     parser.add_argument("--code", type=str, help="Code to execute")
     parser.add_argument("--file", type=str, help="File containing code to execute")
     parser.add_argument("--language", type=str, default="python",
                         choices=["python", "javascript"], help="Language runtime")
     parser.add_argument("--timeout", type=int, default=10, help="Execution timeout in seconds")
+    parser.add_argument("--mode", type=str, default="script", choices=["script", "handler"],
+                        help="Run the file as a script or call handler(event, context)")
+    parser.add_argument("--event", type=str, help="JSON event passed to the function")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Run the function this many times and report per-invocation latency")
+    parser.add_argument("--backend", type=str, default="docker", choices=["docker", "process", "all"],
+                        help="Executor backend to run on; 'all' runs each and compares latency")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run under the runtime's sampling profiler and print the hotspots")
+    parser.add_argument("--profile-output", type=str,
+                        help="With --profile, write the collapsed stacks (for flamegraph.pl) to this file")
 
     args = parser.parse_args()
 
@@ -47,15 +123,32 @@ def main():
     if not code:
         parser.error("Either --code or --file must be provided")
 
-    print(f"Executing {args.language} function with timeout {args.timeout}s...")
-    result = test_function_execution(code, args.language, args.timeout)
-
-    if "output" in result:
-        print("\n--- OUTPUT ---")
-        print(result["output"])
-    elif "error" in result:
-        print("\n--- ERROR ---")
-        print(result["error"])
+    event = json.loads(args.event) if args.event else None
+
+    backends = ["docker", "process"] if args.backend == "all" else [args.backend]
+    latencies = {}
+    for backend in backends:
+        print(f"Executing {args.language} function ({args.mode} mode) on {backend} with timeout {args.timeout}s...")
+        timings = []
+        for _ in range(args.repeat):
+            start_time = time.perf_counter()
+            result = test_function_execution(code, args.language, args.timeout, args.mode, event, backend,
+                                             args.profile)
+            timings.append(time.perf_counter() - start_time)
+        latencies[backend] = timings
+        print_result(result)
+        if args.profile_output and result.get("profile", {}).get("collapsed") is not None:
+            with open(args.profile_output, "w") as f:
+                f.write(result["profile"]["collapsed"])
+            print(f"Collapsed stacks written to {args.profile_output}\n")
+
+    if args.repeat > 1:
+        # The first run includes container start, the rest show the warm path
+        print("\n--- LATENCY ---")
+        for backend, timings in latencies.items():
+            warm = sorted(timings[1:])
+            print(f"{backend}: first: {timings[0] * 1000:.1f} ms, "
+                  f"warm median: {warm[len(warm) // 2] * 1000:.1f} ms, min: {warm[0] * 1000:.1f} ms")
 
     return 0
 
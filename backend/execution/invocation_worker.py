@@ -0,0 +1,106 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from backend import crud
+from backend.db import SessionLocal
+from backend.engine.executor import execute_function_engine, get_docker_executor
+from backend.stats import function_stats
+from backend import tracing
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("INVOCATION_POLL_INTERVAL", "0.5"))
+MAX_ATTEMPTS = int(os.getenv("INVOCATION_MAX_ATTEMPTS", "3"))
+
+
+def process_next_invocation(worker_id):
+    """Claim and run one queued invocation. Returns False if the queue was empty."""
+    db = SessionLocal()
+    try:
+        invocation = crud.claim_invocation(db, worker_id)
+        if invocation is None:
+            return False
+
+        if invocation.attempts > MAX_ATTEMPTS:
+            # A worker died holding this invocation too many times, stop retrying it
+            crud.complete_invocation(db, invocation, {
+                "status": "error",
+                "result": {"error": f"Invocation abandoned after {MAX_ATTEMPTS} attempts"}
+            })
+            return True
+
+        function = invocation.function
+        logger.info(f"{worker_id} running invocation {invocation.id} of function {function.id}")
+        # Nobody is around to see this process's ring buffer, so set TRACE_EXPORTER=jsonl for workers
+        with tracing.trace("invocation", invocation_id=invocation.id, function_id=function.id):
+            try:
+                event = json.loads(invocation.payload) if invocation.payload else None
+                result = execute_function_engine(function, event)
+            except Exception as e:
+                result = {"status": "error", "result": {"error": f"Execution failed: {str(e)}"}}
+
+            crud.complete_invocation(db, invocation, result)
+            crud.log_execution_result(db, function_id=function.id, result=result)
+            function_stats.record(crud.execution_log_row(function.id, result))
+        return True
+    finally:
+        db.close()
+
+
+def run_worker(worker_id, stop):
+    """Drain the queue until asked to stop, polling while it is empty"""
+    logger.info(f"Invocation worker {worker_id} started")
+    while not stop.is_set():
+        try:
+            worked = process_next_invocation(worker_id)
+        except Exception as e:
+            logger.error(f"{worker_id} failed to process invocation: {str(e)}")
+            worked = False
+        if not worked:
+            stop.wait(POLL_INTERVAL)
+    logger.info(f"Invocation worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the asynchronous invocation queue")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("INVOCATION_WORKER_CONCURRENCY", "2")),
+                        help="Invocations this process runs at the same time")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    # Don't claim invocations before there is a runtime to run them in
+    executor = get_docker_executor()
+    if not executor.wait_until_ready():
+        logger.error(f"Runtime images unavailable: {executor.status().get('error')}")
+        return 1
+
+    function_stats.start()
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    threads = [
+        threading.Thread(target=run_worker, args=(f"{prefix}-{i}", stop), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    function_stats.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel
+
+from backend import crud
+from backend.db import SessionLocal, AsyncSessionLocal, async_engine
+from backend.engine.artifacts import artifact_store
+from backend.engine.dependency_images import DependenciesNotReadyError
+from backend.engine.dispatcher import execution_dispatcher, QueueFullError, DispatcherUnavailableError
+from backend.engine.executor import (
+    get_docker_executor, execute_function_engine, started_executors, RuntimeNotReadyError
+)
+from backend.engine.process_sandbox import SandboxUnavailableError
+from backend.engine.scheduler import INTERACTIVE
+from backend.engine.timing import InvocationTimings
+from backend.function_cache import function_cache, invalidation_listener
+from backend import tracing
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_NODE_HEARTBEAT_INTERVAL", "5"))
+# Functions a node advertises as warm: the ones it ran most recently
+WARM_FUNCTIONS_MAX = int(os.getenv("WORKER_NODE_WARM_FUNCTIONS", "256"))
+
+
+class NodeExecuteRequest(BaseModel):
+    function_id: int
+    code_hash: Optional[str] = None  # Lets the node notice its cached definition is stale
+    event: Optional[Any] = None
+    priority: str = INTERACTIVE
+    profile: bool = False
+
+
+class WorkerNode:
+    """
+    An execution node: runs invocations routed to it by the API and heartbeats
+    its capacity, load and warm state into the worker_nodes table.
+    """
+
+    def __init__(self, node_id, url):
+        self.id = node_id
+        self.url = url
+        self._warm = OrderedDict()  # function id -> code hash
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="worker-node-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        db = SessionLocal()
+        try:
+            # Leave the cluster right away instead of waiting for the heartbeat to go stale
+            crud.delete_worker_node(db, self.id)
+        except Exception as e:
+            logger.warning(f"Failed to deregister worker node {self.id}: {str(e)}")
+        finally:
+            db.close()
+
+    def ran(self, function):
+        with self._lock:
+            self._warm[str(function.id)] = function.code_hash
+            self._warm.move_to_end(str(function.id))
+            while len(self._warm) > WARM_FUNCTIONS_MAX:
+                self._warm.popitem(last=False)
+
+    def state(self):
+        with self._lock:
+            warm = dict(self._warm)
+        return dict(
+            execution_dispatcher.load(),
+            id=self.id,
+            url=self.url,
+            warm_functions=warm,
+            artifacts=artifact_store.digests(),
+            images=get_docker_executor().dependencies.ready_images(),
+        )
+
+    def heartbeat(self):
+        db = SessionLocal()
+        try:
+            crud.heartbeat_worker_node(db, self.state())
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"Worker node heartbeat failed: {str(e)}")
+            self._stop.wait(HEARTBEAT_INTERVAL)
+
+
+def create_app(node):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Starts checking (and if needed building) the runtime images in the background
+        get_docker_executor()
+        invalidation_listener.start()
+        node.start()
+        yield
+        # Deregister first, so the router stops sending work while the queue drains
+        node.stop()
+        invalidation_listener.stop()
+        execution_dispatcher.shutdown()
+        for executor in started_executors():
+            executor.shutdown()
+        await async_engine.dispose()
+
+    app = FastAPI(title="Serverless execution node", lifespan=lifespan)
+
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        # Continues the API's trace when it sent a traceparent
+        root, token = tracing.start_trace(f"node {request.method} {request.url.path}",
+                                          request.headers.get("traceparent"), node=node.id)
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            tracing.finish_trace(root, token, e)
+            raise
+        root.set(status_code=response.status_code)
+        response.headers["X-Trace-Id"] = root.trace_id
+        tracing.finish_trace(root, token)
+        return response
+
+    @app.post("/execute")
+    async def execute(request: NodeExecuteRequest):
+        timings = InvocationTimings()
+        with timings.phase("lookup"):
+            async with AsyncSessionLocal() as db:
+                function = await function_cache.get_async(db, request.function_id)
+                if request.code_hash and function.code_hash != request.code_hash:
+                    function_cache.invalidate(request.function_id)
+                    function = await function_cache.get_async(db, request.function_id)
+        try:
+            timings.queued()
+            result = await execution_dispatcher.submit(
+                execute_function_engine, function, request.event, None, timings, request.profile,
+                function=function, priority=request.priority
+            )
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail="Node is saturated",
+                                headers={"Retry-After": str(e.retry_after)})
+        except (DispatcherUnavailableError, RuntimeNotReadyError, SandboxUnavailableError) as e:
+            # The router tries another node for these
+            raise HTTPException(status_code=503, detail={"reason": "unavailable", "message": str(e)})
+        except DependenciesNotReadyError as e:
+            raise HTTPException(status_code=503, detail={"reason": "dependencies", "message": str(e)})
+        node.ran(function)
+        return {"node": node.id, "result": result}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "node": node.id, **execution_dispatcher.load()}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an execution node that takes invocations routed by the API")
+    parser.add_argument("--host", type=str, default=os.getenv("WORKER_NODE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("WORKER_NODE_PORT", "9000")))
+    parser.add_argument("--url", type=str, default=os.getenv("WORKER_NODE_URL"),
+                        help="URL the API reaches this node at (default: http://<host ip>:<port>)")
+    args = parser.parse_args()
+
+    hostname = socket.gethostname()
+    url = args.url or f"http://{socket.gethostbyname(hostname)}:{args.port}"
+    # Several nodes may share a host (the local stand-in for a cluster), so the port is part of the id
+    node = WorkerNode(f"{hostname}:{args.port}", url)
+    logger.info(f"Starting worker node {node.id} at {url}")
+    uvicorn.run(create_app(node), host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import crud
+from backend.db import engine
+from backend.engine.artifacts import artifact_store, code_hash
+from backend.result_cache import result_cache
+from backend.metrics import FUNCTION_CACHE_LOOKUPS, FUNCTION_CACHE_LOOKUP_TIME, FUNCTION_CACHE_INVALIDATIONS
+
+logger = logging.getLogger(__name__)
+
+FUNCTION_CACHE_MAX_ENTRIES = int(os.getenv("FUNCTION_CACHE_MAX_ENTRIES", "1024"))
+FUNCTION_CACHE_TTL = float(os.getenv("FUNCTION_CACHE_TTL", "60"))
+
+
+class FunctionDefinition:
+    """Detached, read-only snapshot of a function with everything the executor needs"""
+
+    def __init__(self, function):
+        self.id = function.id
+        self.name = function.name
+        self.language = function.language
+        self.code = function.code
+        self.code_hash = code_hash(function.code)
+        self.timeout = function.timeout
+        self.runtime_mode = getattr(function, "runtime_mode", None) or "script"
+        self.provisioned_concurrency = getattr(function, "provisioned_concurrency", 0) or 0
+        self.dependencies = getattr(function, "dependencies", None)
+        self.output_limit = getattr(function, "output_limit", None)
+        self.memory_mb = getattr(function, "memory_mb", None)
+        self.reserved_concurrency = getattr(function, "reserved_concurrency", 0) or 0
+        self.max_concurrency = getattr(function, "max_concurrency", None)
+        self.backend = getattr(function, "backend", None)
+        self.cacheable = bool(getattr(function, "cacheable", False))
+        self.artifact = artifact_store.materialize_function(self)
+
+
+class FunctionCache:
+    """Bounded LRU cache of function definitions with a TTL as a safety net for missed invalidations"""
+
+    def __init__(self, max_entries=FUNCTION_CACHE_MAX_ENTRIES, ttl=FUNCTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> (expires_at, FunctionDefinition)
+        self._lock = threading.Lock()
+
+    def peek(self, id: int):
+        """Return the cached definition, or None on a miss, without touching the database"""
+        start_time = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(id)
+                FUNCTION_CACHE_LOOKUPS.labels(result="hit").inc()
+                FUNCTION_CACHE_LOOKUP_TIME.labels(result="hit").observe(time.perf_counter() - start_time)
+                return entry[1]
+            if entry is not None:
+                del self._entries[id]
+        return None
+
+    def get(self, db: Session, id: int):
+        """Return the function definition, loading it from the database on a miss"""
+        definition = self.peek(id)
+        if definition is not None:
+            return definition
+
+        start_time = time.perf_counter()
+        definition = FunctionDefinition(crud.get_function(db, id=id))
+        self._store(id, definition, start_time)
+        return definition
+
+    async def get_async(self, db: AsyncSession, id: int):
+        """Like get(), loading a miss over the async engine instead of blocking a thread on it"""
+        definition = self.peek(id)
+        if definition is not None:
+            return definition
+
+        start_time = time.perf_counter()
+        function = await crud.get_function_async(db, id=id)
+        # Materializing the artifact may write it to disk, so keep that off the event loop
+        definition = await asyncio.get_running_loop().run_in_executor(None, FunctionDefinition, function)
+        self._store(id, definition, start_time)
+        return definition
+
+    def _store(self, id, definition, start_time):
+        with self._lock:
+            self._entries[id] = (time.monotonic() + self.ttl, definition)
+            self._entries.move_to_end(id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        FUNCTION_CACHE_LOOKUPS.labels(result="miss").inc()
+        FUNCTION_CACHE_LOOKUP_TIME.labels(result="miss").observe(time.perf_counter() - start_time)
+
+    def invalidate(self, id: int):
+        with self._lock:
+            if self._entries.pop(id, None) is not None:
+                FUNCTION_CACHE_INVALIDATIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class InvalidationListener:
+    """Background thread that LISTENs for function changes made by other API processes"""
+
+    def __init__(self, *caches, poll_interval=5.0):
+        self.caches = caches
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="function-cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                driver = connection.driver_connection
+                driver.autocommit = True  # LISTEN only takes effect outside a transaction
+                driver.cursor().execute(f"LISTEN {crud.FUNCTION_CHANGES_CHANNEL}")
+                # Anything could have changed while we were not listening
+                for cache in self.caches:
+                    cache.clear()
+                while not self._stop.is_set():
+                    if select.select([driver], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        notification = driver.notifies.pop(0)
+                        for cache in self.caches:
+                            try:
+                                cache.invalidate(int(notification.payload))
+                            except ValueError:
+                                cache.clear()
+            except Exception as e:
+                logger.warning(f"Function cache listener error, reconnecting: {str(e)}")
+                self._stop.wait(self.poll_interval)
+            finally:
+                if connection is not None:
+                    # Don't hand an autocommit connection back to the pool
+                    connection.invalidate()
+
+
+# Export singletons for app-wide use
+function_cache = FunctionCache()
+invalidation_listener = InvalidationListener(function_cache, result_cache)
@@ -1,6 +1,6 @@
 # init_db.py
 from backend.db import engine, Base
-from backend.models import Function, ExecutionLog  # Import all your models
+from backend.models import Function, ExecutionLog, ExecutionProfile, ExecutionRollup, Invocation, WorkerNode, FunctionStats  # Import all your models
 
 def init_database():
     print("Creating database tables...")
@@ -0,0 +1,105 @@
+import datetime
+import logging
+import os
+import threading
+
+from sqlalchemy import text
+
+from backend import models
+from backend.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "14"))
+ROLLUP_RETENTION_DAYS = int(os.getenv("ROLLUP_RETENTION_DAYS", "90"))
+LOG_PARTITION_DAYS_AHEAD = int(os.getenv("LOG_PARTITION_DAYS_AHEAD", "7"))
+LOG_PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("LOG_PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+
+class LogMaintenance:
+    """
+    Background thread that keeps the partitioned execution_logs table in shape.
+
+    Each round creates the daily partitions for the coming days, drops partitions
+    older than the log retention, and deletes expired rollup buckets and profiles
+    as old as the logs that went with them. The SQL functions it calls take an
+    advisory lock, so several API processes can run this at the same time.
+
+    A database created by init_db (create_all) rather than init.sql has neither
+    the partitions nor those functions; there expired logs are deleted row by row.
+    """
+
+    def __init__(self, interval=LOG_PARTITION_MAINTENANCE_INTERVAL, retention_days=LOG_RETENTION_DAYS,
+                 rollup_retention_days=ROLLUP_RETENTION_DAYS, days_ahead=LOG_PARTITION_DAYS_AHEAD):
+        self.interval = interval
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.days_ahead = days_ahead
+        self._stop = threading.Event()
+        self._thread = None
+        self._warned_unpartitioned = False
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Execution log maintenance failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        db = SessionLocal()
+        try:
+            log_cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=self.retention_days)
+            if self._partitioned(db):
+                db.execute(text("SELECT ensure_execution_log_partitions(:days_ahead)"),
+                           {"days_ahead": self.days_ahead})
+                dropped = db.execute(text("SELECT drop_execution_log_partitions(:retention_days)"),
+                                     {"retention_days": self.retention_days}).scalar()
+                logs = 0
+            else:
+                dropped = 0
+                logs = db.query(models.ExecutionLog).filter(
+                    models.ExecutionLog.created_at < log_cutoff
+                ).delete(synchronize_session=False)
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=self.rollup_retention_days)
+            expired = db.query(models.ExecutionRollup).filter(
+                models.ExecutionRollup.bucket_start < cutoff
+            ).delete(synchronize_session=False)
+            profiles = db.query(models.ExecutionProfile).filter(
+                models.ExecutionProfile.created_at < log_cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if dropped or logs or expired or profiles:
+            logger.info(f"Dropped {dropped} execution log partitions, {logs} execution logs, "
+                        f"{expired} rollup buckets and {profiles} profiles")
+
+    def _partitioned(self, db):
+        """True if the partition maintenance functions from init.sql exist in this database"""
+        found = db.bind.dialect.name == "postgresql" and db.execute(text(
+            "SELECT to_regproc('ensure_execution_log_partitions') IS NOT NULL "
+            "AND to_regproc('drop_execution_log_partitions') IS NOT NULL"
+        )).scalar()
+        if not found and not self._warned_unpartitioned:
+            logger.warning("execution_logs is not partitioned (the database was not created from init.sql), "
+                           "skipping partition maintenance and deleting expired logs row by row")
+            self._warned_unpartitioned = True
+        return found
+
+
+# Export a singleton for app-wide use
+log_maintenance = LogMaintenance()
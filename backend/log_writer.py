@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from backend import crud
+from backend.db import SessionLocal
+from backend.metrics import LOG_WRITER_BUFFER_DEPTH, LOG_WRITER_FLUSH_TIME, LOG_WRITER_ROWS
+
+logger = logging.getLogger(__name__)
+
+LOG_WRITER_MAX_BUFFER = int(os.getenv("LOG_WRITER_MAX_BUFFER", "10000"))
+LOG_WRITER_BATCH_SIZE = int(os.getenv("LOG_WRITER_BATCH_SIZE", "500"))
+LOG_WRITER_FLUSH_INTERVAL = float(os.getenv("LOG_WRITER_FLUSH_INTERVAL", "1.0"))
+
+
+class ExecutionLogWriter:
+    """
+    Buffers execution log rows in memory and writes them in multi-row inserts.
+
+    A flush happens when batch_size rows are waiting or flush_interval has passed.
+    The buffer is bounded: submit() returns False when it is full, and the caller
+    should write the row itself rather than grow memory without limit.
+    """
+
+    def __init__(self, max_buffer=LOG_WRITER_MAX_BUFFER, batch_size=LOG_WRITER_BATCH_SIZE,
+                 flush_interval=LOG_WRITER_FLUSH_INTERVAL):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="execution-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one execution log row (see crud.execution_log_row). Never blocks."""
+        with self._condition:
+            if self._thread is None or self._stopping or len(self._buffer) >= self.max_buffer:
+                return False
+            self._buffer.append(row)
+            LOG_WRITER_BUFFER_DEPTH.set(len(self._buffer))
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def shutdown(self):
+        """Stop the background thread and flush everything still buffered"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        healthy = True
+        while True:
+            with self._condition:
+                # After a failed write, back off for a full interval instead of retrying hot
+                if (len(self._buffer) < self.batch_size or not healthy) and not self._stopping:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+
+            healthy = self._flush_available()
+            if stopping:
+                return
+
+    def _flush_available(self):
+        """Write out everything buffered; returns False if a write failed"""
+        while True:
+            with self._condition:
+                if not self._buffer:
+                    return True
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                LOG_WRITER_BUFFER_DEPTH.set(len(self._buffer))
+
+            if not self._write(batch):
+                # Put the rows back and let the next round retry them
+                with self._condition:
+                    self._buffer.extendleft(reversed(batch))
+                    LOG_WRITER_BUFFER_DEPTH.set(len(self._buffer))
+                    if not self._stopping:
+                        return False
+                # Shutting down with the database unavailable, nothing more we can do
+                logger.error(f"Dropping {len(self._buffer)} execution logs that could not be written")
+                LOG_WRITER_ROWS.labels(result="dropped").inc(len(self._buffer))
+                with self._condition:
+                    self._buffer.clear()
+                    LOG_WRITER_BUFFER_DEPTH.set(0)
+                return False
+
+    def _write(self, batch):
+        start_time = time.perf_counter()
+        db = SessionLocal()
+        try:
+            crud.create_execution_logs(db, batch)
+            LOG_WRITER_ROWS.labels(result="written").inc(len(batch))
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write {len(batch)} execution logs: {str(e)}")
+            return False
+        finally:
+            db.close()
+            LOG_WRITER_FLUSH_TIME.observe(time.perf_counter() - start_time)
+
+
+# Export a singleton for app-wide use
+log_writer = ExecutionLogWriter()
@@ -1,5 +1,7 @@
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -7,11 +9,30 @@ import logging
 from prometheus_client import make_asgi_app
 from contextlib import asynccontextmanager
 from backend.metrics import REQUEST_COUNT, REQUEST_LATENCY, FUNCTION_EXECUTIONS, FUNCTION_EXECUTION_TIME
+import threading
 import time
 
 from backend.api.routes_execution import router as execution_router
 from backend.api.routes_functions import router as function_router  # Assuming this exists
-from backend.engine.docker_utils import check_docker_availability, check_docker_permissions
+from backend.api.routes_invocations import router as invocation_router
+from backend.api.routes_nodes import router as node_router_api
+from backend.api.routes_stats import router as stats_router
+from backend.api.routes_debug import router as debug_router
+from backend.api.routes_profiles import router as profiles_router
+from backend.api.responses import CompressionMiddleware
+from backend.engine.backends import DEFAULT_EXECUTOR_BACKEND
+from backend.engine.docker_utils import check_docker_availability
+from backend.engine.executor import get_docker_executor, get_executor, started_executors
+from backend.engine.dispatcher import execution_dispatcher
+from backend.engine.process_sandbox import process_executor
+from backend.engine.router import node_router
+from backend.function_cache import invalidation_listener
+from backend.log_writer import log_writer
+from backend.log_maintenance import log_maintenance
+from backend.stats import function_stats
+from backend import tracing
+from backend.db import SessionLocal, AsyncSessionLocal, async_engine
+from backend import crud
 
 # make sure you are in root directory and then run uvicorn backend.main:app --reload when testing without docker containers lol
 
@@ -23,14 +44,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def warm_up():
+    """
+    Startup work that needs the database or Docker, run off the startup path so the API
+    serves at once, even while either is slow or down.
+
+    Applies reserved concurrency, then creates the Docker executor, which checks the
+    runtime images in the background and builds only those whose Dockerfile context
+    changed, then re-creates warm containers for functions with provisioned concurrency. /health/ready reports when it is done.
+    """
+    # Hold reserved concurrency from the start, not only once the function is first invoked
+    db = SessionLocal()
+    try:
+        for function in crud.get_reserved_functions(db):
+            execution_dispatcher.configure(function)
+    except Exception as e:
+        logger.error(f"Failed to apply reserved concurrency: {str(e)}")
+    finally:
+        db.close()
+
+    if not check_docker_availability():
+        startup_state["docker"] = "unavailable"
+        return
+    startup_state["docker"] = "available"
+    get_docker_executor()
+
+    # Re-create warm containers for functions with provisioned concurrency
+    db = SessionLocal()
+    try:
+        for function in crud.get_provisioned_functions(db):
+            get_executor(function).prepare(function)
+    except Exception as e:
+        logger.error(f"Failed to provision warm containers: {str(e)}")
+    finally:
+        db.close()
+
+startup_state = {"docker": "checking"}
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    import sys
-    if not check_docker_availability():
-        sys.exit("Docker is required but not available")
-    if not check_docker_permissions():
-        sys.exit("Insufficient permissions to use Docker")
-    yield  
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    invalidation_listener.start()
+    log_writer.start()
+    log_maintenance.start()
+    function_stats.start()
+    node_router.start()
+
+    yield
+
+    node_router.stop()
+    invalidation_listener.stop()
+    log_maintenance.stop()
+    execution_dispatcher.shutdown()
+    # Flush after the dispatcher has drained, so the last executions' logs are kept
+    log_writer.shutdown()
+    function_stats.stop()
+    for executor in started_executors():
+        executor.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Serverless Functions Platform",
@@ -43,23 +115,47 @@ app = FastAPI(
 @app.middleware("http")
 async def track_requests(request: Request, call_next):
     start_time = time.time()
+    root, token = tracing.start_trace(f"{request.method} {request.url.path}", request.headers.get("traceparent"),
+                                      method=request.method, path=request.url.path)
 
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        tracing.finish_trace(root, token, e)
+        raise
 
     latency = time.time() - start_time
+    # The route template ("/functions/{id}/execute") rather than the raw path keeps label values bounded
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", None) or "unmatched"
+    root.name = f"{request.method} {endpoint}"
+    root.set(status_code=response.status_code)
+    response.headers["X-Trace-Id"] = root.trace_id
+    response.headers["traceparent"] = tracing.traceparent(root)
+    # The trace ends with the body, which for streamed executions is long after the headers
+    response.body_iterator = _finish_trace_after(response.body_iterator, root, token)
     REQUEST_LATENCY.labels(
         method=request.method,
-        endpoint=request.url.path
+        endpoint=endpoint
     ).observe(latency)
 
     REQUEST_COUNT.labels(
         method=request.method,
-        endpoint=request.url.path,
+        endpoint=endpoint,
         http_status=response.status_code
     ).inc()
 
     return response
 
+async def _finish_trace_after(body, root, token):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        tracing.finish_trace(root, token)
+
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:8501"],
@@ -70,12 +166,67 @@ app.add_middleware(
 
 app.include_router(function_router, prefix="/functions", tags=["functions"])
 app.include_router(execution_router, tags=["execution"])
+app.include_router(invocation_router, tags=["invocations"])
+app.include_router(node_router_api, tags=["nodes"])
+app.include_router(stats_router, tags=["stats"])
+app.include_router(debug_router, tags=["debug"])
+app.include_router(profiles_router, tags=["profiles"])
 
 # Defining root endpoint
 @app.get("/", tags=["health"])
 async def root():
     return {"status": "ok", "message": "Serverless Functions API is running"}
 
+@app.get("/health/live", tags=["health"])
+async def liveness():
+    """The process is up and serving; restart it only if this fails"""
+    return {"status": "ok"}
+
+@app.get("/health/ready", tags=["health"])
+async def readiness():
+    """Whether invocations can be served: database reachable, the runtimes of the backends in use ready"""
+    checks = {}
+    try:
+        await _check_database()
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {str(e)}"
+
+    if node_router.active():
+        # Executions go to worker nodes, so the local runtime does not matter
+        checks["runtime"] = "routed"
+    else:
+        backends = {name: await _runtime_status(name) for name in sorted(await _backends_in_use())}
+        checks["runtime"] = next((status for status in backends.values() if status != "ready"), "ready")
+        checks["backends"] = backends
+
+    ready = checks["database"] == "ok" and checks["runtime"] in ("ready", "routed")
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "not ready", "checks": checks})
+
+async def _check_database():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+async def _backends_in_use():
+    """The platform default backend and any other that a function is set to run on"""
+    try:
+        async with AsyncSessionLocal() as db:
+            backends = await crud.get_function_backends_async(db)
+    except Exception:
+        backends = set()  # The database check reports the failure
+    return {(backend or DEFAULT_EXECUTOR_BACKEND).lower() for backend in backends} | {DEFAULT_EXECUTOR_BACKEND}
+
+async def _runtime_status(backend):
+    if backend == "process":
+        # The first call probes for namespaces in a subprocess
+        return (await run_in_threadpool(process_executor.status))["status"]
+    if backend == "docker":
+        if startup_state["docker"] != "available":
+            return startup_state["docker"]
+        return get_docker_executor().status()["status"]
+    return f"unknown backend: {backend}"
+
 # Prometheus metrics endpoint
 metrics_app = make_asgi_app()
 app.mount(os.getenv("PROMETHEUS_METRICS_PATH", "/metrics"), metrics_app)
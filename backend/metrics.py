@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 import time
 
 REQUEST_COUNT = Counter(
@@ -22,5 +22,232 @@ FUNCTION_EXECUTIONS = Counter(
 FUNCTION_EXECUTION_TIME = Histogram(
     'serverless_function_execution_seconds',
     'Time spent executing serverless functions',
-    ['language', 'function_name', 'status']
+    ['language', 'function_id', 'status']
+)
+
+FUNCTION_CPU_SECONDS = Histogram(
+    'serverless_function_cpu_seconds',
+    'CPU time used per invocation, from the container cgroup',
+    ['function_id'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+FUNCTION_THROTTLED_SECONDS = Histogram(
+    'serverless_function_cpu_throttled_seconds',
+    'Time an invocation was held back by its CPU quota',
+    ['function_id'],
+    buckets=(0, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+)
+
+FUNCTION_PEAK_MEMORY = Histogram(
+    'serverless_function_peak_memory_bytes',
+    'Peak memory used per invocation, from the container cgroup',
+    ['function_id'],
+    buckets=tuple(mb * 1024 * 1024 for mb in (4, 8, 16, 32, 48, 64, 96, 128, 256))
+)
+
+FUNCTION_IO_BYTES = Histogram(
+    'serverless_function_io_bytes',
+    'Block I/O per invocation, from the container cgroup',
+    ['function_id', 'direction'],
+    buckets=(0, 4096, 65536, 1024 * 1024, 16 * 1024 * 1024, 128 * 1024 * 1024)
+)
+
+FUNCTION_OOM_KILLS = Counter(
+    'serverless_function_oom_kills_total',
+    'Invocations killed for exceeding their memory limit',
+    ['function_id']
+)
+
+FUNCTION_PHASE_TIME = Histogram(
+    'serverless_function_phase_seconds',
+    'Time spent in each phase of an invocation (lookup, queue, image, artifact, acquire, container_start, run, release, cleanup)',
+    ['language', 'phase']
+)
+
+WARM_POOL_HITS = Counter(
+    'serverless_warm_pool_hits_total',
+    'Invocations dispatched into an already running warm container',
+    ['pool']
+)
+
+WARM_POOL_MISSES = Counter(
+    'serverless_warm_pool_misses_total',
+    'Invocations that had to cold-start a container',
+    ['pool', 'reason']
+)
+
+WARM_POOL_CONTAINERS = Gauge(
+    'serverless_warm_pool_containers',
+    'Containers currently held by the warm pool',
+    ['pool', 'state']
+)
+
+EXECUTION_QUEUE_DEPTH = Gauge(
+    'serverless_execution_queue_depth',
+    'Executions waiting for a free worker'
+)
+
+EXECUTION_QUEUE_WAIT = Histogram(
+    'serverless_execution_queue_wait_seconds',
+    'Time executions spent queued before a worker picked them up'
+)
+
+EXECUTION_REJECTIONS = Counter(
+    'serverless_execution_rejections_total',
+    'Executions rejected because the dispatcher was saturated or unavailable',
+    ['reason']
+)
+
+SCHEDULER_QUEUE_WAIT = Histogram(
+    'serverless_scheduler_queue_wait_seconds',
+    'Time executions waited in the fair-share scheduler, per function and priority class',
+    ['function_id', 'priority']
+)
+
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    'serverless_scheduler_queue_depth',
+    'Executions waiting in the fair-share scheduler',
+    ['priority']
+)
+
+SCHEDULER_MEMORY_IN_USE = Gauge(
+    'serverless_scheduler_memory_in_use_mb',
+    'Container memory held by running executions, out of the host capacity'
+)
+
+EXECUTION_WORKERS_BUSY = Gauge(
+    'serverless_execution_workers_busy',
+    'Execution workers currently running a function'
+)
+
+FUNCTION_RUNTIME_TIME = Histogram(
+    'serverless_function_runtime_seconds',
+    'End-to-end invocation time by runtime mode and backend, to compare runtimes and sandboxes',
+    ['language', 'runtime_mode', 'backend'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+ARTIFACT_CACHE_HITS = Counter(
+    'serverless_artifact_cache_hits_total',
+    'Function code lookups served from the artifact cache'
+)
+
+ARTIFACT_CACHE_MISSES = Counter(
+    'serverless_artifact_cache_misses_total',
+    'Function code lookups that had to write a new artifact'
+)
+
+ARTIFACT_BYTES_WRITTEN = Counter(
+    'serverless_artifact_bytes_written_total',
+    'Bytes of function code written to the artifact cache'
+)
+
+ARTIFACT_CACHE_BYTES = Gauge(
+    'serverless_artifact_cache_bytes',
+    'Disk space used by the artifact cache'
+)
+
+DEPENDENCY_IMAGE_BUILDS = Counter(
+    'serverless_dependency_image_builds_total',
+    'Derived runtime images built for function dependency sets',
+    ['language', 'status']
+)
+
+DEPENDENCY_IMAGE_BUILD_TIME = Histogram(
+    'serverless_dependency_image_build_seconds',
+    'Time spent building dependency images',
+    ['language'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600)
+)
+
+DEPENDENCY_IMAGE_BYTES = Gauge(
+    'serverless_dependency_image_bytes',
+    'Disk space used by dependency images'
+)
+
+FUNCTION_CACHE_LOOKUPS = Counter(
+    'serverless_function_cache_lookups_total',
+    'Function definition lookups on the execution path',
+    ['result']
+)
+
+FUNCTION_CACHE_LOOKUP_TIME = Histogram(
+    'serverless_function_cache_lookup_seconds',
+    'Time to resolve a function definition, from memory on a hit or the database on a miss',
+    ['result'],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+)
+
+FUNCTION_CACHE_INVALIDATIONS = Counter(
+    'serverless_function_cache_invalidations_total',
+    'Cached function definitions dropped after a create/delete'
+)
+
+RESULT_CACHE_LOOKUPS = Counter(
+    'serverless_result_cache_lookups_total',
+    'Invocations of cacheable functions by outcome: hit, miss, or coalesced onto an identical running call',
+    ['result']
+)
+
+RESULT_CACHE_BYTES = Gauge(
+    'serverless_result_cache_bytes',
+    'Approximate size of the memoized results held in memory'
+)
+
+RESULT_CACHE_EVICTIONS = Counter(
+    'serverless_result_cache_evictions_total',
+    'Memoized results evicted to stay within the cache limits'
+)
+
+WORKER_NODES_LIVE = Gauge(
+    'serverless_worker_nodes_live',
+    'Worker nodes with a recent heartbeat, as seen by the router'
+)
+
+ROUTER_PLACEMENTS = Counter(
+    'serverless_router_placements_total',
+    'Invocations sent to each worker node, by the warm state the node had for the function',
+    ['node', 'warmth']
+)
+
+ROUTER_RETRIES = Counter(
+    'serverless_router_retries_total',
+    'Invocations moved to another worker node, by why the first one did not run it',
+    ['reason']
+)
+
+LOG_WRITER_BUFFER_DEPTH = Gauge(
+    'serverless_log_writer_buffer_depth',
+    'Execution logs buffered in memory waiting to be written'
+)
+
+LOG_WRITER_FLUSH_TIME = Histogram(
+    'serverless_log_writer_flush_seconds',
+    'Time to write one batch of execution logs'
+)
+
+LOG_WRITER_ROWS = Counter(
+    'serverless_log_writer_rows_total',
+    'Execution log rows handled by the background writer',
+    ['result']
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'serverless_db_pool_connections',
+    'Database connections held by the pool, checked out (in_use) or waiting in it (idle)',
+    ['pool', 'state']
+)
+
+DB_POOL_CAPACITY = Gauge(
+    'serverless_db_pool_capacity',
+    'Most connections the pool will open (pool size plus overflow)',
+    ['pool']
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'serverless_db_pool_checkout_wait_seconds',
+    'Time to get a connection from the pool, including opening a new one',
+    ['pool'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
 )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text, Float, DateTime
+from sqlalchemy import ARRAY, BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, Text, Float, DateTime, JSON
 from sqlalchemy.orm import relationship
 import datetime
 from .db import Base
@@ -12,6 +12,15 @@ class Function(Base):
     language = Column(String)
     code = Column(Text)
     timeout = Column(Integer, default=30)
+    provisioned_concurrency = Column(Integer, default=0)
+    runtime_mode = Column(String, default="script")  # "script" or "handler"
+    dependencies = Column(JSON, nullable=True)  # pip requirement lines or npm "name@version" specs
+    output_limit = Column(Integer, nullable=True)  # bytes of output kept per invocation, NULL for the default
+    memory_mb = Column(Integer, default=128)  # container memory limit, also its share of host capacity
+    reserved_concurrency = Column(Integer, default=0)  # executions that always find capacity
+    max_concurrency = Column(Integer, nullable=True)  # cap on concurrent executions, NULL for none
+    cacheable = Column(Boolean, default=False)  # results may be memoized by input
+    backend = Column(String, nullable=True)  # "docker" or "process", NULL for DEFAULT_EXECUTOR_BACKEND
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # Relationship with execution logs
@@ -20,13 +29,89 @@ class Function(Base):
 class ExecutionLog(Base):
     __tablename__ = "execution_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # The table is range-partitioned by day on created_at (see init.sql), which is
+    # why created_at is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     function_id = Column(Integer, ForeignKey("functions.id"))
     status = Column(String)  # "success" or "failure"
-    execution_time = Column(Float)
+    execution_time = Column(Float)  # seconds
+    timings = Column(JSON, nullable=True)  # seconds per invocation phase, e.g. {"queue": 0.01, "run": 0.2}
+    resources = Column(JSON, nullable=True)  # cgroup usage: cpu_seconds, memory_peak_bytes, oom_killed, ...
     error_log = Column(Text, nullable=True)
     output = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    trace_id = Column(String, nullable=True)  # request trace the execution was part of, see backend/tracing.py
+    profile_id = Column(Integer, nullable=True)  # execution_profiles row, when the invocation was profiled
+    created_at = Column(DateTime, primary_key=True, default=datetime.datetime.utcnow)
 
     # Relationship with function
-    function = relationship("Function", back_populates="execution_logs")
\ No newline at end of file
+    function = relationship("Function", back_populates="execution_logs")
+
+    # Serves keyset pagination of a function's logs, newest first
+    __table_args__ = (
+        Index("idx_execution_logs_function_created", "function_id", "created_at", "id"),
+    )
+
+class Invocation(Base):
+    __tablename__ = "invocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    function_id = Column(Integer, ForeignKey("functions.id", ondelete="CASCADE"))
+    status = Column(String, default="queued")  # "queued", "running", "succeeded" or "failed"
+    payload = Column(Text, nullable=True)  # JSON event passed to the function
+    result = Column(Text, nullable=True)  # JSON result returned by the execution engine
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+
+    function = relationship("Function")
+
+class WorkerNode(Base):
+    __tablename__ = "worker_nodes"
+
+    id = Column(String, primary_key=True)  # "<host>:<port>", stable across restarts
+    url = Column(String, nullable=False)  # where the API reaches the node
+    workers = Column(Integer, default=1)  # executions the node runs at once
+    memory_capacity_mb = Column(Integer, default=0)
+    busy = Column(Integer, default=0)  # load as of the last heartbeat
+    queued = Column(Integer, default=0)
+    memory_in_use_mb = Column(Integer, default=0)
+    warm_functions = Column(JSON, nullable=True)  # {function id: code hash} recently run or provisioned there
+    artifacts = Column(JSON, nullable=True)  # digests of cached function artifacts
+    images = Column(JSON, nullable=True)  # dependency images built on the node
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_heartbeat = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class FunctionStats(Base):
+    __tablename__ = "function_stats"
+
+    function_id = Column(Integer, ForeignKey("functions.id", ondelete="CASCADE"), primary_key=True)
+    invocations = Column(BigInteger, default=0)
+    errors = Column(BigInteger, default=0)
+    sketch = Column(JSON, nullable=True)  # stats.LatencySketch of execution times, as to_dict()
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ExecutionProfile(Base):
+    __tablename__ = "execution_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    function_id = Column(Integer, ForeignKey("functions.id", ondelete="CASCADE"), index=True)
+    report = Column(JSON)  # profiling.build_profile() summary and hotspots, without the stacks
+    collapsed = Column(Text)  # flamegraph-compatible collapsed stacks
+    trace_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class ExecutionRollup(Base):
+    __tablename__ = "execution_rollups"
+
+    function_id = Column(Integer, ForeignKey("functions.id", ondelete="CASCADE"), primary_key=True)
+    interval_seconds = Column(Integer, primary_key=True)  # bucket width, e.g. 60 or 3600
+    bucket_start = Column(DateTime, primary_key=True)
+    invocations = Column(BigInteger, default=0)
+    errors = Column(BigInteger, default=0)
+    duration_sum = Column(Float, default=0)
+    duration_min = Column(Float, nullable=True)
+    duration_max = Column(Float, nullable=True)
+    histogram = Column(ARRAY(BigInteger))  # counts per crud.ROLLUP_DURATION_BUCKETS bucket
@@ -0,0 +1,158 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.metrics import RESULT_CACHE_LOOKUPS, RESULT_CACHE_BYTES, RESULT_CACHE_EVICTIONS
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Larger results are returned but never cached, so one big result cannot flush the cache
+RESULT_CACHE_MAX_RESULT_BYTES = int(os.getenv("RESULT_CACHE_MAX_RESULT_BYTES", str(256 * 1024)))
+
+# Details of one execution that don't belong to the memoized result
+PER_INVOCATION_KEYS = ("execution_time", "timings", "resources", "cold_start", "profile")
+
+
+def input_hash(event):
+    """Stable hash of an event, independent of key order"""
+    data = json.dumps(event, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def cache_key(function, event):
+    # The code hash makes an edited function miss, even before its invalidation arrives
+    return function.id, function.code_hash, input_hash(event)
+
+
+class ResultCache:
+    """
+    Memoized results of functions marked `cacheable`, with single-flight coalescing.
+
+    Entries are keyed by (function id, code hash, input hash), expire after a TTL
+    and are evicted least-recently-used beyond the entry and byte limits. Only
+    successful results are kept. Concurrent calls with the same key while one is
+    running wait for that one instead of starting their own execution.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, result)
+        self._size = 0
+        # Invalidations arrive from the cache listener thread as well as the event loop
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> asyncio.Future, only touched on the event loop
+
+    async def run(self, function, event, execute):
+        """
+        Return a result for (function, event), calling `await execute()` only when needed.
+
+        Results served from the cache or shared with another caller are copies marked
+        "cached": True or "coalesced": True.
+        """
+        if not getattr(function, "cacheable", False):
+            return await execute()
+
+        key = cache_key(function, event)
+        result = self._get(key)
+        if result is not None:
+            RESULT_CACHE_LOOKUPS.labels(result="hit").inc()
+            result["cached"] = True
+            return result
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            RESULT_CACHE_LOOKUPS.labels(result="coalesced").inc()
+            try:
+                # shield: a caller that goes away must not cancel the execution the others wait on
+                result = copy.deepcopy(await asyncio.shield(in_flight))
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller running it went away before it started, so run it ourselves
+                return await self.run(function, event, execute)
+            result["coalesced"] = True
+            return result
+
+        RESULT_CACHE_LOOKUPS.labels(result="miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters see the error; nobody may be waiting, so don't warn about it going unretrieved
+            future.exception()
+            raise
+        else:
+            self._put(key, result)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            del self._in_flight[key]
+
+    def invalidate(self, function_id):
+        """Drop every result of a function, after it is deleted or changed"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == function_id]:
+                self._remove(key)
+            RESULT_CACHE_BYTES.set(self._size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            RESULT_CACHE_BYTES.set(0)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                RESULT_CACHE_BYTES.set(self._size)
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[2])
+
+    def _put(self, key, result):
+        if result.get("status") != "success" or "error" in result.get("result", {}):
+            return
+        stored = {k: v for k, v in result.items() if k not in PER_INVOCATION_KEYS}
+        try:
+            size = len(json.dumps(stored, default=str))
+        except (TypeError, ValueError):
+            return
+        if size > RESULT_CACHE_MAX_RESULT_BYTES:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, stored)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                RESULT_CACHE_EVICTIONS.inc()
+            RESULT_CACHE_BYTES.set(self._size)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+
+# Export a singleton for app-wide use
+result_cache = ResultCache()
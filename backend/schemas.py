@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 import datetime
 
 
@@ -10,6 +10,15 @@ class FunctionBase(BaseModel):
     code: str
     language: str
     timeout: int = 30  # Default timeout of 30 seconds
+    provisioned_concurrency: int = 0  # Warm containers kept loaded with this function
+    runtime_mode: str = "script"  # "script" runs the file, "handler" calls handler(event, context)
+    dependencies: Optional[List[str]] = None  # pip requirement lines or npm "name@version" specs
+    output_limit: Optional[int] = None  # Bytes of output kept per invocation, OUTPUT_MAX_BYTES if unset
+    memory_mb: int = 128  # Container memory limit, and the function's share of host capacity
+    reserved_concurrency: int = 0  # Concurrent executions that always find capacity
+    max_concurrency: Optional[int] = None  # Cap on concurrent executions, unlimited if unset
+    cacheable: bool = False  # Deterministic: identical events may be served a memoized result
+    backend: Optional[str] = None  # "docker" or "process" (sandboxed subprocess), platform default if unset
 
 
 class FunctionCreate(FunctionBase):
@@ -24,13 +33,39 @@ class Function(FunctionBase):
         orm_mode = True
 
 
+class FunctionSummary(BaseModel):
+    """A function without its code, for listings"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    language: str
+    runtime_mode: Optional[str] = None
+    timeout: Optional[int] = None
+    memory_mb: Optional[int] = None
+    backend: Optional[str] = None
+    cacheable: Optional[bool] = None
+    created_at: datetime.datetime
+
+    class Config:
+        orm_mode = True
+
+
+class FunctionSummaryPage(BaseModel):
+    functions: List[FunctionSummary]
+    next_cursor: Optional[str] = None  # None on the last page
+
+
 # Execution log schemas
 class ExecutionLogBase(BaseModel):
     function_id: int
     status: str  # "success" or "failure"
     execution_time: float
+    timings: Optional[Dict[str, float]] = None  # Seconds per invocation phase
+    resources: Optional[Dict[str, Any]] = None  # CPU, memory, I/O and OOM accounting from the container cgroup
     error_log: Optional[str] = None
     output: Optional[str] = None
+    trace_id: Optional[str] = None  # Trace of the request that ran it, see /debug/traces
+    profile_id: Optional[int] = None  # Profile of the invocation, see /profiles/{id}, when it was profiled
 
 
 class ExecutionLogCreate(ExecutionLogBase):
@@ -42,4 +77,86 @@ class ExecutionLog(ExecutionLogBase):
     created_at: datetime.datetime = datetime.datetime.now()
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class ExecutionRollup(BaseModel):
+    function_id: int
+    interval_seconds: int
+    bucket_start: datetime.datetime
+    invocations: int
+    errors: int
+    duration_sum: float
+    duration_min: Optional[float] = None
+    duration_max: Optional[float] = None
+    avg_duration: Optional[float] = None
+    error_rate: float = 0.0
+    histogram: List[int]  # counts per bucket, upper bounds in histogram_buckets
+    histogram_buckets: List[Optional[float]]  # None stands for +Inf
+
+    class Config:
+        orm_mode = True
+
+
+class ExecutionProfile(BaseModel):
+    id: int
+    function_id: int
+    report: Dict[str, Any]  # Profiler, CPU and wall time, sample count and top hotspots
+    trace_id: Optional[str] = None
+    created_at: datetime.datetime
+
+    class Config:
+        orm_mode = True
+
+
+class LatencyStats(BaseModel):
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class FunctionStatsSummary(BaseModel):
+    function_id: int
+    invocations: int
+    errors: int
+    error_rate: float
+    latency_seconds: LatencyStats  # Execution time, quantiles within STATS_RELATIVE_ACCURACY
+
+
+# Batch execution schemas
+class BatchExecuteRequest(BaseModel):
+    events: List[Any]
+    parallelism: Optional[int] = None  # Capped by BATCH_MAX_PARALLELISM
+
+
+# Worker node schemas
+class WorkerNode(BaseModel):
+    id: str
+    url: str
+    workers: int
+    memory_capacity_mb: int
+    busy: int
+    queued: int
+    memory_in_use_mb: int
+    warm_functions: int  # Number of functions with warm state on the node
+    artifacts: int
+    images: int
+    live: bool  # Heartbeat seen within WORKER_NODE_TTL
+    started_at: datetime.datetime
+    last_heartbeat: datetime.datetime
+
+
+# Invocation schemas
+class Invocation(BaseModel):
+    id: int
+    function_id: int
+    status: str  # "queued", "running", "succeeded" or "failed"
+    attempts: int = 0
+    result: Optional[Any] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    completed_at: Optional[datetime.datetime] = None
@@ -0,0 +1,216 @@
+import datetime
+import logging
+import math
+import os
+import threading
+
+from backend import crud
+from backend.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Seconds between writes of this process's new samples into function_stats
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "10"))
+# Quantiles are within this fraction of the true value
+STATS_RELATIVE_ACCURACY = float(os.getenv("STATS_RELATIVE_ACCURACY", "0.01"))
+# Bucket cap per sketch; beyond it the lowest buckets are folded together
+STATS_MAX_BUCKETS = int(os.getenv("STATS_MAX_BUCKETS", "2048"))
+
+STATS_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Durations at or below this (seconds) are counted in one "zero" bucket
+_MIN_VALUE = 1e-6
+_GAMMA = (1 + STATS_RELATIVE_ACCURACY) / (1 - STATS_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+class LatencySketch:
+    """
+    Mergeable quantile sketch over durations (DDSketch-style log buckets).
+
+    A sample x lands in bucket ceil(log_gamma(x)), so every bucket spans a fixed
+    relative range and a quantile read from it is within STATS_RELATIVE_ACCURACY
+    of the true value. Size is bounded by STATS_MAX_BUCKETS whatever the number of
+    samples, which keeps quantile queries constant-time, and two sketches merge by
+    adding their bucket counts.
+    """
+
+    def __init__(self, buckets=None, zero=0, count=0, total=0.0, min=None, max=None):
+        self.buckets = buckets or {}  # bucket index -> samples
+        self.zero = zero
+        self.count = count
+        self.total = total
+        self.min = min
+        self.max = max
+
+    def add(self, value, weight=1):
+        self.count += weight
+        self.total += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= _MIN_VALUE:
+            self.zero += weight
+            return
+        index = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.buckets[index] = self.buckets.get(index, 0) + weight
+        self._collapse()
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._collapse()
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return self.min
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint (in relative terms) of the bucket's range, clamped to what was seen
+                value = 2 * _GAMMA ** index / (_GAMMA + 1)
+                return max(self.min, min(self.max, value))
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        return {"buckets": {str(index): count for index, count in self.buckets.items()}, "zero": self.zero,
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls({int(index): count for index, count in (data.get("buckets") or {}).items()},
+                   data.get("zero", 0), data.get("count", 0), data.get("total", 0.0),
+                   data.get("min"), data.get("max"))
+
+    def _collapse(self):
+        while len(self.buckets) > STATS_MAX_BUCKETS:
+            lowest = sorted(self.buckets)[:2]
+            self.buckets[lowest[1]] += self.buckets.pop(lowest[0])
+
+
+class FunctionStatsRecorder:
+    """
+    Per-function invocation counts, errors and latency sketches.
+
+    Each process folds its executions into in-memory sketches and a background
+    thread merges them into the function_stats table every STATS_FLUSH_INTERVAL, so
+    the table holds the totals across API processes and invocation workers. Reads
+    combine the persisted totals with what this process has not written yet.
+    """
+
+    def __init__(self, flush_interval=STATS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending = {}  # function id -> [invocations, errors, LatencySketch]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="function-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write out what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def record(self, row):
+        """Count one execution, given its execution log row (see crud.execution_log_row)"""
+        with self._lock:
+            entry = self._pending.get(row["function_id"])
+            if entry is None:
+                entry = self._pending[row["function_id"]] = [0, 0, LatencySketch()]
+            entry[0] += 1
+            if row.get("status") != "success":
+                entry[1] += 1
+            if row.get("execution_time") is not None:
+                entry[2].add(row["execution_time"])
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+        db = SessionLocal()
+        try:
+            rows = crud.lock_function_stats(db, sorted(pending))
+            now = datetime.datetime.utcnow()
+            for function_id, (invocations, errors, sketch) in pending.items():
+                row = rows.get(function_id)
+                if row is None:
+                    continue  # Deleted since
+                merged = LatencySketch.from_dict(row.sketch)
+                merged.merge(sketch)
+                row.invocations += invocations
+                row.errors += errors
+                row.sketch = merged.to_dict()
+                row.updated_at = now
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to persist function stats, keeping them for the next flush: {str(e)}")
+            with self._lock:
+                for function_id, (invocations, errors, sketch) in pending.items():
+                    entry = self._pending.setdefault(function_id, [0, 0, LatencySketch()])
+                    entry[0] += invocations
+                    entry[1] += errors
+                    entry[2].merge(sketch)
+            return False
+        finally:
+            db.close()
+
+    def summaries(self, db, function_id=None):
+        """Counts, error rate and latency quantiles per function, persisted plus pending"""
+        combined = {}
+        for row in crud.get_function_stats(db, function_id):
+            combined[row.function_id] = [row.invocations, row.errors, LatencySketch.from_dict(row.sketch)]
+        with self._lock:
+            for pending_id, (invocations, errors, sketch) in self._pending.items():
+                if function_id is not None and pending_id != function_id:
+                    continue
+                entry = combined.setdefault(pending_id, [0, 0, LatencySketch()])
+                entry[0] += invocations
+                entry[1] += errors
+                entry[2].merge(sketch)
+        return [summarize(function_id, *combined[function_id]) for function_id in sorted(combined)]
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+def summarize(function_id, invocations, errors, sketch):
+    latency = {"mean": sketch.mean(), "min": sketch.min, "max": sketch.max}
+    for q in STATS_QUANTILES:
+        latency[f"p{round(q * 100)}"] = sketch.quantile(q)
+    return {
+        "function_id": function_id,
+        "invocations": invocations,
+        "errors": errors,
+        "error_rate": errors / invocations if invocations else 0.0,
+        "latency_seconds": latency,
+    }
+
+
+# Export a singleton for app-wide use
+function_stats = FunctionStatsRecorder()
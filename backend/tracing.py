@@ -0,0 +1,255 @@
+"""
+Span-based request tracing, exported locally.
+
+A trace starts at the edge of a process (the HTTP middleware, a queue worker) and
+follows the request through contextvars, which asyncio tasks, Starlette's
+threadpool and the execution dispatcher's worker threads all carry along. Every
+trace gets an id, returned in response headers and stored with execution logs;
+only a sampled fraction (TRACE_SAMPLE_RATE, or any request arriving with a
+sampled W3C traceparent) records spans, so unsampled requests pay for little
+more than a context lookup per span.
+
+Finished traces go to an in-memory ring buffer (browsable at /debug/traces)
+and/or a JSONL file, as TRACE_EXPORTER says.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+# "memory", "jsonl", "memory,jsonl" or "none"
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory")
+TRACE_FILE = os.getenv("TRACE_FILE", "/tmp/serverless-traces.jsonl")
+# Traces kept in memory for /debug/traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+# Spans recorded per trace; a batch of thousands of events should not build an unbounded trace
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class Trace:
+    def __init__(self, trace_id, sampled, remote_parent_id=None):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.remote_parent_id = remote_parent_id  # Span id of the caller, when the trace came from upstream
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(span.to_dict())
+            else:
+                self.dropped += 1
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error=None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start_perf
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.trace.sampled:
+            self.trace.add(self)
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def _new_id(nbytes):
+    return "%0*x" % (nbytes * 2, random.getrandbits(nbytes * 8))
+
+
+def current_span():
+    return _current.get()
+
+
+def current_trace_id():
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def traceparent(span=None):
+    """W3C traceparent header value for the current (or given) span, to continue the trace downstream"""
+    span = span or _current.get()
+    if span is None:
+        return None
+    return f"00-{span.trace_id}-{span.span_id}-{'01' if span.trace.sampled else '00'}"
+
+
+def start_trace(name, traceparent_header=None, **attributes):
+    """
+    Start the root span of this process's part of a trace and make it current.
+
+    Continues the caller's trace when given its traceparent. Returns (span, token);
+    pass both to finish_trace().
+    """
+    trace = None
+    match = _TRACEPARENT.match((traceparent_header or "").strip().lower())
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        trace = Trace(trace_id, sampled=bool(int(flags, 16) & 1) or random.random() < TRACE_SAMPLE_RATE,
+                      remote_parent_id=parent_id)
+    if trace is None:
+        trace = Trace(_new_id(16), sampled=random.random() < TRACE_SAMPLE_RATE)
+    span = Span(trace, name, trace.remote_parent_id, attributes)
+    return span, _current.set(span)
+
+
+def finish_trace(span, token=None, error=None):
+    """End the root span and export the trace if it was sampled"""
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Finished from another context, e.g. after a streamed response body
+            pass
+    span.end(error)
+    if span.trace.sampled:
+        exporter.export(span)
+
+
+@contextmanager
+def trace(name, **attributes):
+    """Run a block as a new trace, e.g. one invocation taken off a queue"""
+    span, token = start_trace(name, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        finish_trace(span, token, e)
+        raise
+    else:
+        finish_trace(span, token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Record a block as a child of the current span; a no-op outside a sampled trace"""
+    parent = _current.get()
+    if parent is None or not parent.trace.sampled:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.end(e)
+        raise
+    else:
+        child.end()
+    finally:
+        _current.reset(token)
+
+
+def start_span(name, **attributes):
+    """
+    Start a child of the current span without making it current, for callbacks that
+    see the start and the end separately (e.g. SQLAlchemy events). Returns None when
+    not sampled; otherwise call end() on it.
+    """
+    parent = _current.get()
+    if parent is None or not parent.trace.sampled:
+        return None
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+class TraceExporter:
+    """Keeps finished traces in a ring buffer and/or appends them to a JSONL file"""
+
+    def __init__(self, targets=TRACE_EXPORTER, path=TRACE_FILE, buffer_size=TRACE_BUFFER_SIZE):
+        targets = {target.strip() for target in targets.split(",")}
+        self.memory = "memory" in targets
+        self.path = path if "jsonl" in targets else None
+        self._buffer = OrderedDict()  # trace id -> trace dict, oldest first
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+
+    def export(self, root):
+        record = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "start": root.start,
+            "duration_ms": round(root.duration * 1000, 3),
+            "error": root.error,
+            "parent_id": root.trace.remote_parent_id,
+            "dropped_spans": root.trace.dropped,
+            "spans": list(root.trace.spans),
+        }
+        with self._lock:
+            if self.memory:
+                # A trace that came back through this process (routed and returned) keeps one entry
+                self._buffer.pop(root.trace_id, None)
+                self._buffer[root.trace_id] = record
+                while len(self._buffer) > self._buffer_size:
+                    self._buffer.popitem(last=False)
+            if self.path:
+                try:
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    logger.warning(f"Failed to write trace {root.trace_id} to {self.path}: {str(e)}")
+
+    def recent(self, limit=50, min_duration_ms=None, name=None):
+        """Newest first, without their spans"""
+        with self._lock:
+            records = list(self._buffer.values())
+        summaries = []
+        for record in reversed(records):
+            if min_duration_ms is not None and record["duration_ms"] < min_duration_ms:
+                continue
+            if name and name not in record["name"]:
+                continue
+            summaries.append(dict({k: v for k, v in record.items() if k != "spans"},
+                                  span_count=len(record["spans"])))
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, trace_id):
+        with self._lock:
+            return self._buffer.get(trace_id)
+
+
+# Export a singleton for app-wide use
+exporter = TraceExporter()
@@ -5,15 +5,160 @@ CREATE TABLE IF NOT EXISTS functions (
     language TEXT NOT NULL,
     code TEXT NOT NULL,
     timeout INT DEFAULT 30,
+    provisioned_concurrency INT DEFAULT 0,
+    runtime_mode TEXT DEFAULT 'script',
+    dependencies JSONB,
+    output_limit INT,
+    memory_mb INT DEFAULT 128,
+    reserved_concurrency INT DEFAULT 0,
+    max_concurrency INT,
+    cacheable BOOLEAN DEFAULT FALSE,
+    backend TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Partitioned by day on created_at, so retention is a cheap DROP TABLE per day
+-- instead of a DELETE. The partition key has to be part of the primary key.
 CREATE TABLE IF NOT EXISTS execution_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     function_id INT REFERENCES functions(id) ON DELETE CASCADE,
     status TEXT NOT NULL,
     execution_time FLOAT,
+    timings JSONB,
+    resources JSONB,
     error_log TEXT,
     output TEXT,
+    trace_id TEXT,
+    profile_id INT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every daily partition (e.g. clock skew) instead of failing the insert
+CREATE TABLE IF NOT EXISTS execution_logs_default PARTITION OF execution_logs DEFAULT;
+
+-- Serves keyset pagination of a function's logs, newest first
+CREATE INDEX IF NOT EXISTS idx_execution_logs_function_created
+    ON execution_logs (function_id, created_at, id);
+
+-- Creates daily partitions from yesterday up to days_ahead days from now
+CREATE OR REPLACE FUNCTION ensure_execution_log_partitions(days_ahead INT DEFAULT 7)
+RETURNS void AS $$
+DECLARE
+    day DATE;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('execution_logs_partitions'));
+    FOR day IN
+        SELECT generate_series(CURRENT_DATE - 1, CURRENT_DATE + days_ahead, INTERVAL '1 day')::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF execution_logs FOR VALUES FROM (%L) TO (%L)',
+            'execution_logs_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drops daily partitions that are entirely older than retention_days, returns how many
+CREATE OR REPLACE FUNCTION drop_execution_log_partitions(retention_days INT)
+RETURNS INT AS $$
+DECLARE
+    part RECORD;
+    dropped INT := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('execution_logs_partitions'));
+    FOR part IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname = 'execution_logs'
+          AND child.relname ~ '^execution_logs_p[0-9]{8}$'
+          AND to_date(right(child.relname, 8), 'YYYYMMDD') < CURRENT_DATE - retention_days
+    LOOP
+        EXECUTE format('DROP TABLE IF EXISTS %I', part.relname);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_execution_log_partitions(7);
+
+-- Per-function aggregates per time bucket, upserted by the backend as logs are written.
+-- histogram holds counts per duration bucket (bounds are defined in backend/crud.py).
+CREATE TABLE IF NOT EXISTS execution_rollups (
+    function_id INT NOT NULL REFERENCES functions(id) ON DELETE CASCADE,
+    interval_seconds INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    invocations BIGINT NOT NULL DEFAULT 0,
+    errors BIGINT NOT NULL DEFAULT 0,
+    duration_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    duration_min DOUBLE PRECISION,
+    duration_max DOUBLE PRECISION,
+    histogram BIGINT[] NOT NULL,
+    PRIMARY KEY (function_id, interval_seconds, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_execution_rollups_bucket
+    ON execution_rollups (interval_seconds, bucket_start);
+
+-- Invocation counts and a mergeable latency sketch per function, totals across all processes
+CREATE TABLE IF NOT EXISTS function_stats (
+    function_id INT PRIMARY KEY REFERENCES functions(id) ON DELETE CASCADE,
+    invocations BIGINT NOT NULL DEFAULT 0,
+    errors BIGINT NOT NULL DEFAULT 0,
+    sketch JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Profiles of invocations run with profile=true; execution_logs.profile_id points here.
+-- Deleted after the log retention, along with the logs that reference them.
+CREATE TABLE IF NOT EXISTS execution_profiles (
+    id SERIAL PRIMARY KEY,
+    function_id INT REFERENCES functions(id) ON DELETE CASCADE,
+    report JSONB,
+    collapsed TEXT,
+    trace_id TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE INDEX IF NOT EXISTS idx_execution_profiles_function ON execution_profiles (function_id);
+CREATE INDEX IF NOT EXISTS idx_execution_profiles_created ON execution_profiles (created_at);
+
+-- Execution nodes register here and heartbeat their load and warm state for the router
+CREATE TABLE IF NOT EXISTS worker_nodes (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    workers INT DEFAULT 1,
+    memory_capacity_mb INT DEFAULT 0,
+    busy INT DEFAULT 0,
+    queued INT DEFAULT 0,
+    memory_in_use_mb INT DEFAULT 0,
+    warm_functions JSONB,
+    artifacts JSONB,
+    images JSONB,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_heartbeat TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_worker_nodes_heartbeat ON worker_nodes (last_heartbeat);
+
+CREATE TABLE IF NOT EXISTS invocations (
+    id SERIAL PRIMARY KEY,
+    function_id INT REFERENCES functions(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT,
+    result TEXT,
+    attempts INT DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+-- Workers only ever scan for claimable rows, keep that index small
+CREATE INDEX IF NOT EXISTS idx_invocations_claimable
+    ON invocations (id)
+    WHERE status IN ('queued', 'running');
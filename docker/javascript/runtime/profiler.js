@@ -0,0 +1,148 @@
+// V8 CPU profiler wrapper for JavaScript functions, used only for invocations that ask for a profile.
+//
+//     node /runtime/profiler.js function.js
+//
+// Runs the script as the main module with the inspector's Profiler domain
+// sampling every PROFILE_INTERVAL_MS, then folds the V8 profile into stacks and
+// appends the report to stderr as a single line after PROFILE_MARKER, which the
+// executor splits off from the function's own output.
+'use strict';
+
+const inspector = require('inspector');
+const Module = require('module');
+const path = require('path');
+
+// Must match backend/engine/profiling.py
+const PROFILE_MARKER = '\x1eserverless-profile:';
+
+const INTERVAL_MS = parseFloat(process.env.PROFILE_INTERVAL_MS || '1');
+// Distinct stacks kept; the rest are counted under one "[other]" stack
+const MAX_STACKS = parseInt(process.env.PROFILE_MAX_STACKS || '5000', 10);
+
+const session = new inspector.Session();
+session.connect();
+
+// Messages to an in-thread session are dispatched synchronously, which lets the
+// profile be collected from an 'exit' listener
+function post(method, params) {
+  let error = null;
+  let result = null;
+  session.post(method, params || {}, (err, res) => {
+    error = err;
+    result = res;
+  });
+  if (error) {
+    throw error;
+  }
+  return result;
+}
+
+function label(callFrame, root) {
+  const name = callFrame.functionName || '(anonymous)';
+  if (!callFrame.url) {
+    // (program), (garbage collector) and native frames
+    return name;
+  }
+  let file = callFrame.url.replace(/^file:\/\//, '');
+  if (file.startsWith(root + path.sep)) {
+    file = file.slice(root.length + 1);
+  }
+  // ";" separates frames in the collapsed-stack format; V8 lines are 0-based
+  return `${name} (${file}:${callFrame.lineNumber + 1})`.replace(/;/g, ':');
+}
+
+function fold(profile, root, cpu) {
+  const nodes = new Map(profile.nodes.map((node) => [node.id, node]));
+  const parents = new Map();
+  for (const node of profile.nodes) {
+    for (const child of node.children || []) {
+      parents.set(child, node.id);
+    }
+  }
+  const counts = new Map();
+  for (const id of profile.samples || []) {
+    counts.set(id, (counts.get(id) || 0) + 1);
+  }
+
+  const stacks = {};
+  let kept = 0;
+  let samples = 0;
+  for (const [id, count] of counts) {
+    const leaf = nodes.get(id);
+    if (leaf.callFrame.functionName === '(idle)') {
+      // Waiting on the event loop with nothing to run
+      continue;
+    }
+    // Up to the root, or to this wrapper's frames, below which is only node's own startup.
+    // Samples inside the wrapper's other code (stopping the profiler) are left out.
+    const frames = [];
+    let own = false;
+    for (let node = leaf; node && node.callFrame.functionName !== '(root)'; node = nodes.get(parents.get(node.id))) {
+      if (node.callFrame.url === __filename || node.callFrame.url === 'file://' + __filename) {
+        own = node.callFrame.functionName !== 'main';
+        break;
+      }
+      frames.push(label(node.callFrame, root));
+    }
+    if (own || !frames.length) {
+      continue;
+    }
+    samples += count;
+    let key = frames.reverse().join(';');
+    if (!(key in stacks)) {
+      if (kept >= MAX_STACKS) {
+        key = '[other]';
+      } else {
+        kept += 1;
+      }
+    }
+    stacks[key] = (stacks[key] || 0) + count;
+  }
+  return {
+    profiler: 'v8-cpu',
+    clock: 'cpu',
+    interval_ms: INTERVAL_MS,
+    duration_ms: Math.round(profile.endTime - profile.startTime) / 1000,
+    cpu_ms: Math.round(cpu.user + cpu.system) / 1000,
+    samples,
+    stacks,
+  };
+}
+
+function main() {
+  const script = process.argv[2];
+  if (!script) {
+    process.stderr.write('usage: profiler.js <script> [args...]\n');
+    process.exit(2);
+  }
+  const root = path.dirname(path.resolve(script));
+
+  let finished = false;
+  let cpuStart = null;
+  process.on('exit', () => {
+    if (finished) {
+      return;
+    }
+    finished = true;
+    let report;
+    try {
+      report = fold(post('Profiler.stop').profile, root, process.cpuUsage(cpuStart));
+    } catch (e) {
+      report = { profiler: 'v8-cpu', error: String(e) };
+    }
+    // Writes to pipes are synchronous, so this is out before the process exits
+    process.stderr.write('\n' + PROFILE_MARKER + JSON.stringify(report) + '\n');
+  });
+
+  post('Profiler.enable');
+  post('Profiler.setSamplingInterval', { interval: Math.max(1, Math.round(INTERVAL_MS * 1000)) });
+  post('Profiler.start');
+  cpuStart = process.cpuUsage();
+
+  // The script becomes the main module, as it would be under `node function.js`
+  process.argv.splice(1, 1);
+  process.argv[1] = path.resolve(script);
+  Module.runMain();
+}
+
+main();
@@ -0,0 +1,136 @@
+"""
+Sampling profiler for Python functions, used only for invocations that ask for a profile.
+
+Every PROFILE_INTERVAL_MS of CPU time (ITIMER_PROF) the interrupted stack is
+recorded, so the profile shows where the function spends CPU; time blocked on
+I/O shows up as the gap between cpu_ms and the wall-clock duration_ms. The
+kernel may deliver the timer at a coarser tick than asked for, so samples are
+best read as proportions of cpu_ms.
+
+Script mode runs the user's file under it:
+
+    python /runtime/profiler.py function.py
+
+and appends the report to stderr as a single line after PROFILE_MARKER, which
+the executor splits off from the function's own output. The zygote uses
+SamplingProfiler directly around handler(event, context).
+"""
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+import traceback
+
+# Must match backend/engine/profiling.py
+PROFILE_MARKER = "\x1eserverless-profile:"
+
+INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+# Distinct stacks kept; the rest are counted under one "[other]" stack
+MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "5000"))
+# Deeper stacks keep their innermost frames
+MAX_DEPTH = 128
+
+# Frames of the runtime itself, left out of the recorded stacks
+_RUNTIME_FILES = {os.path.abspath(__file__), os.path.abspath(runpy.__file__),
+                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote.py")}
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=INTERVAL_MS, root=None):
+        self.interval = max(0.0001, interval_ms / 1000.0)
+        self.root = root or os.getcwd()
+        self.stacks = {}  # tuple of frame labels, outermost first -> samples
+        self.samples = 0
+        self._labels = {}  # code object -> label
+        self._previous = None
+        self._start = None
+        self._cpu_start = None
+        self._duration = None
+        self._cpu = None
+
+    def start(self):
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        self._duration = time.perf_counter() - self._start
+        self._cpu = time.process_time() - self._cpu_start
+        signal.signal(signal.SIGPROF, self._previous or signal.SIG_DFL)
+
+    def _sample(self, signum, frame):
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = self._label(code)
+            if label:
+                labels.append(label)
+            frame = frame.f_back
+        if not labels:
+            return
+        key = tuple(reversed(labels))
+        self.samples += 1
+        if key in self.stacks or len(self.stacks) < MAX_STACKS:
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        else:
+            self.stacks[("[other]",)] = self.stacks.get(("[other]",), 0) + 1
+
+    def _label(self, code):
+        filename = code.co_filename
+        if filename.startswith("<frozen") or os.path.abspath(filename) in _RUNTIME_FILES:
+            return ""
+        if filename.startswith(self.root + os.sep):
+            filename = filename[len(self.root) + 1:]
+        # ";" separates frames in the collapsed-stack format
+        return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+    def report(self):
+        return {
+            "profiler": "python-sampling",
+            "clock": "cpu",
+            "interval_ms": self.interval * 1000,
+            "duration_ms": round(self._duration * 1000, 3) if self._duration is not None else None,
+            "cpu_ms": round(self._cpu * 1000, 3) if self._cpu is not None else None,
+            "samples": self.samples,
+            "stacks": {";".join(key): count for key, count in self.stacks.items()},
+        }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: profiler.py <script> [args...]", file=sys.stderr)
+        return 2
+    path = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    function_dir = os.path.dirname(os.path.abspath(path))
+    if sys.path and sys.path[0] == os.path.dirname(os.path.abspath(__file__)):
+        # Imports resolve next to the script, as they would for `python function.py`
+        # (not under -I, where neither directory is on the path)
+        sys.path[0] = function_dir
+
+    profiler = SamplingProfiler(root=function_dir)
+    code = 0
+    profiler.start()
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        code = e.code
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        profiler.stop()
+    sys.stdout.flush()
+    sys.stderr.write("\n" + PROFILE_MARKER + json.dumps(profiler.report()) + "\n")
+    sys.stderr.flush()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
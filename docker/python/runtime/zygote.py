@@ -0,0 +1,220 @@
+"""
+Pre-forking supervisor ("zygote") for handler-style Python functions.
+
+The supervisor imports optional libraries and the user module once, then forks a
+fresh child per invocation to call handler(event, context). Children inherit the
+warm interpreter copy-on-write, so nothing they do leaks into later invocations.
+
+Requests and responses are single JSON lines over a Unix socket. With --once the
+request is read from $EVENT and the response printed to stdout instead. A request
+with "profile" set runs the handler under profiler.py's sampling profiler and
+returns its report under "profile".
+"""
+import importlib
+import importlib.util
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+
+SOCKET_PATH = os.getenv("ZYGOTE_SOCKET", "/run/zygote/zygote.sock")
+FUNCTION_PATH = os.getenv("ZYGOTE_FUNCTION", "/app/function.py")
+HANDLER_NAME = os.getenv("ZYGOTE_HANDLER", "handler")
+PRELOAD = os.getenv("ZYGOTE_PRELOAD", "")
+OUTPUT_LIMIT = int(os.getenv("ZYGOTE_OUTPUT_LIMIT", str(1024 * 1024)))
+
+
+class Context:
+    """Invocation metadata passed to the handler, modelled on Lambda's context object"""
+
+    def __init__(self, data):
+        self.function_id = data.get("function_id")
+        self.function_name = data.get("function_name")
+        self.request_id = data.get("request_id")
+        self.timeout = data.get("timeout", 30)
+        self.deadline = time.time() + self.timeout
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.deadline - time.time()) * 1000))
+
+
+class Zygote:
+    def __init__(self):
+        self.handler = None
+        self.loaded_key = None
+        self.function_dir = None
+
+    def preload(self):
+        for name in filter(None, (m.strip() for m in PRELOAD.split(","))):
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"zygote: could not preload {name}: {e}", file=sys.stderr)
+
+    def load(self, path=None):
+        """(Re)import the user module if it is not the one already loaded"""
+        path = path or FUNCTION_PATH
+        key = (path, os.stat(path).st_mtime_ns)
+        if self.handler is not None and key == self.loaded_key:
+            return self.handler
+
+        spec = importlib.util.spec_from_file_location("function", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["function"] = module
+        spec.loader.exec_module(module)
+        handler = getattr(module, HANDLER_NAME, None)
+        if not callable(handler):
+            raise AttributeError(f"function.py does not define a callable '{HANDLER_NAME}'")
+        self.handler, self.loaded_key = handler, key
+        self.function_dir = os.path.dirname(path)
+        return handler
+
+    def handle(self, request):
+        if request.get("action") == "load":
+            try:
+                self.load(request.get("function_path"))
+                return {"status": "success"}
+            except Exception:
+                return {"status": "error", "error": traceback.format_exc()}
+
+        try:
+            handler = self.load(request.get("function_path"))
+        except Exception:
+            return {"status": "error", "error": traceback.format_exc(), "output": ""}
+        return self.invoke(handler, request.get("event"), Context(request.get("context", {})),
+                           request.get("output_limit") or OUTPUT_LIMIT, bool(request.get("profile")))
+
+    def invoke(self, handler, event, context, output_limit=OUTPUT_LIMIT, profile=False):
+        """Fork a child to run the handler, capturing up to output_limit bytes of output and its return value"""
+        out_r, out_w = os.pipe()
+        res_r, res_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(out_r)
+            os.close(res_r)
+            _run_child(handler, event, context, out_w, res_w, self.function_dir, profile)
+
+        os.close(out_w)
+        os.close(res_w)
+        output, payload, timed_out, truncated = _collect(pid, out_r, res_r, context.deadline, output_limit)
+        output = output.decode("utf-8", errors="replace")
+
+        if timed_out:
+            return {"status": "error", "error": f"Function timed out after {context.timeout} seconds",
+                    "output": output, "truncated": truncated}
+        try:
+            response = json.loads(payload.decode("utf-8"))
+        except ValueError:
+            response = {"status": "error", "error": "Function process exited without returning a result"}
+        response["output"] = output
+        response["truncated"] = truncated
+        return response
+
+    def serve(self):
+        self.preload()
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(SOCKET_PATH)
+        os.chmod(SOCKET_PATH, 0o777)
+        server.listen(1)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                stream = conn.makefile("rwb")
+                line = stream.readline()
+                if not line:
+                    continue
+                try:
+                    response = self.handle(json.loads(line))
+                except Exception:
+                    response = {"status": "error", "error": traceback.format_exc()}
+                stream.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+                stream.flush()
+
+    def run_once(self):
+        self.preload()
+        request = json.loads(os.getenv("EVENT") or "{}")
+        print(json.dumps(self.handle(request), default=str), flush=True)
+
+
+def _run_child(handler, event, context, out_w, res_w, function_dir, profile=False):
+    """Runs in the forked child; never returns"""
+    try:
+        os.chdir(function_dir)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out_w, 1)
+        os.dup2(out_w, 2)
+        profiler = None
+        if profile:
+            # Imported here, so unprofiled invocations never load it
+            from profiler import SamplingProfiler
+            profiler = SamplingProfiler(root=function_dir)
+            profiler.start()
+        try:
+            payload = {"status": "success", "result": handler(event, context)}
+        except Exception:
+            payload = {"status": "error", "error": traceback.format_exc()}
+        if profiler is not None:
+            profiler.stop()
+            payload["profile"] = profiler.report()
+        try:
+            data = json.dumps(payload, default=str)
+        except (TypeError, ValueError) as e:
+            data = json.dumps({"status": "error", "error": f"Handler result is not JSON serialisable: {e}"})
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with os.fdopen(res_w, "wb") as result_pipe:
+            result_pipe.write(data.encode("utf-8"))
+    finally:
+        os._exit(0)
+
+
+def _collect(pid, out_r, res_r, deadline, output_limit):
+    """
+    Read the child's output and result pipes until it exits or the deadline passes.
+
+    Output past output_limit bytes is read and discarded, so the child never blocks.
+    """
+    chunks = {out_r: [], res_r: []}
+    open_fds = [out_r, res_r]
+    output_size = 0
+    timed_out = False
+    truncated = False
+    while open_fds:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        readable, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if not data:
+                open_fds.remove(fd)
+                continue
+            if fd == out_r:
+                if output_size + len(data) > output_limit:
+                    data = data[:max(0, output_limit - output_size)]
+                    truncated = True
+                output_size += len(data)
+            chunks[fd].append(data)
+    os.close(out_r)
+    os.close(res_r)
+    os.waitpid(pid, 0)
+    return b"".join(chunks[out_r]), b"".join(chunks[res_r]), timed_out, truncated
+
+
+if __name__ == "__main__":
+    zygote = Zygote()
+    if "--once" in sys.argv:
+        zygote.run_once()
+    else:
+        zygote.serve()
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 import asyncio
+import os
 
 # Fix for the asyncio issue in Python 3.13
 try:
@@ -15,6 +16,61 @@ st.set_page_config(
 )
 
 API_BASE_URL = "http://backend:8000"
+# Seconds a GET response is reused across reruns before it is fetched again
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "5"))
+
+
+@st.cache_resource
+def api_session():
+    """One HTTP session for every rerun and browser tab, so connections are kept alive and reused"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=API_CACHE_TTL, show_spinner=False)
+def cached_get(path, params=None):
+    response = api_session().get(f"{API_BASE_URL}{path}", params=params, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_resource
+def function_pages():
+    return {}  # cursor -> (ETag, page) of /functions/summary
+
+
+@st.cache_data(ttl=API_CACHE_TTL, show_spinner=False)
+def list_functions():
+    """
+    Every function's summary (no code), paging through /functions/summary.
+
+    Pages are kept with their ETag and revalidated with If-None-Match once the
+    TTL runs out, so an unchanged list costs a 304 per page instead of the whole body.
+    """
+    cache = function_pages()
+    functions = []
+    cursor = None
+    while True:
+        params = {"limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+        cached = cache.get(cursor)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = api_session().get(f"{API_BASE_URL}/functions/summary", params=params, headers=headers,
+                                     timeout=30)
+        if response.status_code == 304:
+            page = cached[1]
+        else:
+            response.raise_for_status()
+            page = response.json()
+            cache[cursor] = (response.headers.get("ETag"), page)
+        functions.extend(page["functions"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return functions
 
 def main():
     st.title("Serverless Functions Platform")
@@ -61,12 +117,13 @@ def deploy_function():
 
     if submit_button:
         # Call FastAPI endpoint
-        response = requests.post(
+        response = api_session().post(
             f"{API_BASE_URL}/functions",
             json={"name": name, "code": code, "language": language, "timeout": timeout}
         )
 
-        if response.status_code == 200:
+        if response.status_code in (200, 201):
+            list_functions.clear()
             function_data = response.json()
             st.success(f"Function deployed successfully! Function ID: {function_data.get('id')}")
             st.json(function_data)
@@ -74,12 +131,26 @@ def deploy_function():
             st.error(f"Error deploying function: {response.text}")
 
 
+def show_profile(profile):
+    if not profile:
+        return
+    st.subheader("Profile")
+    if "error" in profile:
+        st.warning(profile["error"])
+        return
+    st.caption(f"{profile['profiler']}: {profile['samples']} samples, "
+               f"{profile['cpu_ms']} ms CPU in {profile['duration_ms']} ms")
+    st.dataframe(profile["hotspots"])
+    if profile.get("collapsed"):
+        st.download_button("Download collapsed stacks (flamegraph.pl, speedscope)", profile["collapsed"],
+                           file_name=f"profile-{profile.get('id', 'latest')}.folded", mime="text/plain")
+
+
 def execute_function():
     st.header("Execute Function")
 
     try:
-        response = requests.get(f"{API_BASE_URL}/functions")
-        functions = response.json()
+        functions = list_functions()
 
         # Create a dictionary of function_id: function_name
         function_options = {f["id"]: f"{f['id']} - {f['name']} ({f['language']})"
@@ -91,9 +162,12 @@ def execute_function():
             format_func=lambda x: function_options[x]
         )
 
+        profile = st.checkbox("Profile", help="Run under the runtime's sampling profiler and show the hotspots")
+
         if st.button("Execute"):
             with st.spinner("Executing function..."):
-                exec_response = requests.post(f"{API_BASE_URL}/functions/{selected}/execute")
+                params = {"profile": "true", "profile_collapsed": "true"} if profile else None
+                exec_response = api_session().post(f"{API_BASE_URL}/functions/{selected}/execute", params=params)
 
                 if exec_response.status_code == 200:
                     result = exec_response.json()
@@ -108,6 +182,7 @@ def execute_function():
                         elif "error" in result_data:
                             st.subheader("Error")
                             st.error(result_data["error"])
+                        show_profile(result_data.get("profile"))
 
                     st.json(result)
                 else:
@@ -121,8 +196,7 @@ def view_logs():
     st.header("Function Execution Logs")
 
     try:
-        response = requests.get(f"{API_BASE_URL}/functions")
-        functions = response.json()
+        functions = list_functions()
 
         # Create a dictionary of function_id: function_name
         function_options = {f["id"]: f"{f['id']} - {f['name']} ({f['language']})"
@@ -136,7 +210,7 @@ def view_logs():
         )
 
         if st.button("View Logs"):
-            logs_response = requests.get(f"{API_BASE_URL}/functions/{selected}/logs")
+            logs_response = api_session().get(f"{API_BASE_URL}/functions/{selected}/logs")
 
             if logs_response.status_code == 200:
                 logs_data = logs_response.json()
@@ -175,7 +249,7 @@ def view_logs():
 def show_metrics_dashboard():
     st.header("Metrics Dashboard")
 
-    tab1, tab2 = st.tabs(["Grafana Dashboard", "Raw Metrics"])
+    tab1, tab2 = st.tabs(["Grafana Dashboard", "Function Stats"])
 
     with tab1:
         st.subheader("Function Execution Metrics")
@@ -187,19 +261,34 @@ def show_metrics_dashboard():
         )
 
     with tab2:
-        st.subheader("Raw Prometheus Metrics")
-        metrics_response = requests.get(f"{API_BASE_URL}/metrics")
-        if metrics_response.status_code == 200:
-            metrics_text = metrics_response.text
-            function_metrics = [line for line in metrics_text.split('\n')
-                                if 'serverless_function' in line and not line.startswith('#')]
-
-            if function_metrics:
-                st.text('\n'.join(function_metrics))
-            else:
-                st.info("No function execution metrics found")
-        else:
-            st.error("Failed to load metrics")
+        st.subheader("Invocations and Latency per Function")
+        try:
+            stats = cached_get("/stats/functions")
+            names = {f["id"]: f["name"] for f in list_functions()}
+        except Exception as e:
+            st.error(f"Failed to load stats: {str(e)}")
+            return
+
+        if not stats:
+            st.info("No function executions recorded yet")
+            return
+
+        def ms(seconds):
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        st.dataframe([
+            {
+                "function": f"{s['function_id']} - {names.get(s['function_id'], '?')}",
+                "invocations": s["invocations"],
+                "errors": s["errors"],
+                "error rate %": round(s["error_rate"] * 100, 2),
+                "p50 ms": ms(s["latency_seconds"]["p50"]),
+                "p95 ms": ms(s["latency_seconds"]["p95"]),
+                "p99 ms": ms(s["latency_seconds"]["p99"]),
+                "max ms": ms(s["latency_seconds"]["max"]),
+            }
+            for s in stats
+        ], use_container_width=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import base64
+import datetime
+
+from fastapi import HTTPException
+
+from backend.crud import decode_function_cursor, decode_log_cursor, encode_function_cursor, encode_log_cursor
+
+
+def assert_invalid(decode, cursor):
+    try:
+        decode(cursor)
+    except HTTPException as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError(f"{cursor!r} was accepted")
+
+
+def test_function_cursor_round_trip():
+    for id in (1, 42, 2 ** 40):
+        cursor = encode_function_cursor(id)
+        assert decode_function_cursor(cursor) == id
+        # Safe to put in a query string as is
+        assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+def test_invalid_function_cursors_are_rejected():
+    for cursor in ("", "not base64!", base64.urlsafe_b64encode(b"abc").decode()):
+        assert_invalid(decode_function_cursor, cursor)
+
+
+def test_log_cursor_round_trip():
+    for created_at in (datetime.datetime(2024, 2, 29, 23, 59, 59, 999999),
+                       datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)):
+        cursor = encode_log_cursor(created_at, 7)
+        assert decode_log_cursor(cursor) == (created_at, 7)
+
+
+def test_invalid_log_cursors_are_rejected():
+    for raw in (b"2024-01-01T00:00:00", b"yesterday|7", b"2024-01-01T00:00:00|seven", b"a|b|c"):
+        assert_invalid(decode_log_cursor, base64.urlsafe_b64encode(raw).decode())
+    assert_invalid(decode_log_cursor, "%%%")
@@ -0,0 +1,76 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from backend.engine.executor import DockerExecutor, result_status
+
+
+def function(id=1, runtime_mode="handler", **overrides):
+    settings = dict(id=id, name=f"function-{id}", language="python",
+                    code="def handler(event, context):\n    return 1\n", timeout=5, runtime_mode=runtime_mode,
+                    dependencies=None, memory_mb=128, output_limit=None, provisioned_concurrency=0, backend=None)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    # Containers and zygotes are simulated in-process (backend/engine/fake_docker.py)
+    monkeypatch.setenv("DOCKER_CLIENT", "fake")
+    monkeypatch.setenv("FAKE_DOCKER_LATENCIES", '{"create": 0, "start": 0, "exec": 0, "remove": 0, "run": 0}')
+    executor = DockerExecutor()
+    assert executor._images_ready.wait(10), executor._images_error
+    yield executor
+    executor.shutdown()
+
+
+def test_warm_handler_invocations_reuse_the_container(executor):
+    handler = function()
+    first = executor.execute_function(handler, {"x": 1})
+    pool = executor.pools["python-handler"]
+    containers = pool.size
+
+    for _ in range(3):
+        result = executor.execute_function(handler, {"x": 1})
+        assert result["status"] == "success", result
+    assert first["status"] == "success", first
+    # A failed zygote call retires its container; a healthy pool stays the same size
+    assert pool.size == containers
+    assert any(warm.function_id == handler.id for warm in pool._idle)
+
+
+def test_warm_handler_sees_only_its_own_code(executor):
+    first, second = function(id=1), function(id=2, code="def handler(event, context):\n    return 2\n")
+    executor.execute_function(first, None)
+    executor.execute_function(second, None)
+
+    pool = executor.pools["python-handler"]
+    bound = {warm.function_id: warm for warm in pool._idle if warm.function_id is not None}
+    with open(f"{bound[2].code_dir}/function.py") as f:
+        assert f.read() == second.code
+    assert sorted(os.listdir(bound[1].code_dir)) == ["function.py"]
+
+
+def test_script_invocations_run_in_warm_containers(executor):
+    result = executor.execute_function(function(runtime_mode="script", code="print('hi')"), None)
+    assert result_status(result) == "success"
+    assert executor.pools["python"].size >= 1
+
+
+def test_warm_containers_get_the_function_memory_size(executor, monkeypatch):
+    limits = []
+    run = executor.client.containers.run
+
+    def recording_run(*args, **kwargs):
+        limits.append(kwargs.get("mem_limit"))
+        return run(*args, **kwargs)
+
+    monkeypatch.setattr(executor.client.containers, "run", recording_run)
+    result = executor.execute_function(function(memory_mb=256), {"x": 1})
+
+    assert result["status"] == "success", result
+    pool = executor.pools["python-handler-256m"]
+    assert pool.memory_mb == 256 and pool.size == 1
+    # The default pools may still be pre-warming their 128m containers alongside
+    assert "256m" in limits
@@ -0,0 +1,52 @@
+import json
+
+from backend.engine.profiling import PROFILE_MARKER, ProfileCapture, build_profile
+
+REPORT = {
+    "profiler": "sampling", "clock": "cpu", "interval_ms": 1, "duration_ms": 12.0, "cpu_ms": 10.0,
+    "stacks": {
+        "<module> (function.py:9);handler (function.py:5);fib (function.py:1)": 6,
+        "<module> (function.py:9);handler (function.py:5);fib (function.py:1);fib (function.py:1)": 2,
+        "<module> (function.py:9);handler (function.py:5)": 2,
+    },
+}
+
+
+def test_report_is_split_off_stderr():
+    streamed = []
+    capture = ProfileCapture(1024, lambda stream, text: streamed.append((stream, text)))
+    data = b"warning\n" + PROFILE_MARKER + json.dumps(REPORT).encode()
+    # Chunk boundaries fall inside the marker and the report
+    for i in range(0, len(data), 5):
+        capture.feed(data[i:i + 5], "stderr")
+    capture.feed(b"done", "stdout")
+
+    assert capture.report() == REPORT
+    assert "serverless-profile" not in capture.text()
+    assert "".join(text for stream, text in streamed if stream == "stderr") == "warning\n"
+
+
+def test_stderr_that_only_looks_like_a_marker_is_kept():
+    capture = ProfileCapture(1024)
+    capture.feed(b"tail " + PROFILE_MARKER[:3], "stderr")
+
+    assert capture.report() is None
+    assert capture.text() == "tail " + PROFILE_MARKER[:3].decode()
+
+
+def test_hotspots_rank_self_time_and_count_recursion_once():
+    profile = build_profile(REPORT, top_n=2)
+
+    assert profile["samples"] == 10
+    fib, handler = profile["hotspots"]
+    assert (fib["function"], fib["location"]) == ("fib", "function.py:1")
+    assert fib["self_samples"] == 8 and fib["self_ms"] == 8.0
+    # fib appears twice in one stack but only counts once towards its total
+    assert fib["total_samples"] == 8
+    assert handler["total_samples"] == 10 and handler["total_percent"] == 100.0
+    assert profile["collapsed"].splitlines()[0].endswith(" 2")
+
+
+def test_missing_report_is_an_error():
+    assert "error" in build_profile(None)
+    assert build_profile({"profiler": "sampling", "error": "boom"})["error"] == "boom"
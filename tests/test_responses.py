@@ -0,0 +1,78 @@
+import datetime
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.api import responses, routes_functions
+from backend.api.responses import CompressionMiddleware
+from backend.db import get_db
+
+FUNCTIONS = [
+    SimpleNamespace(id=i, name=f"function-{i}", description="x" * 40, language="python", runtime_mode="script",
+                    timeout=30, memory_mb=128, backend=None, cacheable=False,
+                    created_at=datetime.datetime(2024, 1, 1))
+    for i in range(1, 51)
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    monkeypatch.setattr(routes_functions.crud, "get_function_summaries",
+                        lambda db, limit, cursor, name, language: (FUNCTIONS[:limit], None))
+    app = FastAPI()
+    app.include_router(routes_functions.router, prefix="/functions")
+    app.add_middleware(CompressionMiddleware)
+    app.dependency_overrides[get_db] = lambda: None
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["event: output\ndata: {}\n\n"] * 200), media_type="text/event-stream")
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_summary_is_revalidated_with_its_etag(client):
+    first = client.get("/functions/summary")
+    assert first.status_code == 200
+    assert [function["id"] for function in first.json()["functions"]] == list(range(1, 51))
+    assert "code" not in first.json()["functions"][0]
+
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert client.get("/functions/summary", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/functions/summary", headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+    # A different page is a different ETag
+    assert client.get("/functions/summary?limit=10").headers["ETag"] != etag
+
+
+def test_large_bodies_are_gzipped_when_accepted(client):
+    response = client.get("/functions/summary", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    plain = client.get("/functions/summary", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert response.json() == plain.json()
+
+
+def test_small_bodies_are_sent_as_is(client):
+    response = client.get("/functions/summary?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streams_are_not_compressed(client):
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.text.startswith("event: output")
+
+
+def test_accept_encoding_quality_is_respected():
+    assert responses._accepted_encoding({"accept-encoding": "gzip;q=0, identity"}) is None
+    assert responses._accepted_encoding({"accept-encoding": "deflate, gzip;q=0.5"}) == "gzip"
+    assert gzip.decompress(responses._compress(b"abc" * 100, "gzip")) == b"abc" * 100
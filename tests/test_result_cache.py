@@ -0,0 +1,199 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.result_cache import ResultCache, input_hash
+
+
+def function(id=1, code_hash="abc", cacheable=True):
+    return SimpleNamespace(id=id, code_hash=code_hash, cacheable=cacheable)
+
+
+class Executions:
+    """execute() stand-in counting its calls, optionally held until released"""
+
+    def __init__(self, result=None, error=None, hold=False):
+        self.calls = 0
+        self.result = result or {"status": "success", "result": {"output": "42"}, "execution_time": 0.1}
+        self.error = error
+        self.release = asyncio.Event() if hold else None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return dict(self.result)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_input_hash_ignores_key_order():
+    assert input_hash({"a": 1, "b": [1, 2]}) == input_hash({"b": [1, 2], "a": 1})
+    assert input_hash({"a": 1}) != input_hash({"a": 2})
+
+
+def test_hit_within_ttl():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions()
+        first = await cache.run(function(), {"x": 1}, execute)
+        second = await cache.run(function(), {"x": 1}, execute)
+        return execute.calls, first, second
+
+    calls, first, second = run(scenario())
+    assert calls == 1
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["result"] == {"output": "42"}
+    # Per-invocation details are not replayed from the cache
+    assert "execution_time" not in second
+
+
+def test_expired_entries_run_again():
+    async def scenario():
+        cache = ResultCache(ttl=0)
+        execute = Executions()
+        await cache.run(function(), None, execute)
+        await cache.run(function(), None, execute)
+        return execute.calls
+
+    assert run(scenario()) == 2
+
+
+def test_key_includes_event_and_code():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions()
+        await cache.run(function(), {"x": 1}, execute)
+        await cache.run(function(), {"x": 2}, execute)
+        await cache.run(function(code_hash="edited"), {"x": 1}, execute)
+        return execute.calls
+
+    assert run(scenario()) == 3
+
+
+def test_functions_not_marked_cacheable_always_run():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions()
+        await cache.run(function(cacheable=False), None, execute)
+        result = await cache.run(function(cacheable=False), None, execute)
+        return execute.calls, result
+
+    calls, result = run(scenario())
+    assert calls == 2
+    assert "cached" not in result
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions(hold=True)
+        calls = [asyncio.create_task(cache.run(function(), {"x": 1}, execute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        execute.release.set()
+        return execute.calls, await asyncio.gather(*calls)
+
+    calls, results = run(scenario())
+    assert calls == 1
+    assert sum(1 for result in results if result.get("coalesced")) == 4
+    assert all(result["result"] == {"output": "42"} for result in results)
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions(error=RuntimeError("boom"), hold=True)
+        calls = [asyncio.create_task(cache.run(function(), None, execute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        execute.release.set()
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+
+        execute.error = None
+        execute.release = None
+        await cache.run(function(), None, execute)
+        return execute.calls, outcomes
+
+    calls, outcomes = run(scenario())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    # One failed execution for the three callers, then a fresh one: the error was not kept
+    assert calls == 2
+
+
+def test_failed_results_are_not_cached():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions(result={"status": "error", "result": {"error": "Traceback ..."}})
+        await cache.run(function(), None, execute)
+        await cache.run(function(), None, execute)
+        return execute.calls
+
+    assert run(scenario()) == 2
+
+
+def test_cancelled_runner_hands_over_to_a_waiter():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions(hold=True)
+        runner = asyncio.create_task(cache.run(function(), None, execute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.run(function(), None, execute))
+        await asyncio.sleep(0)
+        runner.cancel()
+        await asyncio.sleep(0)
+        execute.release.set()
+        result = await waiter
+        return execute.calls, result
+
+    calls, result = run(scenario())
+    assert calls == 2
+    assert result["result"] == {"output": "42"}
+
+
+def test_invalidate_drops_only_that_function():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions()
+        await cache.run(function(id=1), None, execute)
+        await cache.run(function(id=2), None, execute)
+        cache.invalidate(1)
+        first = await cache.run(function(id=1), None, execute)
+        second = await cache.run(function(id=2), None, execute)
+        return execute.calls, first, second
+
+    calls, first, second = run(scenario())
+    assert calls == 3
+    assert "cached" not in first
+    assert second["cached"] is True
+
+
+def test_least_recently_used_entries_are_evicted():
+    async def scenario():
+        cache = ResultCache(ttl=60, max_entries=2)
+        execute = Executions()
+        for event in (1, 2, 1, 3):
+            await cache.run(function(), event, execute)
+        calls = execute.calls
+        recent = await cache.run(function(), 1, execute)
+        evicted = await cache.run(function(), 2, execute)
+        return calls, execute.calls - calls, recent, evicted
+
+    calls, extra, recent, evicted = run(scenario())
+    assert calls == 3
+    assert recent.get("cached") is True
+    assert "cached" not in evicted
+    assert extra == 1
+
+
+def test_cached_results_are_copies():
+    async def scenario():
+        cache = ResultCache(ttl=60)
+        execute = Executions()
+        first = await cache.run(function(), None, execute)
+        first["result"]["output"] = "changed"
+        return await cache.run(function(), None, execute)
+
+    assert run(scenario())["result"] == {"output": "42"}
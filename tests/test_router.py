@@ -0,0 +1,102 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from backend.engine import router
+from backend.engine.dispatcher import DispatcherUnavailableError
+from backend.engine.router import NodeRouter, _NodeSnapshot
+
+FUNCTION = SimpleNamespace(id=1, timeout=0.2, memory_mb=128, code_hash="abc")
+
+
+class Node:
+    """Worker node stand-in answering /execute after `delay` seconds"""
+
+    def __init__(self, delay=0.0):
+        self.requests = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                node.requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                time.sleep(delay)
+                body = json.dumps({"result": {"status": "success", "result": {"output": "ok"}}}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def snapshot(id, url, busy=0):
+    return _NodeSnapshot(SimpleNamespace(id=id, url=url, workers=4, memory_capacity_mb=0, busy=busy, queued=0,
+                                         memory_in_use_mb=0, warm_functions={}, artifacts=[]))
+
+
+@pytest.fixture
+def node_router(monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_REQUEST_GRACE", 0)
+    monkeypatch.setattr(router, "ROUTER_CONNECT_TIMEOUT", 1)
+    node_router = NodeRouter(enabled=True, max_in_flight=4)
+    yield node_router
+    node_router.stop()
+
+
+def test_unreachable_node_is_retried_on_another(node_router):
+    node = Node()
+    try:
+        # The unreachable node looks idler, so it is tried first
+        node_router._nodes = [snapshot("down", closed_port_url()), snapshot("up", node.url, busy=2)]
+        result = node_router.execute(FUNCTION, {"x": 1})
+    finally:
+        node.close()
+
+    assert result["result"] == {"output": "ok"}
+    assert len(node.requests) == 1
+    assert "down" in node_router._down_until
+
+
+def test_read_timeout_is_not_resubmitted(node_router):
+    slow, spare = Node(delay=1.0), Node()
+    try:
+        node_router._nodes = [snapshot("slow", slow.url), snapshot("spare", spare.url, busy=2)]
+        result = node_router.execute(FUNCTION, {"x": 1})
+    finally:
+        slow.close()
+        spare.close()
+
+    assert result["status"] == "error"
+    assert "may or may not have run" in result["result"]["error"]
+    assert len(slow.requests) == 1
+    assert spare.requests == []
+    assert "slow" in node_router._down_until
+
+
+def test_no_reachable_node_is_unavailable(node_router):
+    node_router._nodes = [snapshot("down", closed_port_url())]
+    with pytest.raises(DispatcherUnavailableError):
+        node_router.execute(FUNCTION, None)
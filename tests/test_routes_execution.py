@@ -0,0 +1,174 @@
+import copy
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import routes_execution
+from backend.db import get_async_db
+from backend.result_cache import ResultCache
+
+FUNCTION = SimpleNamespace(id=1, name="echo", language="python", timeout=5, memory_mb=128, cacheable=False,
+                           code_hash="abc")
+
+
+class Invocations:
+    """Stands in for the dispatcher: records submissions and answers each with `result`"""
+
+    def __init__(self, result=None):
+        self.calls = []
+        self.result = result or {"status": "success", "result": {"output": "ok"}, "execution_time": 0.01}
+
+    async def __call__(self, function, event, on_output, timings, priority=routes_execution.INTERACTIVE,
+                       profile=False):
+        self.calls.append((function.id, event, priority))
+        if isinstance(self.result, Exception):
+            raise self.result
+        if on_output is not None:
+            on_output("stdout", "ok")
+        return copy.deepcopy(self.result)
+
+
+@pytest.fixture
+def invocations(monkeypatch):
+    invocations = Invocations()
+    logged, recorded = [], []
+
+    async def lookup(db, id):
+        return FUNCTION if id == FUNCTION.id else None
+
+    async def save_logs(rows):
+        logged.extend(rows)
+
+    monkeypatch.setattr(routes_execution, "_submit", invocations)
+    monkeypatch.setattr(routes_execution.function_cache, "get_async", lookup)
+    monkeypatch.setattr(routes_execution.log_writer, "submit", lambda row: logged.append(row) or True)
+    monkeypatch.setattr(routes_execution, "_save_logs", save_logs)
+    monkeypatch.setattr(routes_execution.function_stats, "record", lambda row: recorded.append(row))
+    invocations.logged, invocations.recorded = logged, recorded
+    return invocations
+
+
+@pytest.fixture
+def client(invocations):
+    app = FastAPI()
+    app.include_router(routes_execution.router)
+
+    async def no_db():
+        yield None
+
+    app.dependency_overrides[get_async_db] = no_db
+    with TestClient(app) as client:
+        yield client
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_unavailable_sandbox_is_503(client, invocations):
+    invocations.result = routes_execution.SandboxUnavailableError("Linux namespaces are not available")
+
+    response = client.post("/functions/1/execute", json={"x": 1})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert invocations.logged == []
+
+
+def test_cache_hits_are_not_logged_as_executions(client, invocations, monkeypatch):
+    monkeypatch.setattr(routes_execution, "result_cache", ResultCache(ttl=60))
+    monkeypatch.setattr(FUNCTION, "cacheable", True)
+
+    results = [client.post("/functions/1/execute", json={"x": 1}).json()["result"] for _ in range(3)]
+    assert len(invocations.calls) == 1
+    assert [result.get("cached", False) for result in results] == [False, True, True]
+    assert len(invocations.logged) == len(invocations.recorded) == 1
+
+
+def test_batch_logs_only_the_events_that_ran(client, invocations, monkeypatch):
+    monkeypatch.setattr(routes_execution, "result_cache", ResultCache(ttl=60))
+    monkeypatch.setattr(FUNCTION, "cacheable", True)
+
+    response = client.post("/functions/1/execute:batch", json={"events": [1, 1, 1, 2], "parallelism": 1})
+    assert [line["status"] for line in batch_lines(response)] == ["success"] * 4
+    assert sorted(event for _, event, _ in invocations.calls) == [1, 2]
+    assert len(invocations.logged) == len(invocations.recorded) == 2
+
+
+def test_profiled_calls_run_and_store_their_profile(client, invocations, monkeypatch):
+    monkeypatch.setattr(routes_execution, "result_cache", ResultCache(ttl=60))
+    monkeypatch.setattr(FUNCTION, "cacheable", True)
+    stored = []
+
+    class Session:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *args):
+            return False
+
+    async def create_profile(db, function_id, profile):
+        stored.append((function_id, dict(profile)))
+        return 7
+
+    monkeypatch.setattr(routes_execution, "AsyncSessionLocal", Session)
+    monkeypatch.setattr(routes_execution.crud, "create_execution_profile_async", create_profile)
+    invocations.result = dict(invocations.result, profile={"hotspots": [], "collapsed": "main 1\n"})
+
+    results = [client.post("/functions/1/execute?profile=true", json={"x": 1}).json()["result"] for _ in range(2)]
+    # A profile describes one run, so profiled calls are never answered from the cache
+    assert len(invocations.calls) == 2
+    assert [profile["collapsed"] for _, profile in stored] == ["main 1\n"] * 2
+    assert results[0]["profile"] == {"hotspots": [], "id": 7}
+    assert [row["profile_id"] for row in invocations.logged] == [7, 7]
+
+
+def test_stream_unknown_function_is_404(client, invocations):
+    response = client.post("/functions/999/execute:stream", json={"x": 1})
+    assert response.status_code == 404
+    assert invocations.calls == []
+
+
+def test_stream_relays_output_then_result(client, invocations):
+    response = client.post("/functions/1/execute:stream", json={"x": 1})
+    assert response.status_code == 200
+    events = sse_events(response.text)
+    assert events[0] == ("output", {"stream": "stdout", "data": "ok"})
+    assert events[-1][0] == "result"
+    assert events[-1][1]["result"]["result"] == {"output": "ok"}
+    assert [row["function_id"] for row in invocations.logged] == [1]
+
+
+def batch_lines(response):
+    return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+
+
+def test_batch_unknown_function_is_404(client, invocations):
+    response = client.post("/functions/999/execute:batch", json={"events": [1, 2]})
+    assert response.status_code == 404
+    assert invocations.calls == []
+    assert invocations.logged == []
+
+
+def test_batch_runs_every_event_at_batch_priority(client, invocations):
+    response = client.post("/functions/1/execute:batch", json={"events": [1, 2, 3]})
+    assert response.status_code == 200
+    assert [line["status"] for line in batch_lines(response)] == ["success"] * 3
+    assert sorted(event for _, event, _ in invocations.calls) == [1, 2, 3]
+    assert {priority for _, _, priority in invocations.calls} == {routes_execution.BATCH}
+
+
+def test_batch_gives_up_on_a_saturated_queue(client, invocations, monkeypatch):
+    monkeypatch.setattr(routes_execution, "BATCH_QUEUE_WAIT", 0.05)
+    invocations.result = routes_execution.QueueFullError(1)
+
+    response = client.post("/functions/1/execute:batch", json={"events": [1, 2]})
+    lines = batch_lines(response)
+    assert [line["status"] for line in lines] == ["error", "error"]
+    assert "Too many executions queued" in lines[0]["result"]["result"]["error"]
@@ -0,0 +1,47 @@
+import errno
+import os
+import platform
+import subprocess
+import sys
+
+import pytest
+
+SANDBOX_INIT = os.path.join(os.path.dirname(__file__), os.pardir, "backend", "engine")
+
+# Runs in a child process, since a seccomp filter cannot be removed once installed
+PROBE = """
+import ctypes, os, signal, subprocess, sys, threading
+import sandbox_init
+
+sandbox_init.install_seccomp()
+libc = ctypes.CDLL(None, use_errno=True)
+arch = sandbox_init.DENIED_SYSCALLS[sandbox_init.platform.machine()]
+
+def syscall(nr, *args):
+    result = libc.syscall(nr, *args)
+    return os.strerror(ctypes.get_errno()) if result == -1 else "ok"
+
+thread = threading.Thread(target=lambda: None)
+thread.start()
+thread.join()
+print("process", subprocess.run([sys.executable, "-c", "print(1)"], capture_output=True).stdout.strip() == b"1")
+print("newuser", syscall(arch["clone"], 0x10000000 | signal.SIGCHLD, 0, 0, 0, 0))
+print("newnet", syscall(arch["clone"], 0x40000000 | signal.SIGCHLD, 0, 0, 0, 0))
+print("clone3", syscall(arch["clone3"], 0, 0))
+"""
+
+
+def probe():
+    return subprocess.run([sys.executable, "-c", PROBE], cwd=SANDBOX_INIT, capture_output=True, text=True, timeout=30)
+
+
+@pytest.mark.skipif(sys.platform != "linux" or platform.machine() not in ("x86_64", "aarch64"),
+                    reason="the seccomp policy is for Linux on x86_64 and aarch64")
+def test_seccomp_refuses_new_namespaces_but_not_threads_or_processes():
+    completed = probe()
+    assert completed.returncode == 0, completed.stderr
+    lines = dict(line.split(" ", 1) for line in completed.stdout.splitlines())
+    assert lines["process"] == "True"
+    assert lines["newuser"] == lines["newnet"] == os.strerror(errno.EPERM)
+    # Refused as missing, so the C library falls back to clone()
+    assert lines["clone3"] == os.strerror(errno.ENOSYS)
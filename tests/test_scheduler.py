@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+from backend.engine.scheduler import BATCH, INTERACTIVE, FairShareScheduler
+
+
+def function(id, memory_mb=128, reserved_concurrency=0, max_concurrency=None):
+    return SimpleNamespace(id=id, memory_mb=memory_mb, reserved_concurrency=reserved_concurrency,
+                           max_concurrency=max_concurrency)
+
+
+def drain(scheduler, count):
+    """Take `count` jobs one at a time, finishing each before the next, and return their items"""
+    items = []
+    for _ in range(count):
+        job = scheduler.take()
+        items.append(job.item)
+        scheduler.done(job)
+    return items
+
+
+def test_functions_take_turns_within_a_class():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    bursty, quiet = function(1), function(2)
+    for i in range(4):
+        scheduler.put(("bursty", i), bursty)
+    for i in range(2):
+        scheduler.put(("quiet", i), quiet)
+
+    assert drain(scheduler, 6) == [
+        ("bursty", 0), ("quiet", 0), ("bursty", 1), ("quiet", 1), ("bursty", 2), ("bursty", 3)
+    ]
+
+
+def test_turns_are_weighted_by_memory():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    large, small = function(1, memory_mb=512), function(2, memory_mb=128)
+    for i in range(5):
+        scheduler.put("small", small)
+        scheduler.put("large", large)
+
+    # One turn of a 512 MB function costs as much as four of a 128 MB one
+    assert drain(scheduler, 5) == ["small", "small", "small", "small", "large"]
+
+
+def test_jobs_of_one_function_run_in_order():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    for i in range(5):
+        scheduler.put(i, function(1))
+
+    assert drain(scheduler, 5) == [0, 1, 2, 3, 4]
+
+
+def test_priority_classes_share_by_weight():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    for i in range(10):
+        scheduler.put(INTERACTIVE, function(1), priority=INTERACTIVE)
+        scheduler.put(BATCH, function(2), priority=BATCH)
+
+    # Interactive work gets four turns for each batch turn, but batch is never starved
+    items = drain(scheduler, 10)
+    assert items.count(INTERACTIVE) == 8
+    assert items.count(BATCH) == 2
+    assert BATCH in items[:5]
+
+
+def test_quiet_class_does_not_bank_credit():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    for i in range(8):
+        scheduler.put(BATCH, function(2), priority=BATCH)
+    drain(scheduler, 8)
+
+    # Interactive was idle while batch ran alone; it still only gets its weighted share now
+    for i in range(10):
+        scheduler.put(INTERACTIVE, function(1), priority=INTERACTIVE)
+        scheduler.put(BATCH, function(2), priority=BATCH)
+    assert drain(scheduler, 10).count(BATCH) == 2
+
+
+def test_unknown_priority_is_rejected():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    try:
+        scheduler.put("job", function(1), priority="urgent")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_put_refuses_beyond_queue_depth():
+    scheduler = FairShareScheduler(max_queue_depth=2, memory_capacity_mb=4096)
+    assert scheduler.put("a", function(1))
+    assert scheduler.put("b", function(1))
+    assert not scheduler.put("c", function(1))
+    assert scheduler.qsize() == 2
+
+
+def test_max_concurrency_caps_running_jobs():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    capped = function(1, max_concurrency=1)
+    scheduler.put("capped", capped)
+    scheduler.put("capped", capped)
+    scheduler.put("other", function(2))
+
+    first = scheduler.take()
+    assert first.item == "capped"
+    # The second capped job must wait for the first, so the other function goes ahead
+    assert scheduler.take().item == "other"
+    scheduler.done(first)
+    assert scheduler.take().item == "capped"
+
+
+def test_unused_reservations_are_held_back():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=256)
+    reserved = function(1, reserved_concurrency=1)
+    scheduler.configure(reserved)
+    other = function(2)
+    scheduler.put("other", other)
+    scheduler.put("other", other)
+
+    running = scheduler.take()
+    assert running.item == "other"
+    # The rest of the capacity is set aside for the reserved function
+    scheduler.put("reserved", reserved)
+    assert scheduler.take().item == "reserved"
+    assert scheduler.memory_in_use() == 256
+    scheduler.done(running)
+    assert scheduler.take().item == "other"
+
+
+def test_cancelled_jobs_are_dropped():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    scheduler.put("gone", function(1), cancelled=lambda: True)
+    scheduler.put("kept", function(1))
+
+    assert scheduler.take().item == "kept"
+    assert scheduler.qsize() == 0
+
+
+def test_take_returns_none_once_closed_and_drained():
+    scheduler = FairShareScheduler(max_queue_depth=100, memory_capacity_mb=4096)
+    scheduler.put("last", function(1))
+    scheduler.close()
+
+    assert drain(scheduler, 1) == ["last"]
+    assert scheduler.take() is None
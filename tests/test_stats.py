@@ -0,0 +1,107 @@
+import json
+import random
+
+from backend import stats
+from backend.stats import LatencySketch, STATS_RELATIVE_ACCURACY, summarize
+
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
+
+def exact_quantile(values, q):
+    """The sample the sketch's rank q * (n - 1) points at"""
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+def assert_within_accuracy(sketch, values):
+    for q in QUANTILES:
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= STATS_RELATIVE_ACCURACY * expected * (1 + 1e-9), q
+
+
+def test_quantiles_are_within_relative_accuracy():
+    rng = random.Random(7)
+    # Seconds, from sub-millisecond to tens of seconds
+    values = [rng.lognormvariate(-3, 2) for _ in range(20000)]
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    assert sketch.min == min(values) and sketch.max == max(values)
+    assert_within_accuracy(sketch, values)
+
+
+def test_merge_matches_a_single_sketch():
+    rng = random.Random(11)
+    values = [rng.uniform(0.001, 2.0) for _ in range(5000)]
+    whole, left, right = LatencySketch(), LatencySketch(), LatencySketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+
+    assert left.buckets == whole.buckets
+    assert left.count == whole.count
+    assert left.min == whole.min and left.max == whole.max
+    assert_within_accuracy(left, values)
+
+
+def test_tiny_durations_count_in_the_zero_bucket():
+    sketch = LatencySketch()
+    for value in (0.0, 1e-9, 0.5):
+        sketch.add(value)
+
+    assert sketch.zero == 2
+    assert sum(sketch.buckets.values()) == 1
+    assert sketch.quantile(0.0) == 0.0
+    assert sketch.quantile(1.0) == 0.5
+
+
+def test_empty_sketch_has_no_quantiles():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.mean() is None
+    assert summarize(1, 0, 0, sketch)["error_rate"] == 0.0
+
+
+def test_dict_round_trip():
+    sketch = LatencySketch()
+    for value in (0.0, 0.01, 0.2, 0.2, 3.0):
+        sketch.add(value)
+    # As stored in the function_stats JSON column
+    copy = LatencySketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+    assert copy.to_dict() == sketch.to_dict()
+    assert copy.quantile(0.5) == sketch.quantile(0.5)
+    assert LatencySketch.from_dict(None).count == 0
+
+
+def test_collapse_folds_the_lowest_buckets(monkeypatch):
+    monkeypatch.setattr(stats, "STATS_MAX_BUCKETS", 4)
+    values = [0.001 * 2 ** i for i in range(10)]
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch.buckets) == 4
+    assert sum(sketch.buckets.values()) == len(values)
+    # The lowest samples were folded upwards; the top of the distribution keeps its accuracy
+    lowest = min(sketch.buckets)
+    assert sketch.buckets[lowest] == 7
+    for q in (0.8, 0.9, 1.0):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= STATS_RELATIVE_ACCURACY * expected * (1 + 1e-9)
+
+
+def test_merge_collapses_to_the_bucket_cap(monkeypatch):
+    monkeypatch.setattr(stats, "STATS_MAX_BUCKETS", 3)
+    left, right = LatencySketch(), LatencySketch()
+    for value in (0.001, 0.01, 0.1):
+        left.add(value)
+    for value in (1.0, 10.0, 100.0):
+        right.add(value)
+    left.merge(right)
+
+    assert len(left.buckets) == 3
+    assert left.count == sum(left.buckets.values()) == 6
+    assert left.quantile(1.0) == 100.0